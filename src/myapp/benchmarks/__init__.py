@@ -0,0 +1,4 @@
+"""Performance benchmarks for stores, services and the CLI.
+
+Run them with ``project bench``; see :mod:`myapp.benchmarks.suites`.
+"""
@@ -0,0 +1,126 @@
+"""Timing harness, result records and baseline comparison."""
+
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from myapp.shared.persistence.files import atomic_write
+from myapp.shared.schemas import utcnow
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    """Throughput and latency percentiles for one benchmark at one dataset size."""
+
+    suite: str
+    name: str
+    size: int
+    ops: int
+    seconds: float
+    ops_per_sec: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.suite}/{self.name}/{self.size}"
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def measure(
+    suite: str,
+    name: str,
+    size: int,
+    calls: Iterable[Callable[[], Any]],
+    *,
+    units_per_call: int = 1,
+) -> BenchResult:
+    """Time each callable in ``calls`` and summarize.
+
+    ``units_per_call`` counts how many logical operations one call does
+    (e.g. records yielded by a full scan) for the throughput figure.
+    """
+    latencies: list[float] = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    total = sum(latencies)
+    ops = len(latencies) * units_per_call
+    return BenchResult(
+        suite=suite,
+        name=name,
+        size=size,
+        ops=ops,
+        seconds=total,
+        ops_per_sec=ops / total if total else 0.0,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+    )
+
+
+# -- result files ------------------------------------------------------------
+
+
+def write_results(path: Path, results: list[BenchResult]) -> None:
+    """Write results plus environment metadata as JSON."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "meta": {
+            "created_at": utcnow().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": [asdict(r) for r in results],
+    }
+    with atomic_write(path) as fh:
+        json.dump(payload, fh, indent=2)
+        fh.write("\n")
+
+
+def load_results(path: Path) -> list[BenchResult]:
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    return [BenchResult(**r) for r in payload["results"]]
+
+
+@dataclass(frozen=True)
+class Regression:
+    """A benchmark whose throughput dropped more than the allowed threshold."""
+
+    key: str
+    baseline_ops_per_sec: float
+    current_ops_per_sec: float
+
+    @property
+    def change(self) -> float:
+        return self.current_ops_per_sec / self.baseline_ops_per_sec - 1
+
+
+def compare(
+    current: list[BenchResult], baseline: list[BenchResult], threshold: float = 0.2
+) -> list[Regression]:
+    """Return benchmarks more than ``threshold`` (0.2 = 20%) slower than baseline."""
+    previous = {r.key: r for r in baseline}
+    regressions = []
+    for result in current:
+        before = previous.get(result.key)
+        if before is None or before.ops_per_sec <= 0:
+            continue
+        if result.ops_per_sec < before.ops_per_sec * (1 - threshold):
+            regressions.append(Regression(result.key, before.ops_per_sec, result.ops_per_sec))
+    return regressions
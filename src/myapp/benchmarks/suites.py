@@ -0,0 +1,378 @@
+"""Benchmark suites.
+
+Each suite is a generator registered in :data:`SUITES` that builds its
+own datasets under ``workdir`` and yields one
+:class:`~myapp.benchmarks.harness.BenchResult` per measurement, so
+callers can report progress as results arrive.
+"""
+
+import random
+import subprocess
+import sys
+import threading
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from myapp.benchmarks.harness import BenchResult, measure
+from myapp.server.client import ServiceClient
+from myapp.server.httpd import listen
+from myapp.server.rpc import ServedService
+from myapp.server.workers import Supervisor
+from myapp.services.example.api import RPC_METHODS, ExampleService
+from myapp.services.example.schemas import Item, ItemCreate, ItemUpdate
+from myapp.shared.persistence.base import BaseStore
+from myapp.shared.persistence.codecs import CODECS
+from myapp.shared.persistence.json_store import JsonStore
+from myapp.shared.persistence.jsonl_store import JsonlStore
+from myapp.shared.persistence.profiles import PROFILES
+from myapp.shared.persistence.sqlite_store import SqliteStore
+from myapp.shared.processes import forkserver_context
+
+Suite = Callable[[Sequence[int], int, Path], Iterator[BenchResult]]
+
+# Worker processes for the parallel import benchmark.
+PARALLEL_WORKERS = 4
+
+# Threads saving concurrently in the writes suite.
+WRITER_THREADS = 8
+
+# Client processes calling the server concurrently, and the server worker
+# counts compared, in the server suite.
+SERVER_CLIENTS = 8
+SERVER_WORKERS = (1, 2, 4)
+
+TAGS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+
+
+def make_items(count: int, seed: int = 0) -> list[Item]:
+    """Deterministic dataset of ``count`` items with zero-padded IDs."""
+    rng = random.Random(seed)
+    return [
+        Item(
+            id=f"{i:08d}",
+            name=f"item {i}",
+            description="benchmark item " * 4,
+            tags=rng.sample(TAGS, k=rng.randint(0, 3)),
+        )
+        for i in range(count)
+    ]
+
+
+def make_stores(
+    workdir: Path, label: str, *, trusted_reads: bool = False
+) -> dict[str, BaseStore[Item]]:
+    """One store per backend, stored under ``workdir``."""
+    return {
+        "json": JsonStore(workdir / f"{label}.json", Item, trusted_reads=trusted_reads),
+        "jsonl": JsonlStore(workdir / f"{label}.jsonl", Item, trusted_reads=trusted_reads),
+        "sqlite": SqliteStore(workdir / f"{label}.db", "items", Item, trusted_reads=trusted_reads),
+    }
+
+
+def _write_ops(backend: str, ops: int, size: int) -> int:
+    # Every JsonStore write rewrites the whole file; keep large sizes tractable.
+    if backend == "json" and size > 1000:
+        return max(5, ops * 1000 // size)
+    return ops
+
+
+def _scan(store: BaseStore[Any]) -> int:
+    return sum(1 for _ in store.iter_all())
+
+
+def _scan_raw(store: BaseStore[Any]) -> int:
+    return sum(1 for _ in store.iter_raw())
+
+
+# -- suites ------------------------------------------------------------------
+
+
+def bench_stores(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """get/save/delete latency and full-scan throughput for every backend."""
+    for size in sizes:
+        dataset = make_items(size)
+        rng = random.Random(size)
+        for backend, store in make_stores(workdir, f"stores-{size}").items():
+            with store:
+                store.save_many(dataset)
+                reads = [rng.choice(dataset).id for _ in range(ops)]
+                yield measure(
+                    "stores", f"{backend}.get", size, (partial(store.get, i) for i in reads)
+                )
+                writes = rng.sample(dataset, min(size, _write_ops(backend, ops, size)))
+                yield measure(
+                    "stores", f"{backend}.save", size, (partial(store.save, i) for i in writes)
+                )
+                yield measure(
+                    "stores",
+                    f"{backend}.list",
+                    size,
+                    (partial(_scan, store) for _ in range(3)),
+                    units_per_call=size,
+                )
+                yield measure(
+                    "stores",
+                    f"{backend}.list_raw",
+                    size,
+                    (partial(_scan_raw, store) for _ in range(3)),
+                    units_per_call=size,
+                )
+                yield measure(
+                    "stores",
+                    f"{backend}.delete",
+                    size,
+                    (partial(store.delete, i.id) for i in writes),
+                )
+
+
+def bench_reads(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """``list_all`` with full validation vs. ``trusted_reads`` for every backend."""
+    runs = max(3, min(ops, 10))
+    for size in sizes:
+        for backend, store in make_stores(workdir, f"reads-{size}").items():
+            with store:
+                store.save_many(make_items(size))
+        for mode, trusted in (("validated", False), ("trusted", True)):
+            stores = make_stores(workdir, f"reads-{size}", trusted_reads=trusted)
+            for backend, store in stores.items():
+                with store:
+                    yield measure(
+                        "reads",
+                        f"{backend}.list_all.{mode}",
+                        size,
+                        (store.list_all for _ in range(runs)),
+                        units_per_call=size,
+                    )
+
+
+def bench_service(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """ExampleService round-trips (response building included) on SQLite."""
+    for size in sizes:
+        with SqliteStore(workdir / f"service-{size}.db", "items", Item) as store:
+            store.save_many(make_items(size))
+            svc = ExampleService(store=store)
+            rng = random.Random(size)
+            creates = [ItemCreate(name=f"new {i}", tags=["bench"]) for i in range(ops)]
+            yield measure("service", "create", size, (partial(svc.create, c) for c in creates))
+            reads = [f"{rng.randrange(size):08d}" for _ in range(ops)] if size else []
+            yield measure("service", "get", size, (partial(svc.get, i) for i in reads))
+            change = ItemUpdate(description="updated")
+            yield measure(
+                "service", "update", size, (partial(svc.update, i, change) for i in reads)
+            )
+            yield measure(
+                "service",
+                "list_page",
+                size,
+                (partial(svc.list_page, limit=100) for _ in range(ops)),
+            )
+
+
+def bench_profiles(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """SQLite saves, bulk loads and full scans under each pragma profile."""
+    for size in sizes:
+        dataset = make_items(size)
+        writes = make_items(ops, seed=1)
+        for profile in PROFILES:
+            path = workdir / f"profiles-{size}-{profile}.db"
+            with SqliteStore(path, "items", Item, profile=profile) as store:
+                yield measure(
+                    "profiles",
+                    f"{profile}.save_many",
+                    size,
+                    [partial(store.save_many, dataset)],
+                    units_per_call=size,
+                )
+                yield measure(
+                    "profiles", f"{profile}.save", size, (partial(store.save, i) for i in writes)
+                )
+                yield measure(
+                    "profiles",
+                    f"{profile}.list",
+                    size,
+                    (partial(_scan, store) for _ in range(3)),
+                    units_per_call=size,
+                )
+
+
+def bench_codecs(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """SQLite bulk writes, point reads and full scans under each ``data`` codec."""
+    for size in sizes:
+        dataset = make_items(size)
+        rng = random.Random(size)
+        for codec in CODECS:
+            path = workdir / f"codecs-{size}-{codec}.db"
+            with SqliteStore(path, "items", Item, codec=codec) as store:
+                yield measure(
+                    "codecs",
+                    f"{codec}.save_many",
+                    size,
+                    [partial(store.save_many, dataset)],
+                    units_per_call=size,
+                )
+                reads = [rng.choice(dataset).id for _ in range(ops)] if size else []
+                yield measure(
+                    "codecs", f"{codec}.get", size, (partial(store.get, i) for i in reads)
+                )
+                yield measure(
+                    "codecs",
+                    f"{codec}.list",
+                    size,
+                    (store.list_all for _ in range(3)),
+                    units_per_call=size,
+                )
+
+
+def _save_concurrently(store: SqliteStore[Item], items: Sequence[Item]) -> None:
+    with ThreadPoolExecutor(WRITER_THREADS) as pool:
+        for _ in pool.map(store.save, items):
+            pass
+
+
+def _submit_all(store: SqliteStore[Item], items: Sequence[Item]) -> None:
+    for future in [store.submit_save(item) for item in items]:
+        future.result()
+
+
+def bench_writes(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """SQLite single-record saves from many threads, per-save commits vs. group commit."""
+    for size in sizes:
+        dataset = make_items(size)
+        writes = make_items(max(ops, 1) * WRITER_THREADS, seed=1)
+        for mode, group in (("direct", False), ("group", True)):
+            path = workdir / f"writes-{size}-{mode}.db"
+            with SqliteStore(path, "items", Item, group_commit=group) as store:
+                store.save_many(dataset)
+                yield measure(
+                    "writes",
+                    f"save.{mode}.t{WRITER_THREADS}",
+                    size,
+                    [partial(_save_concurrently, store, writes)],
+                    units_per_call=len(writes),
+                )
+                yield measure(
+                    "writes",
+                    f"submit.{mode}",
+                    size,
+                    [partial(_submit_all, store, writes)],
+                    units_per_call=len(writes),
+                )
+
+
+def bench_transfer(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """Service export/import throughput: JSON store file vs. NDJSON snapshots.
+
+    Plain NDJSON is also imported with :data:`PARALLEL_WORKERS` validation workers.
+    """
+    for size in sizes:
+        with SqliteStore(workdir / f"transfer-{size}.db", "items", Item) as source:
+            source.save_many(make_items(size))
+            svc = ExampleService(store=source)
+            for fmt in ("json", "ndjson", "ndjson.gz", "ndjson.xz"):
+                path = workdir / f"transfer-{size}.{fmt}"
+                target = SqliteStore(workdir / f"transfer-{size}-{fmt}.db", "items", Item)
+                with target:
+                    dst = ExampleService(store=target)
+                    if fmt == "json":
+                        export, load = (
+                            partial(svc.export_json, path),
+                            partial(dst.import_json, path),
+                        )
+                    else:
+                        export = partial(svc.export_snapshot, path)
+                        load = partial(dst.import_snapshot, path)
+                    yield measure("transfer", f"export.{fmt}", size, [export], units_per_call=size)
+                    yield measure("transfer", f"import.{fmt}", size, [load], units_per_call=size)
+                    if fmt == "ndjson":
+                        load = partial(dst.import_snapshot, path, workers=PARALLEL_WORKERS)
+                        yield measure(
+                            "transfer",
+                            f"import.{fmt}.w{PARALLEL_WORKERS}",
+                            size,
+                            [load],
+                            units_per_call=size,
+                        )
+
+
+def bench_cli(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """Wall-clock cold start of the ``project`` CLI in a fresh interpreter."""
+    runs = max(1, min(ops, 10))
+    for label, args in [("version", ["--version"]), ("svc-schema", ["svc", "example", "schema"])]:
+        command = [sys.executable, "-c", f"from myapp.cli.main import cli; cli({args!r})"]
+        run = partial(subprocess.run, command, check=True, capture_output=True)
+        yield measure("cli", f"cold-start.{label}", 0, (run for _ in range(runs)))
+
+
+def _served_example(db_path: Path) -> ExampleService:
+    return ExampleService(store=SqliteStore(db_path, "items", Item))
+
+
+def _client_calls(url: str, method: str, calls: Sequence[Sequence[Any]]) -> None:
+    with ServiceClient(url) as client:
+        for args in calls:
+            client.call("example", method, *args)
+
+
+def _call_concurrently(
+    pool: ProcessPoolExecutor, url: str, method: str, calls: Sequence[Sequence[Any]]
+) -> None:
+    batches = [calls[i::SERVER_CLIENTS] for i in range(SERVER_CLIENTS)]
+    for _ in pool.map(partial(_client_calls, url, method), batches):
+        pass
+
+
+def bench_server(sizes: Sequence[int], ops: int, workdir: Path) -> Iterator[BenchResult]:
+    """``project serve`` throughput with 1, 2 and 4 worker processes.
+
+    :data:`SERVER_CLIENTS` client processes call ``get`` and ``create``
+    over HTTP; the workers share one SQLite database.
+    """
+    context = forkserver_context([__name__])
+    with ProcessPoolExecutor(SERVER_CLIENTS, mp_context=context) as pool:
+        for size in sizes:
+            db_path = workdir / f"server-{size}.db"
+            with SqliteStore(db_path, "items", Item) as store:
+                store.save_many(make_items(size))
+            rng = random.Random(size)
+            count = max(ops, 1) * SERVER_CLIENTS
+            reads = [[f"{rng.randrange(size):08d}"] for _ in range(count)] if size else []
+            creates = [[{"name": f"new {i}", "tags": ["bench"]}] for i in range(count)]
+            served = ServedService(partial(_served_example, db_path), frozenset(RPC_METHODS))
+            for workers in SERVER_WORKERS:
+                supervisor = Supervisor(
+                    listen(port=0),
+                    {"example": served},
+                    workers=workers,
+                )
+                thread = threading.Thread(target=supervisor.run, daemon=True)
+                thread.start()
+                try:
+                    # Wait for the workers (and the client processes) to start.
+                    _call_concurrently(pool, supervisor.url, "get", [["warm-up"]] * count)
+                    for method, calls in (("get", reads), ("create", creates)):
+                        yield measure(
+                            "server",
+                            f"{method}.w{workers}",
+                            size,
+                            [partial(_call_concurrently, pool, supervisor.url, method, calls)],
+                            units_per_call=len(calls),
+                        )
+                finally:
+                    supervisor.stop()
+                    thread.join()
+
+
+SUITES: dict[str, Suite] = {
+    "stores": bench_stores,
+    "reads": bench_reads,
+    "service": bench_service,
+    "writes": bench_writes,
+    "profiles": bench_profiles,
+    "codecs": bench_codecs,
+    "transfer": bench_transfer,
+    "cli": bench_cli,
+    "server": bench_server,
+}
@@ -5,22 +5,119 @@ Usage: ``project <command>`` or ``uv run project <command>``.
 """
 
 import importlib
-import pkgutil
+import json
 import shutil
 import sys
+import tempfile
+from collections.abc import Mapping
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 import click
 
 import myapp
-import myapp.services as _svc_pkg
-from myapp.shared.config import DATA_DIR, DB_DIR, JSON_DIR, ensure_data_dirs
+from myapp.services import service_names
+from myapp.shared.config import (
+    BENCH_DIR,
+    DATA_DIR,
+    DB_DIR,
+    JSON_DIR,
+    METRICS_DIR,
+    METRICS_ENABLED,
+    PROFILE_DIR,
+    SERVER_FILE,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    SQLITE_PRAGMAS,
+    SQLITE_PROFILE,
+    ensure_data_dirs,
+)
+
+if TYPE_CHECKING:
+    from myapp.server.rpc import ServedService
 
 
 @click.group()
 @click.version_option(version=myapp.__version__, prog_name="project")
-def cli() -> None:
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Run the command under cProfile; write a pstats file, print the top functions.",
+)
+@click.option(
+    "--profile-sort",
+    type=click.Choice(["cumulative", "tottime", "calls"]),
+    default="cumulative",
+    show_default=True,
+    help="Sort order of the --profile summary.",
+)
+@click.option(
+    "--trace-alloc",
+    is_flag=True,
+    help="Trace allocations with tracemalloc; report the largest sites and the peak.",
+)
+@click.option(
+    "--profile-top",
+    default=20,
+    show_default=True,
+    help="Lines in the --profile / --trace-alloc summaries.",
+)
+@click.option(
+    "--profile-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=PROFILE_DIR,
+    show_default=True,
+    help="Where --profile / --trace-alloc write their reports.",
+)
+@click.option(
+    "--log-level",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR"], case_sensitive=False),
+    help="Level of all myapp loggers (default: MYAPP_LOG_LEVEL or INFO).",
+)
+@click.option(
+    "--log-format",
+    type=click.Choice(["text", "json"]),
+    help="Log line format on stderr (default: MYAPP_LOG_FORMAT or text).",
+)
+@click.pass_context
+def cli(
+    ctx: click.Context,
+    profile: bool,
+    profile_sort: str,
+    trace_alloc: bool,
+    profile_top: int,
+    profile_dir: Path,
+    log_level: str | None,
+    log_format: str | None,
+) -> None:
     """project — microservice template CLI."""
+    from myapp.shared.logging import configure_logging, shutdown_logging
+
+    try:
+        configure_logging(level=log_level, fmt=log_format)
+    except ValueError as exc:
+        raise click.ClickException(f"Invalid logging configuration: {exc}") from None
+    # Registered first, so it runs last: it flushes what the others log.
+    ctx.call_on_close(shutdown_logging)
     ensure_data_dirs()
+    if METRICS_ENABLED and ctx.invoked_subcommand != "metrics":
+        from myapp.shared import metrics
+
+        ctx.call_on_close(partial(metrics.dump, METRICS_DIR))
+    if profile or trace_alloc:
+        from myapp.cli.profiling import diagnostics, output_stem
+
+        ctx.with_resource(
+            diagnostics(
+                output_stem(profile_dir, ctx.invoked_subcommand),
+                profile=profile,
+                trace_alloc=trace_alloc,
+                sort=profile_sort,
+                top=profile_top,
+            )
+        )
 
 
 # ── core commands ─────────────────────────────────────────────────────
@@ -31,8 +128,8 @@ def run() -> None:
     """Run the default service (example)."""
     from myapp.services.example.api import ExampleService
 
-    svc = ExampleService()
-    resp = svc.list_items()
+    with ExampleService() as svc:
+        resp = svc.list_items()
     click.echo(f"Example service ready — {resp.message}")
 
 
@@ -75,6 +172,17 @@ def doctor() -> None:
     if probe.exists():
         probe.unlink()
 
+    from myapp.shared.persistence.profiles import parse_pragmas, profile_pragmas
+
+    click.echo("\nSQLite profile:\n")
+    try:
+        pragmas = profile_pragmas(SQLITE_PROFILE, parse_pragmas(SQLITE_PRAGMAS))
+    except ValueError as exc:
+        _check(f"MYAPP_SQLITE_PROFILE={SQLITE_PROFILE}", False, str(exc))
+    else:
+        _check(f"MYAPP_SQLITE_PROFILE={SQLITE_PROFILE}", True)
+        _report_sqlite_profile(pragmas)
+
     click.echo()
     if ok:
         click.echo("All checks passed.")
@@ -83,24 +191,327 @@ def doctor() -> None:
         raise SystemExit(1)
 
 
+def _report_sqlite_profile(pragmas: dict[str, str]) -> None:
+    """Print the settings SQLite applies for the profile and its benchmark numbers."""
+    from myapp.shared.persistence.pool import ConnectionPool
+    from myapp.shared.persistence.profiles import DEFAULT_PROFILE, effective_settings, get_profile
+
+    click.echo(f"         {get_profile(SQLITE_PROFILE).summary}")
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp) / "doctor.db", max_size=1, pragmas=pragmas)
+        with pool.connection() as conn:
+            settings = effective_settings(conn)
+        pool.close()
+    for name, value in settings.items():
+        click.echo(f"         {name:<20} {value}")
+
+    latest = BENCH_DIR / "latest.json"
+    results = {}
+    if latest.exists():
+        from myapp.benchmarks.harness import load_results
+
+        results = {r.name: r for r in load_results(latest) if r.suite == "profiles"}
+    if not results:
+        click.echo("         no profile benchmarks yet: run `project bench --suite profiles`")
+        return
+    click.echo(f"         benchmark ({latest.name}, vs. {DEFAULT_PROFILE}):")
+    for name, result in results.items():
+        profile, _, op = name.rpartition(".")
+        if profile != SQLITE_PROFILE:
+            continue
+        base = results.get(f"{DEFAULT_PROFILE}.{op}")
+        ratio = f"  {result.ops_per_sec / base.ops_per_sec:.2f}x" if base else ""
+        click.echo(f"         {op:<20} {result.ops_per_sec:>12,.0f} ops/s{ratio}")
+
+
+@cli.command()
+@click.option("--host", default=SERVER_HOST, show_default=True, help="TCP address to bind.")
+@click.option(
+    "--port", default=SERVER_PORT, show_default=True, help="TCP port (0 picks a free one)."
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Listen on this Unix socket instead of TCP.",
+)
+@click.option(
+    "--service",
+    "services",
+    multiple=True,
+    help="Service to serve (repeatable). Default: every service with an api.py.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=SERVER_WORKERS,
+    show_default=True,
+    help="Worker processes sharing the socket; 1 serves from this process.",
+)
+@click.option(
+    "--allow-remote",
+    is_flag=True,
+    help="Allow a --host other than loopback (the API has no authentication).",
+)
+@click.pass_context
+def serve(
+    ctx: click.Context,
+    host: str,
+    port: int,
+    socket_path: Path | None,
+    services: tuple[str, ...],
+    workers: int,
+    allow_remote: bool,
+) -> None:
+    """Serve the service APIs from warm processes until interrupted.
+
+    While it runs, `project svc ...` commands on the default (SQLite)
+    backend route their calls through it (MYAPP_SERVER=off to opt out).
+    With --workers N, a supervisor keeps N worker processes serving the
+    same socket and database, restarting any that die.
+    """
+    from myapp.server.httpd import is_loopback
+    from myapp.server.rpc import served_services
+
+    if socket_path is None and not allow_remote and not is_loopback(host):
+        raise click.ClickException(
+            f"Refusing to listen on {host}: anyone who can reach it can call the services."
+            " Use a loopback address, or pass --allow-remote."
+        )
+    try:
+        served = served_services(services or None)
+    except (ImportError, ValueError) as exc:
+        raise click.ClickException(str(exc)) from None
+    if workers > 1:
+        _serve_workers(ctx, served, host, port, socket_path, workers)
+        return
+
+    from myapp.server.httpd import RpcServer, make_server
+    from myapp.server.httpd import serve as run_server
+    from myapp.server.rpc import Dispatcher
+
+    dispatcher = Dispatcher.build(served)
+    try:
+        server = make_server(dispatcher, host=host, port=port, socket_path=socket_path)
+    except (OSError, ValueError) as exc:
+        dispatcher.close()
+        raise click.ClickException(f"Cannot listen: {exc}") from None
+
+    def ready(server: RpcServer) -> None:
+        names = ", ".join(sorted(dispatcher.services))
+        click.echo(f"Serving {names} on {server.url}; Ctrl+C to stop", err=True)
+
+    run_server(server, discovery=SERVER_FILE, ready=ready)
+
+
+def _serve_workers(
+    ctx: click.Context,
+    served: Mapping[str, "ServedService"],
+    host: str,
+    port: int,
+    socket_path: Path | None,
+    workers: int,
+) -> None:
+    from myapp.server.httpd import listen
+    from myapp.server.workers import Supervisor
+
+    try:
+        listener = listen(host=host, port=port, socket_path=socket_path)
+    except (OSError, ValueError) as exc:
+        raise click.ClickException(f"Cannot listen: {exc}") from None
+    root = ctx.find_root().params
+    supervisor = Supervisor(
+        listener,
+        served,
+        workers=workers,
+        log_config={"level": root["log_level"], "fmt": root["log_format"]},
+    )
+
+    def ready(supervisor: Supervisor) -> None:
+        names = ", ".join(sorted(served))
+        click.echo(
+            f"Serving {names} on {supervisor.url} with {workers} workers; Ctrl+C to stop",
+            err=True,
+        )
+
+    supervisor.run(discovery=SERVER_FILE, ready=ready)
+
+
+@cli.command("metrics")
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["table", "prometheus", "json"]),
+    default="table",
+    show_default=True,
+)
+@click.option(
+    "--input",
+    "directory",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=METRICS_DIR,
+    show_default=True,
+    help="Directory holding metrics.json.",
+)
+@click.option("--reset", is_flag=True, help="Delete the recorded metrics.")
+def metrics_command(fmt: str, directory: Path, reset: bool) -> None:
+    """Show store/service timings recorded by commands run with MYAPP_METRICS=1."""
+    from myapp.shared.metrics import prometheus_text, summarize
+
+    source = directory / "metrics.json"
+    if reset:
+        for name in ("metrics.json", "metrics.prom"):
+            (directory / name).unlink(missing_ok=True)
+        click.echo(f"Metrics in {directory} reset.")
+        return
+    if not source.exists():
+        raise click.ClickException(
+            f"No metrics in {directory}: run a command with MYAPP_METRICS=1 first"
+        )
+    snapshot = json.loads(source.read_text(encoding="utf-8"))
+    if fmt == "json":
+        click.echo(json.dumps(snapshot, indent=2))
+        return
+    if fmt == "prometheus":
+        click.echo(prometheus_text(snapshot), nl=False)
+        return
+    click.echo(
+        f"{'kind':<8} {'class.method':<36} {'calls':>8} {'errors':>6} {'total s':>9} "
+        f"{'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for row in summarize(snapshot):
+        click.echo(
+            f"{row.kind:<8} {row.owner + '.' + row.method:<36} {row.calls:>8,} {row.errors:>6} "
+            f"{row.total:>9.3f} {row.mean * 1000:>9.3f} {row.p50 * 1000:>9.3f} "
+            f"{row.p95 * 1000:>9.3f} {row.p99 * 1000:>9.3f}"
+        )
+
+
+def _parse_sizes(_ctx: click.Context, _param: click.Parameter, value: str) -> list[int]:
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise click.BadParameter("expected comma-separated integers, e.g. 1000,10000") from None
+
+
+@cli.command()
+@click.option(
+    "--suite",
+    "suites",
+    multiple=True,
+    type=click.Choice(
+        [
+            "stores",
+            "reads",
+            "service",
+            "writes",
+            "profiles",
+            "codecs",
+            "transfer",
+            "cli",
+            "server",
+        ]
+    ),
+    help="Suite to run (repeatable). Default: all.",
+)
+@click.option(
+    "--sizes",
+    default="1000,10000",
+    show_default=True,
+    callback=_parse_sizes,
+    help="Comma-separated dataset sizes, up to 1000000.",
+)
+@click.option("--ops", default=200, show_default=True, help="Operations per measurement.")
+@click.option(
+    "--output",
+    type=click.Path(path_type=Path),
+    default=BENCH_DIR / "latest.json",
+    show_default=True,
+    help="Where to write the JSON results.",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(path_type=Path),
+    default=BENCH_DIR / "baseline.json",
+    show_default=True,
+    help="Results to compare against (skipped if missing).",
+)
+@click.option("--save-baseline", is_flag=True, help="Also store these results as the baseline.")
+@click.option(
+    "--threshold",
+    default=0.2,
+    show_default=True,
+    help="Flag benchmarks this much slower than baseline (0.2 = 20%).",
+)
+def bench(
+    suites: tuple[str, ...],
+    sizes: list[int],
+    ops: int,
+    output: Path,
+    baseline: Path,
+    save_baseline: bool,
+    threshold: float,
+) -> None:
+    """Benchmark stores, services and the CLI; exit 1 on regressions."""
+    from myapp.benchmarks.harness import compare, load_results, write_results
+    from myapp.benchmarks.suites import SUITES
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="myapp-bench-") as workdir:
+        for name in suites or SUITES:
+            for result in SUITES[name](sizes, ops, Path(workdir)):
+                results.append(result)
+                click.echo(
+                    f"{result.key:<36} {result.ops_per_sec:>12,.0f} ops/s  "
+                    f"p50 {result.p50_ms:8.3f}ms  p95 {result.p95_ms:8.3f}ms  "
+                    f"p99 {result.p99_ms:8.3f}ms"
+                )
+
+    write_results(output, results)
+    click.echo(f"\nResults written to {output}")
+
+    regressions = []
+    if baseline.exists() and baseline.resolve() != output.resolve():
+        regressions = compare(results, load_results(baseline), threshold)
+        for reg in regressions:
+            click.echo(
+                f"REGRESSION {reg.key}: {reg.baseline_ops_per_sec:,.0f} -> "
+                f"{reg.current_ops_per_sec:,.0f} ops/s ({reg.change:+.0%})",
+                err=True,
+            )
+        if not regressions:
+            click.echo(f"No regressions against {baseline}")
+    if save_baseline:
+        write_results(baseline, results)
+        click.echo(f"Baseline saved to {baseline}")
+    if regressions:
+        raise SystemExit(1)
+
+
 # ── service subgroup (auto-discovered) ────────────────────────────────
 
 
-@cli.group("svc")
-def svc_group() -> None:
-    """Service commands — one subgroup per service."""
+class LazyServiceGroup(click.Group):
+    """Click group that imports a service's ``cli`` module only when it is used.
+
+    ``project --version`` or ``project doctor`` never import any service;
+    ``project svc example ...`` imports just the example service.
+    """
 
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *service_names()})
 
-def _discover_service_commands() -> None:
-    """Walk ``myapp.services.*`` looking for ``cli.commands`` groups."""
-    for _importer, name, _ispkg in pkgutil.iter_modules(_svc_pkg.__path__):
-        try:
-            mod = importlib.import_module(f"myapp.services.{name}.cli")
-            group = getattr(mod, "commands", None)
-            if group is not None:
-                svc_group.add_command(group, name)
-        except ImportError:
-            pass  # service has no CLI — that is fine
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        command = super().get_command(ctx, cmd_name)
+        if command is None and cmd_name in service_names():
+            mod = importlib.import_module(f"myapp.services.{cmd_name}.cli")
+            command = getattr(mod, "commands", None)
+            if command is not None:
+                self.add_command(command, cmd_name)
+        return command
 
 
-_discover_service_commands()
+@cli.group("svc", cls=LazyServiceGroup)
+def svc_group() -> None:
+    """Service commands — one subgroup per service."""
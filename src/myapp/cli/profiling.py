@@ -0,0 +1,112 @@
+"""``--profile`` and ``--trace-alloc`` support for the top-level CLI.
+
+The ``cli`` group enters :func:`diagnostics` before the invoked command
+runs and leaves it when its context closes, so it covers every command —
+service subcommands included — without touching them. Full output goes
+to files; a short summary goes to stderr, keeping stdout clean for pipes.
+
+cProfile only sees the main thread: work handed to executor or
+group-commit threads shows up as time spent waiting for it.
+"""
+
+import io
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import click
+
+# Allocation sites listed in the --trace-alloc file (the summary shows fewer).
+ALLOC_REPORT_SITES = 100
+
+
+def output_stem(directory: Path, command: str | None) -> Path:
+    """``<directory>/<command>-<timestamp>-<pid>``, unique per run."""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return directory / f"{command or 'cli'}-{stamp}-{os.getpid()}"
+
+
+def _mib(size: int) -> str:
+    return f"{size / 2**20:.1f} MiB"
+
+
+def _profile_report(profiler: Any, path: Path, sort: str, top: int) -> None:
+    import pstats
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats(sort).print_stats(top)
+    click.echo(out.getvalue().strip("\n"), err=True)
+    click.echo(f"Profile written to {path}", err=True)
+
+
+def _alloc_report(snapshot: Any, current: int, peak: int, path: Path, top: int) -> None:
+    stats = snapshot.statistics("lineno")
+    lines = [
+        f"{_mib(stat.size):>10} {stat.count:>9,} blocks  {stat.traceback[0]}"
+        for stat in stats[: max(top, ALLOC_REPORT_SITES)]
+    ]
+    header = [f"peak traced memory: {_mib(peak)}", f"still allocated: {_mib(current)}"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join([*header, "", *lines]) + "\n", encoding="utf-8")
+    click.echo("\n".join([*header, f"top {top} allocation sites:", *lines[:top]]), err=True)
+    click.echo(f"Allocation report written to {path}", err=True)
+
+
+@contextmanager
+def diagnostics(
+    stem: Path,
+    *,
+    profile: bool = False,
+    trace_alloc: bool = False,
+    sort: str = "cumulative",
+    top: int = 20,
+) -> Iterator[None]:
+    """Profile and/or trace allocations of the block; report when it ends.
+
+    ``profile`` writes ``<stem>.pstats``, a standard pstats file that
+    ``python -m pstats`` or snakeviz can explore further. ``trace_alloc``
+    writes ``<stem>.alloc.txt``: the peak of traced memory and the lines
+    that allocated what is still allocated when the block ends.
+
+    When both are on, the profiler is stopped and the allocation numbers
+    are taken before either report is built, so neither counts the
+    other's reporting work. Tracing every allocation does slow the
+    profiled code down, though: profile on its own for accurate timings.
+    """
+    import tracemalloc
+
+    profiler = None
+    tracing = trace_alloc and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    if trace_alloc:
+        tracemalloc.reset_peak()
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if trace_alloc:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if tracing:
+                tracemalloc.stop()
+            snapshot = snapshot.filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                )
+            )
+            _alloc_report(snapshot, current, peak, stem.with_suffix(".alloc.txt"), top)
+        if profiler is not None:
+            _profile_report(profiler, stem.with_suffix(".pstats"), sort, top)
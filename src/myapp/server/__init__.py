@@ -0,0 +1,12 @@
+"""Long-running server exposing service APIs as JSON remote procedure calls.
+
+``project serve`` keeps one warm process — imports done, stores open,
+pooled connections and caches filled — and answers ``POST
+/rpc/<service>/<method>`` over local HTTP or a Unix socket. CLI commands
+find it through a discovery file and route their calls through it.
+
+* :mod:`~myapp.server.rpc` — dispatching calls to the service facades.
+* :mod:`~myapp.server.httpd` — the HTTP transports and ``serve``.
+* :mod:`~myapp.server.client` — the client and discovery (stdlib only, so
+  a routed CLI command never imports pydantic or the stores).
+"""
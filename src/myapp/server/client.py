@@ -0,0 +1,295 @@
+"""Client side of ``project serve``: discovery, calls and service proxies.
+
+Only the standard library is imported here: a CLI command routed through
+the server skips importing pydantic, the stores and the service itself,
+which is most of what a cold command costs.
+
+Wire format (see :mod:`myapp.server.rpc`): a call is ``POST
+/rpc/<service>/<method>`` with ``{"args": [...], "kwargs": {...}}``; the
+answer is ``{"type": ..., "result": ...}`` with 200, or ``{"error":
+{"kind": ..., "message": ...}}`` with a 4xx/5xx status.
+"""
+
+import http.client
+import json
+import os
+import select
+import socket
+import threading
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path, PurePath
+from typing import Any
+from urllib.parse import urlsplit
+
+from myapp.shared.config import SERVER_FILE, SERVER_ROUTING
+
+UNIX_SCHEME = "unix://"
+
+
+class RpcError(Exception):
+    """A call the server answered with an error status."""
+
+    def __init__(self, status: int, kind: str, message: str) -> None:
+        super().__init__(status, kind, message)
+        self.status = status
+        self.kind = kind
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"{self.kind} ({self.status}): {self.message}"
+
+
+@dataclass
+class RemoteResponse:
+    """A ``ServiceResponse`` as received from the server (data is JSON-decoded)."""
+
+    success: bool
+    message: str = ""
+    data: Any = None
+    errors: list[str] = field(default_factory=list)
+    version: int | None = None
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self._path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def _jsonable(value: Any) -> Any:
+    """``json.dumps`` fallback for argument types the services take."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_unset=True)
+    if isinstance(value, datetime | date):
+        return value.isoformat()
+    if isinstance(value, PurePath):
+        # The server may run in another working directory.
+        return os.path.abspath(value)
+    if isinstance(value, set | frozenset):
+        return sorted(value)
+    raise TypeError(f"Cannot send {type(value).__name__} to the server")
+
+
+def _dropped(conn: http.client.HTTPConnection) -> bool:
+    """Whether the server has closed idle ``conn`` (an idle socket only reads EOF)."""
+    if conn.sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+def _raw_records(values: list[Any]) -> Iterator[bytes]:
+    for value in values:
+        yield json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class ServiceClient:
+    """Call service methods on a server at ``url`` (``http://host:port`` or ``unix:///path``).
+
+    One keep-alive connection is reused for every call; calls from several
+    threads take turns on it.
+    """
+
+    def __init__(self, url: str, *, timeout: float = 30.0) -> None:
+        self.url = url
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn: http.client.HTTPConnection | None = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is not None and _dropped(self._conn):
+            # The server closed the keep-alive connection (e.g. it restarted).
+            self.close_connection()
+        if self._conn is None:
+            if self.url.startswith(UNIX_SCHEME):
+                self._conn = _UnixHTTPConnection(self.url[len(UNIX_SCHEME) :], self.timeout)
+            else:
+                parts = urlsplit(self.url)
+                self._conn = http.client.HTTPConnection(
+                    parts.hostname or "127.0.0.1", parts.port, timeout=self.timeout
+                )
+            self._conn.connect()
+        return self._conn
+
+    def _request(self, method: str, path: str, body: bytes | None = None) -> tuple[int, bytes]:
+        """Send one request and read its answer, reconnecting once if that is safe.
+
+        A request that could not be written in full is sent again on a new
+        connection, as the server cannot have acted on it. Once sent, only a
+        ``GET`` is repeated: a call may have run even if its answer was lost.
+        """
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        with self._lock:
+            for attempt in (1, 2):
+                conn = self._connection()
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection()
+                    if attempt == 2:
+                        raise
+                    continue
+                try:
+                    response = conn.getresponse()
+                    return response.status, response.read()
+                except (http.client.RemoteDisconnected, ConnectionResetError):
+                    self.close_connection()
+                    if method != "GET" or attempt == 2:
+                        raise
+            raise AssertionError("unreachable")
+
+    def connect(self) -> None:
+        """Open the connection now; raises ``OSError`` if no server is listening."""
+        with self._lock:
+            self._connection()
+
+    def close_connection(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self) -> None:
+        with self._lock:
+            self.close_connection()
+
+    def health(self) -> dict[str, Any]:
+        """The server's ``/health`` answer: pid, services, uptime."""
+        _, body = self._request("GET", "/health")
+        info: dict[str, Any] = json.loads(body)
+        return info
+
+    def call(self, service: str, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Run ``service.method(*args, **kwargs)`` on the server and return its result.
+
+        Service responses come back as :class:`RemoteResponse`, iterators
+        as lists (raw JSON records as an iterator of ``bytes``). Raises
+        :class:`RpcError` if the server reports an error.
+        """
+        body = json.dumps({"args": args, "kwargs": kwargs}, default=_jsonable).encode()
+        status, payload = self._request("POST", f"/rpc/{service}/{method}", body)
+        answer = json.loads(payload)
+        if status != 200:
+            error = answer.get("error", {})
+            raise RpcError(status, error.get("kind", "error"), error.get("message", ""))
+        kind, result = answer["type"], answer["result"]
+        if kind == "response":
+            return RemoteResponse(**result)
+        if kind == "raw":
+            return _raw_records(result)
+        return result
+
+    def service(self, name: str) -> "RemoteService":
+        return RemoteService(self, name)
+
+    def __enter__(self) -> "ServiceClient":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class RemoteService:
+    """Proxy whose methods call the same-named methods of a served service."""
+
+    def __init__(self, client: ServiceClient, name: str) -> None:
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, method: str) -> Any:
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return self._client.call(self._name, method, *args, **kwargs)
+
+        call.__name__ = method
+        return call
+
+    def close(self) -> None:
+        """Close the connection to the server (the served service stays open)."""
+        self._client.close()
+
+    def __enter__(self) -> "RemoteService":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+# -- discovery -----------------------------------------------------------------
+
+
+def write_discovery(path: Path, url: str, services: list[str]) -> None:
+    """Announce a server at ``url`` (called by the server once it listens)."""
+    from myapp.shared.persistence.files import atomic_write
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(path) as fh:
+        json.dump({"url": url, "pid": os.getpid(), "services": services}, fh)
+        fh.write("\n")
+
+
+def remove_discovery(path: Path) -> None:
+    """Withdraw the announcement, unless another server has replaced it."""
+    try:
+        if json.loads(path.read_text(encoding="utf-8")).get("pid") == os.getpid():
+            path.unlink()
+    except (OSError, ValueError):
+        pass
+
+
+def _alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def discover(path: Path = SERVER_FILE) -> dict[str, Any] | None:
+    """The discovery file's contents if its server process still exists."""
+    try:
+        info = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(info, dict) or not _alive(int(info.get("pid", 0))):
+        return None
+    return info
+
+
+def connect_to_server(service: str, path: Path = SERVER_FILE) -> RemoteService | None:
+    """A connected proxy for ``service`` if a running server offers it, else None.
+
+    Returns None when routing is off (``MYAPP_SERVER=off``), nothing is
+    announced, the server does not serve ``service`` or cannot be reached.
+    """
+    if not SERVER_ROUTING:
+        return None
+    info = discover(path)
+    if info is None or service not in info.get("services", ()):
+        return None
+    client = ServiceClient(info["url"])
+    try:
+        client.connect()
+    except OSError:
+        return None
+    return client.service(service)
@@ -0,0 +1,327 @@
+"""HTTP transports for the RPC dispatcher, and :func:`serve`.
+
+Routes:
+
+* ``POST /rpc/<service>/<method>`` — call a method (see :mod:`myapp.server.rpc`);
+* ``GET /rpc`` — the served services and their methods;
+* ``GET /health`` — pid, services and uptime;
+* ``GET /metrics`` — Prometheus text (with ``MYAPP_METRICS=1``).
+
+Connections are kept alive (HTTP/1.1) and each gets its own thread, so a
+client such as :class:`~myapp.server.client.ServiceClient` pays the
+connection setup once.
+
+Web pages the user visits can reach a loopback server too. Calls must be
+``application/json``, which a page cannot send cross-origin without a
+preflight the server never answers (415 otherwise). A server listening
+on a loopback address or Unix socket also refuses ``Host`` headers that
+name anything else (403), which defeats DNS rebinding.
+"""
+
+import ipaddress
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from myapp.server.client import UNIX_SCHEME, RpcError, remove_discovery, write_discovery
+from myapp.server.rpc import Dispatcher
+from myapp.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Largest request body accepted, in bytes.
+MAX_BODY = 64 * 2**20
+
+
+class RpcRequestHandler(BaseHTTPRequestHandler):
+    """Serve one connection's requests against ``self.server.dispatcher``."""
+
+    protocol_version = "HTTP/1.1"
+    # Buffer each response (handle_one_request flushes it) so headers and
+    # body leave in one write: split writes stall on the client's delayed
+    # ACK (~40 ms per call) under Nagle's algorithm.
+    wbufsize = 64 * 1024
+    server: "RpcServer"
+
+    def setup(self) -> None:
+        super().setup()
+        # Large bodies still span several writes; Unix sockets have no Nagle.
+        if self.connection.family != getattr(socket, "AF_UNIX", None):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, exc: RpcError) -> None:
+        error = {"error": {"kind": exc.kind, "message": exc.message}}
+        self._send(exc.status, json.dumps(error).encode())
+
+    def _refuse(self, exc: RpcError) -> None:
+        # The body, if any, is left unread: the connection cannot be reused.
+        self.close_connection = True
+        self._send_error(exc)
+
+    def _host_allowed(self) -> bool:
+        host = self.headers.get("Host")
+        return host is None or not self.server.checks_host or is_loopback(host_name(host))
+
+    def do_POST(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler naming
+        if not self._host_allowed():
+            self._refuse(RpcError(403, "forbidden_host", "Host must be a loopback address"))
+            return
+        if self.headers.get_content_type() != "application/json":
+            self._refuse(RpcError(415, "unsupported_media_type", "Send application/json"))
+            return
+        _, prefix, service, method = (self.path.split("?", 1)[0].split("/") + ["", ""])[:4]
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.close_connection = True
+            self._send_error(RpcError(413, "too_large", f"Request body over {MAX_BODY} bytes"))
+            return
+        body = self.rfile.read(length)
+        if prefix != "rpc" or not service or not method:
+            self._send_error(RpcError(404, "not_found", f"No route {self.path}"))
+            return
+        try:
+            answer = self.server.dispatcher.call(service, method, body)
+        except RpcError as exc:
+            self._send_error(exc)
+            return
+        self._send(200, answer)
+
+    def do_GET(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler naming
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if not self._host_allowed():
+            self._refuse(RpcError(403, "forbidden_host", "Host must be a loopback address"))
+        elif path == "/health":
+            self._send(200, json.dumps(self.server.health()).encode())
+        elif path == "/rpc":
+            self._send(200, json.dumps(self.server.dispatcher.describe()).encode())
+        elif path == "/metrics":
+            from myapp.shared.metrics import REGISTRY, prometheus_text
+
+            text = prometheus_text(REGISTRY.snapshot())
+            self._send(200, text.encode(), "text/plain; version=0.0.4")
+        else:
+            self._send_error(RpcError(404, "not_found", f"No route {self.path}"))
+
+    def address_string(self) -> str:
+        # Unix socket peers have no address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+class RpcServer(socketserver.BaseServer, ABC):
+    """What the handler needs from either transport (mixed into both)."""
+
+    dispatcher: Dispatcher
+    started: float
+
+    @property
+    @abstractmethod
+    def url(self) -> str:
+        """The URL clients use to reach this server."""
+
+    @property
+    def checks_host(self) -> bool:
+        """Whether requests must name a loopback ``Host`` (see the module docstring)."""
+        return True
+
+    def get_request(self) -> tuple[Any, Any]:
+        # Worker processes share a non-blocking listener: the ones that lose
+        # the race for a connection get BlockingIOError, which serve_forever
+        # ignores. The connection itself must block (it inherits the flag on
+        # some platforms).
+        conn, address = super().get_request()
+        conn.setblocking(True)
+        return conn, address
+
+    def health(self) -> dict[str, Any]:
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "url": self.url,
+            "services": sorted(self.dispatcher.services),
+            "uptime": round(time.monotonic() - self.started, 3),
+        }
+
+
+class RpcHTTPServer(RpcServer, ThreadingHTTPServer):
+    """RPC over TCP; ``port=0`` picks a free port (see :attr:`url`)."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: tuple[str, int], dispatcher: Dispatcher, bind_and_activate: bool = True
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.started = time.monotonic()
+        super().__init__(address, RpcRequestHandler, bind_and_activate)
+
+    @property
+    def url(self) -> str:
+        return socket_url(self.socket)
+
+    @property
+    def checks_host(self) -> bool:
+        # Listening on a public address (serve --allow-remote) means other names are expected.
+        return is_loopback(str(self.server_address[0]))
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class RpcUnixServer(RpcServer, socketserver.ThreadingUnixStreamServer):
+        """RPC over a Unix domain socket at ``path`` (replaced if stale).
+
+        The socket file is removed on close, unless the server was handed
+        an already bound socket (a worker's, see :func:`make_server`).
+        """
+
+        daemon_threads = True
+
+        def __init__(
+            self, path: str, dispatcher: Dispatcher, bind_and_activate: bool = True
+        ) -> None:
+            self.dispatcher = dispatcher
+            self.started = time.monotonic()
+            self.path = path
+            self.owns_path = bind_and_activate
+            if bind_and_activate and os.path.exists(path):
+                os.unlink(path)
+            super().__init__(path, RpcRequestHandler, bind_and_activate)
+
+        @property
+        def url(self) -> str:
+            return f"{UNIX_SCHEME}{self.path}"
+
+        def server_close(self) -> None:
+            super().server_close()
+            if self.owns_path:
+                try:
+                    os.unlink(self.path)
+                except OSError:
+                    pass
+
+
+def is_loopback(host: str) -> bool:
+    """Whether ``host`` is only reachable from this machine (``localhost``, 127.0.0.0/8, ::1)."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def host_name(header: str) -> str:
+    """The host in a ``Host`` header, without port or IPv6 brackets."""
+    host = header.strip()
+    if host.startswith("["):
+        return host[1 : host.find("]")]
+    return host.rpartition(":")[0] if host.count(":") == 1 else host
+
+
+def socket_url(sock: socket.socket) -> str:
+    """The URL clients use to reach the listening socket ``sock``."""
+    if sock.family == getattr(socket, "AF_UNIX", None):
+        return f"{UNIX_SCHEME}{sock.getsockname()}"
+    host, port = sock.getsockname()[:2]
+    return f"http://{host}:{port}"
+
+
+def listen(
+    *, host: str = "127.0.0.1", port: int = 0, socket_path: Path | None = None
+) -> socket.socket:
+    """A bound, listening socket for servers made with ``make_server(listener=...)``."""
+    if socket_path is None:
+        return socket.create_server((host, port), backlog=socket.SOMAXCONN)
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError("Unix sockets are not available on this platform")
+    if socket_path.exists():
+        socket_path.unlink()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(str(socket_path))
+        sock.listen(socket.SOMAXCONN)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def make_server(
+    dispatcher: Dispatcher,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    socket_path: Path | None = None,
+    listener: socket.socket | None = None,
+) -> RpcServer:
+    """A listening TCP server, or a Unix socket server when ``socket_path`` is given.
+
+    With ``listener`` (see :func:`listen`), the server accepts connections
+    on that socket instead of binding its own; it never removes the socket
+    file, which belongs to whoever bound it.
+    """
+    if listener is not None:
+        server: RpcServer
+        if listener.family == getattr(socket, "AF_UNIX", None):
+            server = RpcUnixServer(listener.getsockname(), dispatcher, bind_and_activate=False)
+        else:
+            server = RpcHTTPServer(listener.getsockname()[:2], dispatcher, bind_and_activate=False)
+        server.socket.close()
+        server.socket = listener
+        return server
+    if socket_path is not None:
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix sockets are not available on this platform")
+        return RpcUnixServer(str(socket_path), dispatcher)
+    return RpcHTTPServer((host, port), dispatcher)
+
+
+def serve(
+    server: RpcServer,
+    *,
+    discovery: Path | None = None,
+    ready: Callable[[RpcServer], None] | None = None,
+) -> None:
+    """Serve until interrupted (Ctrl+C or SIGTERM), then close the services.
+
+    While running, the server is announced in ``discovery`` so CLI
+    commands route through it; the file is removed on the way out.
+    """
+    if threading.current_thread() is threading.main_thread():
+        # shutdown() waits for serve_forever(), so call it from another thread.
+        signal.signal(
+            signal.SIGTERM,
+            lambda *_: threading.Thread(target=server.shutdown, daemon=True).start(),
+        )
+    if discovery is not None:
+        write_discovery(discovery, server.url, sorted(server.dispatcher.services))
+    logger.debug("Serving %s on %s", ", ".join(server.dispatcher.services), server.url)
+    if ready is not None:
+        ready(server)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if discovery is not None:
+            remove_discovery(discovery)
+        server.server_close()
+        server.dispatcher.close()
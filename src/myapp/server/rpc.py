@@ -0,0 +1,177 @@
+"""Dispatch JSON remote procedure calls to service facades.
+
+A service is served when its package's ``api.py`` defines ``SERVICE``, the
+facade class (or any zero-argument factory), and ``RPC_METHODS``, the names
+of the synchronous methods clients may call as ``<service>/<method>``.
+Nothing else is exposed: the API has no authentication, so methods that
+touch server-side paths (imports, exports) must stay off the list.
+
+Arguments arrive as JSON and are validated against the method's type
+hints with pydantic, so an ``ItemCreate`` parameter accepts the object's
+fields and a ``datetime`` accepts an ISO string. Results are encoded by
+what they are:
+
+* ``ServiceResponse`` (any pydantic model) — ``{"type": "response"}``;
+* an iterator of ``bytes`` (stored JSON records, as ``list_raw`` yields)
+  — ``{"type": "raw"}``, the records spliced into the body unparsed;
+* any other iterator — ``{"type": "items"}``, materialized as a list;
+* anything else — ``{"type": "value"}``.
+"""
+
+import importlib
+import inspect
+import threading
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any, get_type_hints
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import from_json, to_json
+
+from myapp.server.client import RpcError
+from myapp.services import service_names
+from myapp.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class ServedService:
+    """How to build a service for serving, and the methods it exposes."""
+
+    factory: Callable[[], Any]
+    methods: frozenset[str]
+
+
+@dataclass(frozen=True)
+class _Method:
+    fn: Callable[..., Any]
+    signature: inspect.Signature
+    adapters: Mapping[str, TypeAdapter[Any]]
+
+
+def served_services(names: Iterable[str] | None = None) -> dict[str, ServedService]:
+    """The ``SERVICE`` and ``RPC_METHODS`` of each named service.
+
+    By default every service whose api.py defines ``SERVICE`` is included.
+    """
+    served = {}
+    for name in names if names is not None else service_names("api"):
+        module = importlib.import_module(f"myapp.services.{name}.api")
+        factory = getattr(module, "SERVICE", None)
+        if factory is None:
+            if names is not None:
+                raise ValueError(f"Service {name!r} does not define SERVICE in its api.py")
+            continue
+        methods = getattr(module, "RPC_METHODS", None)
+        if methods is None:
+            raise ValueError(f"Service {name!r} does not define RPC_METHODS in its api.py")
+        served[name] = ServedService(factory, frozenset(methods))
+    return served
+
+
+def _encode(result: Any) -> bytes:
+    if isinstance(result, BaseModel):
+        return b'{"type":"response","result":' + to_json(result) + b"}"
+    if isinstance(result, Iterator):
+        items = list(result)
+        if items and all(isinstance(item, bytes) for item in items):
+            return b'{"type":"raw","result":[' + b",".join(items) + b"]}"
+        return b'{"type":"items","result":' + to_json(items) + b"}"
+    return b'{"type":"value","result":' + to_json(result) + b"}"
+
+
+class Dispatcher:
+    """Route ``(service, method, body)`` calls to service instances.
+
+    ``methods`` lists what each service exposes; every name must be a
+    public synchronous method. Thread-safe as long as the services are:
+    the HTTP server calls it from one thread per connection.
+    """
+
+    def __init__(self, services: Mapping[str, Any], methods: Mapping[str, Iterable[str]]) -> None:
+        self.services = dict(services)
+        self.methods = {name: frozenset(methods.get(name, ())) for name in self.services}
+        self._callables: dict[tuple[str, str], Callable[..., Any]] = {}
+        for name, service in self.services.items():
+            for method in self.methods[name]:
+                fn = self._callable(service, method)
+                if fn is None:
+                    raise ValueError(f"{name}.{method} is not a public synchronous method")
+                self._callables[name, method] = fn
+        self._methods: dict[tuple[str, str], _Method] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, served: Mapping[str, ServedService]) -> "Dispatcher":
+        """Instantiate each served service (see :func:`served_services`)."""
+        return cls(
+            {name: spec.factory() for name, spec in served.items()},
+            {name: spec.methods for name, spec in served.items()},
+        )
+
+    def describe(self) -> dict[str, list[str]]:
+        """Callable methods per service."""
+        return {name: sorted(methods) for name, methods in self.methods.items()}
+
+    @staticmethod
+    def _callable(service: Any, name: str) -> Callable[..., Any] | None:
+        if name.startswith("_"):
+            return None
+        fn = getattr(service, name, None)
+        if not inspect.ismethod(fn):
+            return None
+        original = getattr(fn, "__metrics_original__", fn)
+        if inspect.iscoroutinefunction(original) or inspect.isasyncgenfunction(original):
+            return None
+        return fn
+
+    def _method(self, service: str, name: str) -> _Method:
+        key = (service, name)
+        method = self._methods.get(key)
+        if method is not None:
+            return method
+        if service not in self.services:
+            raise RpcError(404, "unknown_service", f"No service {service!r}")
+        fn = self._callables.get(key)
+        if fn is None:
+            raise RpcError(404, "unknown_method", f"Service {service!r} has no method {name!r}")
+        original = getattr(fn, "__metrics_original__", fn)
+        hints = get_type_hints(original)
+        signature = inspect.signature(fn)
+        adapters = {
+            param: TypeAdapter(hints[param]) for param in signature.parameters if param in hints
+        }
+        method = _Method(fn, signature, adapters)
+        with self._lock:
+            self._methods[key] = method
+        return method
+
+    def call(self, service: str, name: str, body: bytes) -> bytes:
+        """Run one call; returns the JSON answer or raises :class:`RpcError`."""
+        method = self._method(service, name)
+        try:
+            request = from_json(body) if body else {}
+            bound = method.signature.bind(*request.get("args", ()), **request.get("kwargs", {}))
+            arguments = {
+                param: method.adapters[param].validate_python(value)
+                if param in method.adapters
+                else value
+                for param, value in bound.arguments.items()
+            }
+        except (TypeError, ValueError, AttributeError) as exc:
+            # ValidationError is a ValueError.
+            detail = str(exc) if not isinstance(exc, ValidationError) else exc.json()
+            raise RpcError(400, "bad_request", detail) from None
+        try:
+            return _encode(method.fn(**arguments))
+        except Exception as exc:
+            logger.exception("%s/%s failed", service, name)
+            raise RpcError(500, type(exc).__name__, str(exc)) from None
+
+    def close(self) -> None:
+        """Close every service that has a ``close`` method (releasing its stores)."""
+        for service in self.services.values():
+            close = getattr(service, "close", None)
+            if callable(close):
+                close()
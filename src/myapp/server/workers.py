@@ -0,0 +1,183 @@
+"""Pre-fork worker processes for ``project serve --workers N``.
+
+One server process is bound by the GIL: validating arguments, building
+responses and encoding JSON all hold it, so extra request threads add no
+throughput. With workers, the supervisor binds the listening socket once
+and starts N processes that each accept connections on it, open their own
+stores and serve requests. SQLite in WAL mode lets them read the shared
+database concurrently while writers take turns (``busy_timeout``).
+
+Workers are started with :func:`~myapp.shared.processes.forkserver_context`,
+with the server and service modules preloaded. The supervisor restarts
+workers that die, and stops them all (SIGTERM, so each finishes its
+requests and closes its stores) on Ctrl+C or SIGTERM.
+"""
+
+import os
+import signal
+import socket
+import threading
+import time
+from collections.abc import Callable, Mapping
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any
+
+from myapp.server.client import remove_discovery, write_discovery
+from myapp.server.httpd import make_server, serve, socket_url
+from myapp.server.rpc import Dispatcher, ServedService
+from myapp.shared.logging import configure_logging, get_logger, shutdown_logging
+from myapp.shared.processes import forkserver_context
+
+logger = get_logger(__name__)
+
+# Seconds between checks for dead workers and stop requests.
+POLL_INTERVAL = 0.5
+
+# A worker that dies sooner than this after starting is restarted only after
+# this many seconds, so one that cannot start does not spin the supervisor.
+RESTART_DELAY = 1.0
+
+# Seconds a stopping worker gets to finish before it is killed.
+STOP_TIMEOUT = 10.0
+
+
+def _modules(served: Mapping[str, ServedService]) -> list[str]:
+    """This module and those defining the service factories, for the forkserver to preload."""
+    factories = [spec.factory for spec in served.values()]
+    modules = {getattr(getattr(f, "func", f), "__module__", None) for f in factories}
+    return [__name__, *sorted(m for m in modules if m)]
+
+
+def _work(
+    listener: socket.socket,
+    served: Mapping[str, ServedService],
+    log_config: Mapping[str, Any],
+) -> None:
+    """Worker process body: serve on the shared ``listener`` until stopped."""
+    if log_config:
+        configure_logging(**log_config)
+    try:
+        listener.setblocking(False)
+        serve(make_server(Dispatcher.build(served), listener=listener))
+    finally:
+        # Worker processes exit without running atexit handlers.
+        shutdown_logging()
+
+
+class Supervisor:
+    """Keep ``workers`` processes serving the ``served`` services on ``listener``.
+
+    ``served`` comes from :func:`~myapp.server.rpc.served_services`; each
+    worker calls the factories, so every process has its own stores. They
+    must be picklable (module-level classes or functions, or partials of
+    them).
+    ``log_config`` is passed to :func:`configure_logging` in each worker.
+    """
+
+    def __init__(
+        self,
+        listener: socket.socket,
+        served: Mapping[str, ServedService],
+        *,
+        workers: int,
+        log_config: Mapping[str, Any] | None = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.listener = listener
+        self.served = dict(served)
+        self.workers = workers
+        self.log_config = dict(log_config or {})
+        self.url = socket_url(listener)
+        self.processes: list[BaseProcess] = []
+        self.restarts = 0
+        self._started: dict[int, float] = {}
+        self._stopping = threading.Event()
+        self._context = forkserver_context(_modules(self.served))
+
+    def _spawn(self) -> BaseProcess:
+        process: BaseProcess = self._context.Process(  # type: ignore[attr-defined]
+            target=_work,
+            args=(self.listener, self.served, self.log_config),
+            name="myapp-worker",
+        )
+        process.start()
+        self._started[process.sentinel] = time.monotonic()
+        return process
+
+    def _replace(self, process: BaseProcess) -> BaseProcess | None:
+        process.join()
+        lived = time.monotonic() - self._started.pop(process.sentinel)
+        if self._stopping.is_set():
+            return None
+        logger.warning("Worker %s exited with code %s; restarting", process.pid, process.exitcode)
+        if lived < RESTART_DELAY and self._stopping.wait(RESTART_DELAY):
+            return None
+        return self._spawn()
+
+    def run(
+        self,
+        *,
+        discovery: Path | None = None,
+        ready: Callable[["Supervisor"], None] | None = None,
+    ) -> None:
+        """Start the workers and supervise them until :meth:`stop`, Ctrl+C or SIGTERM.
+
+        While running, the server is announced in ``discovery``; on the way
+        out the workers are stopped and the socket closed (a Unix socket's
+        file removed).
+        """
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        try:
+            self.processes = [self._spawn() for _ in range(self.workers)]
+            if discovery is not None:
+                write_discovery(discovery, self.url, sorted(self.served))
+            logger.debug("Serving on %s with %d workers", self.url, self.workers)
+            if ready is not None:
+                ready(self)
+            while not self._stopping.is_set():
+                for sentinel in wait([p.sentinel for p in self.processes], POLL_INTERVAL):
+                    index = next(i for i, p in enumerate(self.processes) if p.sentinel == sentinel)
+                    replacement = self._replace(self.processes[index])
+                    if replacement is None:
+                        del self.processes[index]
+                    else:
+                        self.processes[index] = replacement
+                        self.restarts += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stopping.set()
+            if discovery is not None:
+                remove_discovery(discovery)
+            self._stop_workers()
+            self._close_listener()
+
+    def stop(self) -> None:
+        """Ask :meth:`run` to stop the workers and return (safe from any thread)."""
+        self._stopping.set()
+
+    def _stop_workers(self) -> None:
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Worker %s did not stop; killing it", process.pid)
+                process.kill()
+                process.join()
+        self.processes = []
+
+    def _close_listener(self) -> None:
+        address = self.listener.getsockname()
+        self.listener.close()
+        if isinstance(address, str) and address:  # a Unix socket's path
+            try:
+                os.unlink(address)
+            except OSError:
+                pass
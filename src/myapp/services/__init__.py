@@ -1 +1,17 @@
 """Service registry — each subdirectory is an independent service."""
+
+from pathlib import Path
+
+
+def service_names(module: str = "cli") -> list[str]:
+    """Services that ship ``<module>.py``, found from the directory layout alone.
+
+    Nothing is imported here, so listing services stays cheap however
+    many of them there are.
+    """
+    names: set[str] = set()
+    for root in __path__:
+        for child in Path(root).iterdir():
+            if (child / "__init__.py").is_file() and (child / f"{module}.py").is_file():
+                names.add(child.name)
+    return sorted(names)
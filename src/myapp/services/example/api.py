@@ -4,78 +4,527 @@ Other services and the CLI should *only* import from this module.
 Never import internals (storage, etc.) from outside the service.
 """
 
+import asyncio
 import uuid
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
 
-from myapp.services.example.schemas import Item, ItemCreate
+from myapp.services.example.schemas import Item, ItemCreate, ItemUpdate
 from myapp.services.example.storage import ExampleJsonStore, ExampleSqliteStore
-from myapp.shared.persistence.base import BaseStore
+from myapp.shared.config import CACHE_SIZE, CACHE_TTL
+from myapp.shared.logging import get_logger
+from myapp.shared.metrics import instrumented
+from myapp.shared.persistence.async_store import AsyncBaseStore, AsyncJsonStore, AsyncSqliteStore
+from myapp.shared.persistence.base import BaseStore, ConflictError, Match
+from myapp.shared.persistence.cached_store import CachedStore
+from myapp.shared.persistence.query import Query
+from myapp.shared.persistence.snapshot import Compression, read_snapshot, write_snapshot
+from myapp.shared.persistence.validation import InvalidRecordError, validate_records
 from myapp.shared.schemas import ServiceResponse, utcnow
 
+logger = get_logger(__name__)
 
+# -- helpers shared by the sync and async facades ---------------------------
+
+# Read-modify-write attempts an unconditional update makes before giving up.
+UPDATE_ATTEMPTS = 5
+
+
+def _default_store() -> BaseStore[Item]:
+    """SQLite store, behind a read-through cache when ``MYAPP_CACHE_SIZE`` is set."""
+    store: BaseStore[Item] = ExampleSqliteStore()
+    if CACHE_SIZE > 0:
+        store = CachedStore(store, max_size=CACHE_SIZE, ttl=CACHE_TTL)
+    return store
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+def _new_item(data: ItemCreate) -> Item:
+    return Item(
+        id=data.id or uuid.uuid4().hex[:12],
+        name=data.name,
+        description=data.description,
+        tags=data.tags,
+        schema_version=data.schema_version,
+        created_at=utcnow(),
+        updated_at=utcnow(),
+    )
+
+
+def _updated_item(item: Item, changes: ItemUpdate) -> Item:
+    fields = changes.model_dump(exclude_unset=True, exclude_none=True)
+    return item.model_copy(update={**fields, "updated_at": utcnow()})
+
+
+def _search_query(
+    name: str | None,
+    name_prefix: str | None,
+    tags: Sequence[str],
+    created_after: datetime | None,
+    created_before: datetime | None,
+    order_by: str | None,
+    descending: bool,
+    limit: int | None,
+) -> Query:
+    query = Query(order_by=order_by, descending=descending, limit=limit)
+    if name is not None:
+        query = query.where("name", "eq", name)
+    if name_prefix:
+        query = query.where("name", "prefix", name_prefix)
+    for tag in tags:
+        query = query.where("tags", "contains", tag)
+    if created_after is not None:
+        query = query.where("created_at", "gte", _as_utc(created_after))
+    if created_before is not None:
+        query = query.where("created_at", "lt", _as_utc(created_before))
+    return query
+
+
+def _not_found(item_id: str) -> ServiceResponse:
+    return ServiceResponse(success=False, message="Not found", errors=[f"id={item_id}"])
+
+
+def _conflict_response(exc: ConflictError, message: str = "Version conflict") -> ServiceResponse:
+    return ServiceResponse(
+        success=False, message=message, errors=[str(exc)], version=exc.actual or None
+    )
+
+
+def _created_response(item: Item, *, generated_id: bool) -> ServiceResponse:
+    # A caller-chosen ID may have replaced an item at an unknown version.
+    return ServiceResponse(
+        success=True,
+        message="Item created",
+        data=item.model_dump(),
+        version=1 if generated_id else None,
+    )
+
+
+def _updated_response(item: Item, version: int) -> ServiceResponse:
+    return ServiceResponse(
+        success=True, message="Item updated", data=item.model_dump(), version=version
+    )
+
+
+def _items_response(items: list[Item]) -> ServiceResponse:
+    return ServiceResponse(
+        success=True,
+        data=[i.model_dump() for i in items],
+        message=f"{len(items)} item(s)",
+    )
+
+
+def _page_response(items: list[Item], limit: int) -> ServiceResponse:
+    next_after = items[-1].id if items and len(items) == limit else None
+    return ServiceResponse(
+        success=True,
+        data={"items": [i.model_dump() for i in items], "next_after": next_after},
+        message=f"{len(items)} item(s)",
+    )
+
+
+def _counts_response(counts: dict[Any, int]) -> ServiceResponse:
+    ordered = dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+    return ServiceResponse(success=True, data=ordered, message=f"{len(ordered)} tag(s)")
+
+
+def _export_response(count: int, path: str) -> ServiceResponse:
+    return ServiceResponse(
+        success=True,
+        message=f"Exported {count} item(s) to {path}",
+        data={"path": path, "count": count},
+    )
+
+
+def _import_response(count: int, source: str = "JSON") -> ServiceResponse:
+    return ServiceResponse(
+        success=True,
+        message=f"Imported {count} item(s) from {source}",
+        data={"count": count},
+    )
+
+
+def _invalid_record_response(exc: InvalidRecordError) -> ServiceResponse:
+    return ServiceResponse(
+        success=False,
+        message=f"Invalid item at record {exc.record}; nothing was imported",
+        data={"count": 0},
+        errors=[exc.detail],
+    )
+
+
+@instrumented("service")
 class ExampleService:
     """Facade that owns all example-service business logic."""
 
     def __init__(self, store: BaseStore[Item] | None = None) -> None:
-        self._store = store or ExampleSqliteStore()
+        self._store = store if store is not None else _default_store()
+
+    def close(self) -> None:
+        """Release the store's connections."""
+        self._store.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
 
     # -- CRUD --------------------------------------------------------------
 
     def create(self, data: ItemCreate) -> ServiceResponse:
-        item = Item(
-            id=data.id or uuid.uuid4().hex[:12],
-            name=data.name,
-            description=data.description,
-            tags=data.tags,
-            schema_version=data.schema_version,
-            created_at=utcnow(),
-            updated_at=utcnow(),
-        )
-        saved = self._store.save(item)
-        return ServiceResponse(success=True, message="Item created", data=saved.model_dump())
+        """Create an item; an item already stored under ``data.id`` is replaced.
+
+        ``version`` is 1 for a generated ID and None for a given one.
+        """
+        saved = self._store.save(_new_item(data))
+        return _created_response(saved, generated_id=not data.id)
 
     def get(self, item_id: str) -> ServiceResponse:
-        item = self._store.get(item_id)
-        if item is None:
-            return ServiceResponse(success=False, message="Not found", errors=[f"id={item_id}"])
-        return ServiceResponse(success=True, data=item.model_dump())
+        """Fetch an item; ``version`` is what :meth:`update` expects back."""
+        found = self._store.get_versioned(item_id)
+        if found is None:
+            return _not_found(item_id)
+        item, version = found
+        return ServiceResponse(success=True, data=item.model_dump(), version=version)
+
+    def update(
+        self, item_id: str, changes: ItemUpdate, *, expected_version: int | None = None
+    ) -> ServiceResponse:
+        """Apply ``changes`` to an item with a compare-and-swap save.
+
+        With ``expected_version`` (from :meth:`get`) the update fails with
+        a conflict if the item changed since. Without it, a concurrent
+        write makes the update re-read the item and apply ``changes``
+        again, up to :data:`UPDATE_ATTEMPTS` times.
+        """
+        attempts = UPDATE_ATTEMPTS if expected_version is None else 1
+        for _ in range(attempts):
+            found = self._store.get_versioned(item_id)
+            if found is None:
+                return _not_found(item_id)
+            item, version = found
+            expected = version if expected_version is None else expected_version
+            updated = _updated_item(item, changes)
+            try:
+                self._store.save(updated, expected_version=expected)
+            except ConflictError as exc:
+                logger.debug("Version conflict updating %s: %s", item_id, exc)
+                conflict = exc
+                continue
+            return _updated_response(updated, expected + 1)
+        return _conflict_response(conflict)
 
     def list_items(self) -> ServiceResponse:
-        items = self._store.list_all()
+        items = [i.model_dump() for i in self._store.iter_all()]
         return ServiceResponse(
             success=True,
-            data=[i.model_dump() for i in items],
+            data=items,
             message=f"{len(items)} item(s)",
         )
 
+    def list_page(self, after_id: str | None = None, limit: int = 100) -> ServiceResponse:
+        """Return one page of items ordered by ID (keyset pagination).
+
+        ``data["next_after"]`` is the ``after_id`` for the following page,
+        or None once the last page has been reached.
+        """
+        return _page_response(self._store.list_page(after_id=after_id, limit=limit), limit)
+
+    def iter_items(self) -> Iterator[dict]:
+        """Yield items one at a time without materializing the whole store."""
+        for item in self._store.iter_all():
+            yield item.model_dump()
+
+    def list_raw(self) -> Iterator[bytes]:
+        """Yield every item as compact UTF-8 JSON, exactly as stored.
+
+        Skips the parse/validate/dump round-trip; use it when items are only
+        written out again (CLI output, downloads, exports).
+        """
+        yield from self._store.iter_raw()
+
+    def search(
+        self,
+        *,
+        name: str | None = None,
+        name_prefix: str | None = None,
+        tags: Sequence[str] = (),
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> ServiceResponse:
+        """Find items matching every given filter. Naive datetimes are taken as UTC."""
+        query = _search_query(
+            name, name_prefix, tags, created_after, created_before, order_by, descending, limit
+        )
+        try:
+            items = self._store.find(query)
+        except ValueError as exc:
+            return ServiceResponse(success=False, message="Invalid query", errors=[str(exc)])
+        return _items_response(items)
+
     def delete(self, item_id: str) -> ServiceResponse:
         deleted = self._store.delete(item_id)
         if not deleted:
-            return ServiceResponse(success=False, message="Not found", errors=[f"id={item_id}"])
+            return _not_found(item_id)
         return ServiceResponse(success=True, message="Item deleted")
 
+    # -- Tags --------------------------------------------------------------
+
+    def by_tag(self, tag: str, limit: int | None = None) -> ServiceResponse:
+        """Return items carrying ``tag``, ordered by ID."""
+        return self.by_tags([tag], limit=limit)
+
+    def by_tags(
+        self, tags: Sequence[str], match: Match = "all", limit: int | None = None
+    ) -> ServiceResponse:
+        """Return items carrying all (``match="all"``) or any of ``tags``."""
+        return _items_response(self._store.find_by_values("tags", tags, match=match, limit=limit))
+
+    def tag_counts(self) -> ServiceResponse:
+        """Return ``{tag: item count}``, most used tags first."""
+        return _counts_response(self._store.value_counts("tags"))
+
     # -- Export / Import ---------------------------------------------------
 
-    def export_json(self) -> ServiceResponse:
-        """Export current store contents to the JSON backend."""
-        json_store = ExampleJsonStore()
-        items = self._store.list_all()
-        for item in items:
-            json_store.save(item)
-        path = str(json_store.path)
-        return ServiceResponse(
-            success=True,
-            message=f"Exported {len(items)} item(s) to {path}",
-            data={"path": path, "count": len(items)},
+    def export_json(self, path: Path | None = None) -> ServiceResponse:
+        """Export current store contents to the JSON backend (or the JSON file at ``path``)."""
+        json_store = ExampleJsonStore(path)
+        count = json_store.save_many_raw(self._store.iter_raw())
+        return _export_response(count, str(json_store.path))
+
+    def import_json(self, path: Path | None = None, *, workers: int = 1) -> ServiceResponse:
+        """Import items from the JSON backend (or the JSON file at ``path``).
+
+        Same pipeline and all-or-nothing semantics as :meth:`import_snapshot`.
+        """
+        return self._import_records(ExampleJsonStore(path).iter_raw(), "JSON", workers=workers)
+
+    def export_snapshot(
+        self,
+        path: Path,
+        *,
+        compression: Compression | None = None,
+        progress: Callable[[int], None] | None = None,
+    ) -> ServiceResponse:
+        """Stream every item to an NDJSON snapshot (gzip/xz by suffix or ``compression``).
+
+        ``progress`` is called with the running count every 1000 items.
+        """
+        count = write_snapshot(
+            path, self._store.iter_raw(), compression=compression, progress=progress
         )
+        return _export_response(count, str(path))
 
-    def import_json(self) -> ServiceResponse:
-        """Import items from the JSON backend into the current store."""
-        json_store = ExampleJsonStore()
-        items = json_store.list_all()
-        for item in items:
-            self._store.save(item)
-        return ServiceResponse(
-            success=True,
-            message=f"Imported {len(items)} item(s) from JSON",
-            data={"count": len(items)},
+    def import_snapshot(
+        self,
+        path: Path,
+        *,
+        compression: Compression | None = None,
+        chunk_size: int = 1000,
+        workers: int = 1,
+        progress: Callable[[int], None] | None = None,
+    ) -> ServiceResponse:
+        """Stream items from an NDJSON snapshot into the store.
+
+        Records are validated ``chunk_size`` at a time, across ``workers``
+        processes when ``workers > 1``, and written by a single
+        ``save_many_raw`` call (one transaction on SQLite). If any record
+        is invalid nothing is imported; the response says which one.
+        """
+        return self._import_records(
+            read_snapshot(path, compression=compression),
+            str(path),
+            chunk_size=chunk_size,
+            workers=workers,
+            progress=progress,
+        )
+
+    def _import_records(
+        self,
+        records: Iterable[bytes],
+        source: str,
+        *,
+        chunk_size: int = 1000,
+        workers: int = 1,
+        progress: Callable[[int], None] | None = None,
+    ) -> ServiceResponse:
+        validated = validate_records(
+            Item, records, workers=workers, chunk_size=chunk_size, progress=progress
         )
+        try:
+            count = self._store.save_many_raw(validated)
+        except InvalidRecordError as exc:
+            return _invalid_record_response(exc)
+        return _import_response(count, source)
+
+
+@instrumented("service")
+class AsyncExampleService:
+    """Asyncio twin of :class:`ExampleService` for use inside an event loop.
+
+    Methods and responses mirror the blocking facade one for one (except
+    the file-streaming snapshot methods); storage calls are awaited on an
+    :class:`AsyncBaseStore` instead.
+    """
+
+    def __init__(self, store: AsyncBaseStore[Item] | None = None) -> None:
+        self._store = store if store is not None else AsyncSqliteStore(ExampleSqliteStore())
+
+    async def close(self) -> None:
+        """Release the store's executor threads and connections."""
+        await self._store.close()
+
+    # -- CRUD --------------------------------------------------------------
+
+    async def create(self, data: ItemCreate) -> ServiceResponse:
+        """See :meth:`ExampleService.create`."""
+        saved = await self._store.save(_new_item(data))
+        return _created_response(saved, generated_id=not data.id)
+
+    async def get(self, item_id: str) -> ServiceResponse:
+        found = await self._store.get_versioned(item_id)
+        if found is None:
+            return _not_found(item_id)
+        item, version = found
+        return ServiceResponse(success=True, data=item.model_dump(), version=version)
+
+    async def update(
+        self, item_id: str, changes: ItemUpdate, *, expected_version: int | None = None
+    ) -> ServiceResponse:
+        """See :meth:`ExampleService.update`."""
+        attempts = UPDATE_ATTEMPTS if expected_version is None else 1
+        for _ in range(attempts):
+            found = await self._store.get_versioned(item_id)
+            if found is None:
+                return _not_found(item_id)
+            item, version = found
+            expected = version if expected_version is None else expected_version
+            updated = _updated_item(item, changes)
+            try:
+                await self._store.save(updated, expected_version=expected)
+            except ConflictError as exc:
+                logger.debug("Version conflict updating %s: %s", item_id, exc)
+                conflict = exc
+                continue
+            return _updated_response(updated, expected + 1)
+        return _conflict_response(conflict)
+
+    async def list_items(self) -> ServiceResponse:
+        return _items_response(await self._store.list_all())
+
+    async def list_page(self, after_id: str | None = None, limit: int = 100) -> ServiceResponse:
+        """See :meth:`ExampleService.list_page`."""
+        return _page_response(await self._store.list_page(after_id=after_id, limit=limit), limit)
+
+    async def iter_items(self) -> AsyncIterator[dict]:
+        """Yield items one page at a time."""
+        async for item in self._store.iter_all():
+            yield item.model_dump()
+
+    async def list_raw(self) -> AsyncIterator[bytes]:
+        """See :meth:`ExampleService.list_raw`."""
+        async for record in self._store.iter_raw():
+            yield record
+
+    async def search(
+        self,
+        *,
+        name: str | None = None,
+        name_prefix: str | None = None,
+        tags: Sequence[str] = (),
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+    ) -> ServiceResponse:
+        """See :meth:`ExampleService.search`."""
+        query = _search_query(
+            name, name_prefix, tags, created_after, created_before, order_by, descending, limit
+        )
+        try:
+            items = await self._store.find(query)
+        except ValueError as exc:
+            return ServiceResponse(success=False, message="Invalid query", errors=[str(exc)])
+        return _items_response(items)
+
+    async def delete(self, item_id: str) -> ServiceResponse:
+        deleted = await self._store.delete(item_id)
+        if not deleted:
+            return _not_found(item_id)
+        return ServiceResponse(success=True, message="Item deleted")
+
+    # -- Tags --------------------------------------------------------------
+
+    async def by_tag(self, tag: str, limit: int | None = None) -> ServiceResponse:
+        return await self.by_tags([tag], limit=limit)
+
+    async def by_tags(
+        self, tags: Sequence[str], match: Match = "all", limit: int | None = None
+    ) -> ServiceResponse:
+        items = await self._store.find_by_values("tags", tags, match=match, limit=limit)
+        return _items_response(items)
+
+    async def tag_counts(self) -> ServiceResponse:
+        return _counts_response(await self._store.value_counts("tags"))
+
+    # -- Export / Import ---------------------------------------------------
+
+    async def export_json(self, path: Path | None = None) -> ServiceResponse:
+        """See :meth:`ExampleService.export_json`."""
+        json_file = ExampleJsonStore(path)
+        async with AsyncJsonStore(json_file) as json_store:
+            count = await json_store.save_many_raw([r async for r in self._store.iter_raw()])
+        return _export_response(count, str(json_file.path))
+
+    async def import_json(self, path: Path | None = None, *, workers: int = 1) -> ServiceResponse:
+        """See :meth:`ExampleService.import_json`.
+
+        Records are read and validated off the event loop, then written in
+        one ``save_many_raw`` call.
+        """
+
+        def validated() -> list[bytes]:
+            records = ExampleJsonStore(path).iter_raw()
+            return list(validate_records(Item, records, workers=workers))
+
+        try:
+            records = await asyncio.get_running_loop().run_in_executor(None, validated)
+        except InvalidRecordError as exc:
+            return _invalid_record_response(exc)
+        return _import_response(await self._store.save_many_raw(records))
+
+
+# Served by ``project serve`` (see myapp.server.rpc). The RPC API has no
+# authentication, so the import/export methods, which read and write
+# server-side paths, are deliberately left out.
+SERVICE = ExampleService
+RPC_METHODS = (
+    "create",
+    "get",
+    "update",
+    "delete",
+    "list_items",
+    "list_page",
+    "iter_items",
+    "list_raw",
+    "search",
+    "by_tag",
+    "by_tags",
+    "tag_counts",
+)
@@ -1,98 +1,392 @@
 """CLI commands for the example service.
 
 Discovered automatically by the top-level CLI via the ``commands`` group.
+Heavy imports (the service, its schemas and stores) happen inside the
+commands: when ``project serve`` is running, commands on the SQLite
+backend call it instead and never need them.
 """
 
 import json
+import os
+import sys
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
 
 import click
+from pydantic_core import to_jsonable_python
 
-from myapp.services.example.api import ExampleService
-from myapp.services.example.schemas import ItemCreate
-from myapp.services.example.storage import ExampleJsonStore, ExampleSqliteStore
+from myapp.server.client import RpcError, connect_to_server
+from myapp.shared.config import JSON_DIR
+from myapp.shared.persistence.codecs import CODECS
 
+if TYPE_CHECKING:
+    from myapp.services.example.api import ExampleService
+    from myapp.shared.persistence.snapshot import Compression
+
+BACKENDS = ["sqlite", "json", "jsonl"]
+
+
+def _get_service(backend: str, *, remote: bool = True) -> "ExampleService":
+    """The service on ``backend``, or a proxy to the running server's (SQLite only).
+
+    Use it as a context manager: leaving the block closes the store, or
+    the connection to the server.
+    """
+    if remote and backend == "sqlite":
+        proxy = connect_to_server("example")
+        if proxy is not None:
+            return cast("ExampleService", proxy)
+
+    from myapp.services.example.api import ExampleService
+    from myapp.services.example.storage import (
+        ExampleJsonlStore,
+        ExampleJsonStore,
+        ExampleSqliteStore,
+    )
 
-def _get_service(backend: str) -> ExampleService:
     if backend == "json":
         return ExampleService(store=ExampleJsonStore())
+    if backend == "jsonl":
+        return ExampleService(store=ExampleJsonlStore())
     return ExampleService(store=ExampleSqliteStore())
 
 
-@click.group("example")
+def _dumps(value: object, *, indent: int | None = 2) -> str:
+    """``value`` as JSON, datetimes in ISO 8601 as the server sends them.
+
+    Local responses hold datetimes, routed ones their JSON strings: both
+    go through the same conversion so the output does not depend on
+    whether a server is running.
+    """
+    return json.dumps(to_jsonable_python(value), indent=indent)
+
+
+class _ExampleGroup(click.Group):
+    """Report errors from a routed call like any other command error."""
+
+    def invoke(self, ctx: click.Context) -> object:
+        try:
+            return super().invoke(ctx)
+        except (RpcError, ConnectionError) as exc:
+            raise click.ClickException(f"Server error: {exc}") from None
+
+
+@click.group("example", cls=_ExampleGroup)
 def commands() -> None:
     """Example service — manage items."""
 
 
 @commands.command("list")
-@click.option("--backend", type=click.Choice(["sqlite", "json"]), default="sqlite")
-def list_items(backend: str) -> None:
-    """List all items."""
-    svc = _get_service(backend)
-    resp = svc.list_items()
-    click.echo(json.dumps(resp.data, indent=2, default=str))
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite")
+@click.option("--limit", type=click.IntRange(min=1), default=None, help="Page size")
+@click.option("--after", "after_id", default=None, help="Return items after this ID")
+@click.option("--stream", is_flag=True, help="Write one JSON object per line as items are read")
+def list_items(backend: str, limit: int | None, after_id: str | None, stream: bool) -> None:
+    """List all items (or one page with --limit/--after)."""
+    with _get_service(backend) as svc:
+        if limit is not None or after_id is not None:
+            resp = svc.list_page(after_id=after_id, limit=limit or 100)
+            items = resp.data["items"]
+            if stream:
+                for item in items:
+                    click.echo(_dumps(item, indent=None))
+            else:
+                click.echo(_dumps(items))
+            if resp.data["next_after"] is not None:
+                click.echo(f"next page: --after {resp.data['next_after']}", err=True)
+            return
+        # Full listings pass the stored JSON bytes straight through.
+        if stream:
+            for record in svc.list_raw():
+                click.echo(record)
+            return
+        click.echo(b"[", nl=False)
+        for i, record in enumerate(svc.list_raw()):
+            click.echo((b",\n" if i else b"\n") + record, nl=False)
+        click.echo(b"\n]")
+
+
+@commands.command("find")
+@click.option("--name", default=None, help="Exact name")
+@click.option("--prefix", default=None, help="Name prefix")
+@click.option("--tag", multiple=True, help="Required tag (repeatable; all must match)")
+@click.option("--since", type=click.DateTime(), default=None, help="Created at or after (UTC)")
+@click.option("--until", type=click.DateTime(), default=None, help="Created before (UTC)")
+@click.option(
+    "--order-by",
+    type=click.Choice(["id", "name", "created_at", "updated_at"]),
+    default=None,
+)
+@click.option("--desc", is_flag=True, help="Sort descending")
+@click.option("--limit", type=click.IntRange(min=1), default=None)
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite")
+def find_items(
+    name: str | None,
+    prefix: str | None,
+    tag: tuple[str, ...],
+    since: datetime | None,
+    until: datetime | None,
+    order_by: str | None,
+    desc: bool,
+    limit: int | None,
+    backend: str,
+) -> None:
+    """Find items by name, tag and creation time."""
+    with _get_service(backend) as svc:
+        resp = svc.search(
+            name=name,
+            name_prefix=prefix,
+            tags=tag,
+            created_after=since,
+            created_before=until,
+            order_by=order_by,
+            descending=desc,
+            limit=limit,
+        )
+    if not resp.success:
+        raise click.ClickException("; ".join(resp.errors) or resp.message)
+    click.echo(_dumps(resp.data))
+
+
+@commands.command("tagged")
+@click.argument("tags", nargs=-1, required=True)
+@click.option("--any", "match_any", is_flag=True, help="Match any tag instead of all")
+@click.option("--limit", type=click.IntRange(min=1), default=None)
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite")
+def tagged_items(tags: tuple[str, ...], match_any: bool, limit: int | None, backend: str) -> None:
+    """List items carrying every TAG (or any, with --any)."""
+    with _get_service(backend) as svc:
+        resp = svc.by_tags(tags, match="any" if match_any else "all", limit=limit)
+    click.echo(_dumps(resp.data))
+
+
+@commands.command("tags")
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite")
+def tag_counts(backend: str) -> None:
+    """Show how many items carry each tag."""
+    with _get_service(backend) as svc:
+        resp = svc.tag_counts()
+    for tag, count in resp.data.items():
+        click.echo(f"{count:>8}  {tag}")
 
 
 @commands.command("get")
 @click.argument("item_id")
-@click.option("--backend", type=click.Choice(["sqlite", "json"]), default="sqlite")
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite")
 def get_item(item_id: str, backend: str) -> None:
     """Get a single item by ID."""
-    svc = _get_service(backend)
-    resp = svc.get(item_id)
+    with _get_service(backend) as svc:
+        resp = svc.get(item_id)
     if not resp.success:
         raise click.ClickException(resp.message)
-    click.echo(json.dumps(resp.data, indent=2, default=str))
+    click.echo(_dumps(resp.data))
+    click.echo(f"version: {resp.version}", err=True)
 
 
 @commands.command("add")
 @click.option("--name", required=True, help="Item name")
 @click.option("--description", default="", help="Item description")
 @click.option("--tag", multiple=True, help="Tag (repeatable)")
-@click.option("--backend", type=click.Choice(["sqlite", "json"]), default="sqlite")
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite")
 def add_item(name: str, description: str, tag: tuple[str, ...], backend: str) -> None:
     """Create a new item."""
-    svc = _get_service(backend)
+    from myapp.services.example.schemas import ItemCreate
+
     data = ItemCreate(name=name, description=description, tags=list(tag))
-    resp = svc.create(data)
+    with _get_service(backend) as svc:
+        resp = svc.create(data)
     if not resp.success:
         raise click.ClickException(resp.message)
     click.echo(f"Created: {resp.data['id']}")
 
 
+@commands.command("update")
+@click.argument("item_id")
+@click.option("--name", default=None, help="New name")
+@click.option("--description", default=None, help="New description")
+@click.option("--tag", multiple=True, help="Replace the tags (repeatable)")
+@click.option(
+    "--expected-version",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Fail if the item is no longer at this version (see `get`)",
+)
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite")
+def update_item(
+    item_id: str,
+    name: str | None,
+    description: str | None,
+    tag: tuple[str, ...],
+    expected_version: int | None,
+    backend: str,
+) -> None:
+    """Update an item's name, description or tags."""
+    from myapp.services.example.schemas import ItemUpdate
+
+    changes = ItemUpdate(name=name, description=description, tags=list(tag) if tag else None)
+    with _get_service(backend) as svc:
+        resp = svc.update(item_id, changes, expected_version=expected_version)
+    if not resp.success:
+        raise click.ClickException("; ".join([resp.message, *resp.errors]))
+    click.echo(f"Updated: {item_id} (version {resp.version})")
+
+
 @commands.command("delete")
 @click.argument("item_id")
-@click.option("--backend", type=click.Choice(["sqlite", "json"]), default="sqlite")
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite")
 def delete_item(item_id: str, backend: str) -> None:
     """Delete an item by ID."""
-    svc = _get_service(backend)
-    resp = svc.delete(item_id)
+    with _get_service(backend) as svc:
+        resp = svc.delete(item_id)
     if not resp.success:
         raise click.ClickException(resp.message)
     click.echo("Deleted.")
 
 
+FORMATS = ["json", "ndjson", "ndjson.gz", "ndjson.xz"]
+_FORMAT_COMPRESSION: "dict[str, Compression]" = {
+    "ndjson": "none",
+    "ndjson.gz": "gzip",
+    "ndjson.xz": "xz",
+}
+
+
+def _resolve_format(fmt: str | None, path: Path | None) -> str:
+    """Explicit ``--format`` wins; otherwise infer it from the file name."""
+    if fmt is not None:
+        return fmt
+    if path is None or path.suffix.lower() == ".json":
+        return "json"
+    from myapp.shared.persistence.snapshot import compression_for
+
+    compression = compression_for(path)
+    return next(f for f, c in _FORMAT_COMPRESSION.items() if c == compression)
+
+
+def _progress(verb: str) -> Callable[[int], None] | None:
+    """Running count on stderr, only when it is a terminal."""
+    if not sys.stderr.isatty():
+        return None
+    return lambda count: click.echo(f"\r{verb} {count:,} item(s)...", err=True, nl=False)
+
+
 @commands.command("export")
-def export_items() -> None:
-    """Export items from SQLite to a JSON snapshot."""
-    svc = ExampleService(store=ExampleSqliteStore())
-    resp = svc.export_json()
+@click.option("--backend", type=click.Choice(BACKENDS), default="sqlite", help="Store to export")
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(FORMATS),
+    default=None,
+    help="Snapshot format (default: from --output, else json)",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Snapshot file (default: the JSON store, or example_items.<format>)",
+)
+def export_items(backend: str, fmt: str | None, output: Path | None) -> None:
+    """Export items to a JSON store file or a streamed NDJSON snapshot."""
+    fmt = _resolve_format(fmt, output)
+    with _get_service(backend, remote=False) as svc:
+        if fmt == "json":
+            resp = svc.export_json(output)
+        else:
+            path = output or JSON_DIR / f"example_items.{fmt}"
+            progress = _progress("Exported")
+            resp = svc.export_snapshot(
+                path, compression=_FORMAT_COMPRESSION[fmt], progress=progress
+            )
+            if progress is not None:
+                click.echo(err=True)
     click.echo(resp.message)
 
 
 @commands.command("import")
 @click.option(
     "--target",
-    type=click.Choice(["sqlite", "json"]),
+    type=click.Choice(BACKENDS),
     default="sqlite",
-    help="Store to import INTO (source is always the JSON file)",
+    help="Store to import INTO",
+)
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(FORMATS),
+    default=None,
+    help="Snapshot format (default: from --input, else json)",
 )
-def import_items(target: str) -> None:
-    """Import items from JSON snapshot into a store."""
-    svc = _get_service(target)
-    resp = svc.import_json()
+@click.option(
+    "--input",
+    "input_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Snapshot file (default: the JSON store)",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Items validated per batch (NDJSON)",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="Validation processes (0 = one per CPU)",
+)
+def import_items(
+    target: str, fmt: str | None, input_path: Path | None, chunk_size: int, workers: int
+) -> None:
+    """Import items from a JSON store file or an NDJSON snapshot into a store.
+
+    Nothing is imported if any item is invalid.
+    """
+    fmt = _resolve_format(fmt, input_path)
+    workers = workers or os.cpu_count() or 1
+    with _get_service(target, remote=False) as svc:
+        if fmt == "json":
+            resp = svc.import_json(input_path, workers=workers)
+        else:
+            if input_path is None:
+                raise click.UsageError(f"--input is required for --format {fmt}")
+            progress = _progress("Imported")
+            resp = svc.import_snapshot(
+                input_path,
+                compression=_FORMAT_COMPRESSION[fmt],
+                chunk_size=chunk_size,
+                workers=workers,
+                progress=progress,
+            )
+            if progress is not None:
+                click.echo(err=True)
+    if not resp.success:
+        raise click.ClickException("; ".join([resp.message, *resp.errors]))
     click.echo(resp.message)
 
 
+@commands.command("migrate-codec")
+@click.option(
+    "--codec",
+    type=click.Choice(CODECS),
+    default=None,
+    help="Encoding to convert to (default: MYAPP_SQLITE_CODEC)",
+)
+def migrate_codec(codec: str | None) -> None:
+    """Re-encode every SQLite row with the given codec."""
+    from myapp.services.example.storage import ExampleSqliteStore
+
+    with ExampleSqliteStore(codec=codec) as store:
+        rows, before, after = store.migrate_codec()
+        name = store.codec
+    change = f" ({after / before - 1:+.0%})" if before else ""
+    click.echo(f"Rewrote {rows} item(s) as {name}: {before:,} -> {after:,} bytes of data{change}")
+
+
 @commands.command("schema")
 def show_schema() -> None:
     """Print the Item JSON schema."""
@@ -4,7 +4,7 @@ Every service defines its own I/O models here.
 These schemas are the *only* types that cross the service boundary.
 """
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 from myapp.shared.schemas import BaseRecord
 
@@ -22,3 +22,11 @@ class ItemCreate(Item):
 
     id: str = Field(default="")  # allow caller to omit; API fills it in
     schema_version: int = 1
+
+
+class ItemUpdate(BaseModel):
+    """Input model for updating an item; fields left out are kept as they are."""
+
+    name: str | None = Field(default=None, min_length=1, max_length=200)
+    description: str | None = None
+    tags: list[str] | None = None
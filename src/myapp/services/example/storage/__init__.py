@@ -1,6 +1,7 @@
 """Storage adapters for the example service."""
 
 from myapp.services.example.storage.json_adapter import ExampleJsonStore
+from myapp.services.example.storage.jsonl_adapter import ExampleJsonlStore
 from myapp.services.example.storage.sqlite_adapter import ExampleSqliteStore
 
-__all__ = ["ExampleJsonStore", "ExampleSqliteStore"]
+__all__ = ["ExampleJsonStore", "ExampleJsonlStore", "ExampleSqliteStore"]
@@ -3,7 +3,7 @@
 from pathlib import Path
 
 from myapp.services.example.schemas import Item
-from myapp.shared.config import JSON_DIR
+from myapp.shared.config import JSON_DIR, TRUSTED_READS
 from myapp.shared.persistence.json_store import JsonStore
 
 DEFAULT_PATH = JSON_DIR / "example_items.json"
@@ -13,4 +13,6 @@ class ExampleJsonStore(JsonStore[Item]):
     """Concrete JSON store for example items."""
 
     def __init__(self, path: Path | None = None) -> None:
-        super().__init__(path or DEFAULT_PATH, Item)
+        super().__init__(
+            path or DEFAULT_PATH, Item, indexed_fields=("tags",), trusted_reads=TRUSTED_READS
+        )
@@ -0,0 +1,16 @@
+"""JSON Lines persistence adapter for the example service."""
+
+from pathlib import Path
+
+from myapp.services.example.schemas import Item
+from myapp.shared.config import JSON_DIR, TRUSTED_READS
+from myapp.shared.persistence.jsonl_store import JsonlStore
+
+DEFAULT_PATH = JSON_DIR / "example_items.jsonl"
+
+
+class ExampleJsonlStore(JsonlStore[Item]):
+    """Concrete append-only JSONL store for example items."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        super().__init__(path or DEFAULT_PATH, Item, trusted_reads=TRUSTED_READS)
@@ -3,14 +3,39 @@
 from pathlib import Path
 
 from myapp.services.example.schemas import Item
-from myapp.shared.config import DEFAULT_DB_PATH
+from myapp.shared.config import (
+    DEFAULT_DB_PATH,
+    SQLITE_CODEC,
+    SQLITE_COMMIT_BATCH,
+    SQLITE_COMMIT_DELAY,
+    SQLITE_GROUP_COMMIT,
+    SQLITE_PRAGMAS,
+    SQLITE_PROFILE,
+    TRUSTED_READS,
+)
+from myapp.shared.persistence.profiles import parse_pragmas
 from myapp.shared.persistence.sqlite_store import SqliteStore
 
 TABLE_NAME = "example_items"
 
+# Fields looked up by ExampleService.search and friends.
+INDEXED_FIELDS = ("name", "tags", "created_at")
+
 
 class ExampleSqliteStore(SqliteStore[Item]):
     """Concrete SQLite store for example items."""
 
-    def __init__(self, db_path: Path | None = None) -> None:
-        super().__init__(db_path or DEFAULT_DB_PATH, TABLE_NAME, Item)
+    def __init__(self, db_path: Path | None = None, *, codec: str | None = None) -> None:
+        super().__init__(
+            db_path or DEFAULT_DB_PATH,
+            TABLE_NAME,
+            Item,
+            profile=SQLITE_PROFILE,
+            pragmas=parse_pragmas(SQLITE_PRAGMAS),
+            indexed_fields=INDEXED_FIELDS,
+            trusted_reads=TRUSTED_READS,
+            codec=codec or SQLITE_CODEC,
+            group_commit=SQLITE_GROUP_COMMIT,
+            commit_batch=SQLITE_COMMIT_BATCH,
+            commit_delay=SQLITE_COMMIT_DELAY,
+        )
@@ -0,0 +1,18 @@
+"""Fixtures for the example service tests."""
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture()
+def example_data(data_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point the example stores' default files (and exports) into ``data_dir``."""
+    from myapp.services.example import cli
+    from myapp.services.example.storage import json_adapter, jsonl_adapter, sqlite_adapter
+
+    monkeypatch.setattr(json_adapter, "DEFAULT_PATH", data_dir / "json" / "example_items.json")
+    monkeypatch.setattr(jsonl_adapter, "DEFAULT_PATH", data_dir / "json" / "example_items.jsonl")
+    monkeypatch.setattr(sqlite_adapter, "DEFAULT_DB_PATH", data_dir / "db" / "myapp.db")
+    monkeypatch.setattr(cli, "JSON_DIR", data_dir / "json")
+    return data_dir
@@ -1,12 +1,18 @@
 """Tests for the example service public API."""
 
+import asyncio
+from collections.abc import Iterator
 from pathlib import Path
 
 import pytest
 
-from myapp.services.example.api import ExampleService
-from myapp.services.example.schemas import Item, ItemCreate
+from myapp.services.example.api import AsyncExampleService, ExampleService
+from myapp.services.example.schemas import Item, ItemCreate, ItemUpdate
+from myapp.shared.persistence import ConflictError
+from myapp.shared.persistence.async_store import AsyncJsonStore, AsyncSqliteStore
 from myapp.shared.persistence.json_store import JsonStore
+from myapp.shared.persistence.pool import ConnectionPool
+from myapp.shared.persistence.sqlite_store import SqliteStore
 
 
 @pytest.fixture()
@@ -45,6 +51,46 @@ class TestExampleService:
         assert resp.success
         assert len(resp.data) == 2
 
+    def test_list_page(self, svc: ExampleService) -> None:
+        for name in "ABC":
+            svc.create(ItemCreate(id=name.lower(), name=name))
+        first = svc.list_page(limit=2)
+        assert [i["id"] for i in first.data["items"]] == ["a", "b"]
+        assert first.data["next_after"] == "b"
+        last = svc.list_page(after_id="b", limit=2)
+        assert [i["id"] for i in last.data["items"]] == ["c"]
+        assert last.data["next_after"] is None
+
+    def test_iter_items(self, svc: ExampleService) -> None:
+        svc.create(ItemCreate(name="A"))
+        assert [i["name"] for i in svc.iter_items()] == ["A"]
+
+    def test_list_raw(self, svc: ExampleService) -> None:
+        svc.create(ItemCreate(id="a", name="Ä"))
+        (record,) = list(svc.list_raw())
+        assert Item.model_validate_json(record).name == "Ä"
+        assert record == Item.model_validate_json(record).model_dump_json().encode()
+
+    def test_search(self, svc: ExampleService) -> None:
+        svc.create(ItemCreate(id="a", name="Apple", tags=["fruit"]))
+        svc.create(ItemCreate(id="b", name="Avocado", tags=["fruit", "green"]))
+        svc.create(ItemCreate(id="c", name="Carrot", tags=["veg"]))
+        resp = svc.search(name_prefix="A", tags=["fruit"], order_by="name", descending=True)
+        assert resp.success
+        assert [i["id"] for i in resp.data] == ["b", "a"]
+
+    def test_search_rejects_unknown_order(self, svc: ExampleService) -> None:
+        resp = svc.search(order_by="nope")
+        assert not resp.success
+
+    def test_tags(self, svc: ExampleService) -> None:
+        svc.create(ItemCreate(id="a", name="A", tags=["x", "y"]))
+        svc.create(ItemCreate(id="b", name="B", tags=["y"]))
+        assert [i["id"] for i in svc.by_tag("y").data] == ["a", "b"]
+        assert [i["id"] for i in svc.by_tags(["x", "y"]).data] == ["a"]
+        assert [i["id"] for i in svc.by_tags(["x", "z"], match="any").data] == ["a"]
+        assert svc.tag_counts().data == {"y": 2, "x": 1}
+
     def test_delete_item(self, svc: ExampleService) -> None:
         create_resp = svc.create(ItemCreate(name="Gone"))
         item_id = create_resp.data["id"]
@@ -56,6 +102,48 @@ class TestExampleService:
         resp = svc.delete("nope")
         assert not resp.success
 
+    def test_create_with_a_taken_id_replaces(self, svc: ExampleService) -> None:
+        assert svc.create(ItemCreate(name="Generated")).version == 1
+        assert svc.create(ItemCreate(id="dup", name="First")).version is None
+        assert svc.create(ItemCreate(id="dup", name="Second")).success
+        got = svc.get("dup")
+        assert (got.data["name"], got.version) == ("Second", 2)
+
+    def test_update_with_expected_version(self, svc: ExampleService) -> None:
+        svc.create(ItemCreate(id="u", name="Old", tags=["x"]))
+        assert svc.get("u").version == 1
+        resp = svc.update("u", ItemUpdate(name="New"), expected_version=1)
+        assert resp.success and resp.version == 2
+        assert resp.data["name"] == "New" and resp.data["tags"] == ["x"]
+
+        stale = svc.update("u", ItemUpdate(name="Stale"), expected_version=1)
+        assert not stale.success
+        assert stale.message == "Version conflict"
+        assert stale.version == 2
+        assert svc.get("u").data["name"] == "New"
+
+        latest = svc.update("u", ItemUpdate(tags=[]))
+        assert latest.version == 3 and latest.data["tags"] == []
+        assert not svc.update("nope", ItemUpdate(name="X")).success
+
+    def test_update_retries_after_concurrent_write(self, svc: ExampleService) -> None:
+        svc.create(ItemCreate(id="r", name="Start"))
+        store = svc._store
+        original = store.save
+        attempts: list[int | None] = []
+
+        def racing_save(item: Item, *, expected_version: int | None = None) -> Item:
+            if not attempts:  # another writer gets in between our read and our write
+                original(Item(id="r", name="Start", description="theirs"))
+            attempts.append(expected_version)
+            return original(item, expected_version=expected_version)
+
+        store.save = racing_save  # type: ignore[method-assign]
+        resp = svc.update("r", ItemUpdate(name="Mine"))
+        assert resp.success and resp.version == 3
+        assert resp.data["name"] == "Mine" and resp.data["description"] == "theirs"
+        assert attempts == [1, 2]
+
 
 class TestExportImport:
     def test_export_and_import(self, tmp_path: Path) -> None:
@@ -81,3 +169,217 @@ class TestExportImport:
         resp = dst_svc.get("e1")
         assert resp.success
         assert resp.data["name"] == "Export me"
+
+    @pytest.mark.parametrize("name", ["snap.ndjson", "snap.ndjson.gz", "snap.ndjson.xz"])
+    def test_snapshot_round_trip(self, tmp_path: Path, name: str) -> None:
+        src = ExampleService(store=SqliteStore(tmp_path / "src.db", "items", Item))
+        for i in range(25):
+            src.create(ItemCreate(id=f"{i:03}", name=f"N{i}", tags=["t"]))
+        seen: list[int] = []
+        resp = src.export_snapshot(tmp_path / name, progress=seen.append)
+        assert resp.data["count"] == 25
+        assert seen[-1] == 25
+
+        dst = ExampleService(store=JsonStore(tmp_path / "dst.json", Item))
+        resp = dst.import_snapshot(tmp_path / name, chunk_size=10, progress=seen.append)
+        assert resp.success
+        assert resp.data["count"] == 25
+        assert seen[-3:] == [10, 20, 25]
+        assert dst.get("007").data == src.get("007").data
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_snapshot_import_is_all_or_nothing(self, tmp_path: Path, workers: int) -> None:
+        path = tmp_path / "bad.ndjson"
+        good = Item(id="a", name="A").model_dump_json()
+        path.write_text(f'{good}\n\n{{"id": "b"}}\n')
+        svc = ExampleService(store=SqliteStore(tmp_path / "dst.db", "items", Item))
+        resp = svc.import_snapshot(path, chunk_size=1, workers=workers)
+        assert not resp.success
+        assert "record 2" in resp.message
+        assert resp.data["count"] == 0
+        assert not svc.get("a").success
+
+    def test_parallel_snapshot_import(self, tmp_path: Path) -> None:
+        src = ExampleService(store=SqliteStore(tmp_path / "src.db", "items", Item))
+        for i in range(50):
+            src.create(ItemCreate(id=f"{i:03}", name=f"N{i}", tags=[f"t{i % 3}"]))
+        src.export_snapshot(tmp_path / "snap.ndjson")
+
+        dst = ExampleService(store=SqliteStore(tmp_path / "dst.db", "items", Item))
+        resp = dst.import_snapshot(tmp_path / "snap.ndjson", chunk_size=7, workers=2)
+        assert resp.success
+        assert resp.data["count"] == 50
+        assert sorted(i["id"] for i in dst.list_items().data) == [f"{i:03}" for i in range(50)]
+        assert len(dst.by_tag("t1").data) == 17
+
+
+class TestAsyncExampleService:
+    def test_crud_and_queries(self, tmp_path: Path) -> None:
+        async def scenario() -> None:
+            store = AsyncSqliteStore(
+                SqliteStore(tmp_path / "a.db", "items", Item, indexed_fields=["tags"])
+            )
+            svc = AsyncExampleService(store=store)
+            created = await asyncio.gather(
+                *(svc.create(ItemCreate(id=f"{i:02}", name=f"N{i}", tags=["t"])) for i in range(20))
+            )
+            assert all(r.success for r in created)
+            assert (await svc.get("03")).data["name"] == "N3"
+            assert len((await svc.list_items()).data) == 20
+            assert len((await svc.by_tag("t")).data) == 20
+            assert [i["id"] async for i in svc.iter_items()][:2] == ["00", "01"]
+            assert (await svc.search(name="N5")).data[0]["id"] == "05"
+            assert len([record async for record in svc.list_raw()]) == 20
+            updated = await svc.update("04", ItemUpdate(name="M4"), expected_version=1)
+            assert updated.version == 2
+            assert not (await svc.update("04", ItemUpdate(name="X"), expected_version=1)).success
+            assert (await svc.create(ItemCreate(id="04", name="Dup"))).success
+            assert (await svc.get("04")).version == 3
+            assert (await svc.delete("03")).success
+            assert not (await svc.get("03")).success
+            await svc.close()
+
+        asyncio.run(scenario())
+
+    def test_readers_leave_a_connection_for_the_writer(self, tmp_path: Path) -> None:
+        async def scenario(pool_size: int) -> None:
+            pool = ConnectionPool(tmp_path / "p.db", max_size=pool_size, timeout=0.5)
+            async with AsyncSqliteStore(
+                SqliteStore(tmp_path / "p.db", "items", Item, pool=pool)
+            ) as store:
+                readers = store._reader._max_workers if store._reader else 0
+                assert readers + 1 == pool_size
+                await asyncio.gather(
+                    *(store.save(Item(id=f"{i}", name="N")) for i in range(10)),
+                    *(store.list_all() for _ in range(20)),
+                )
+                assert len(await store.list_all()) == 10
+            pool.close()
+
+        asyncio.run(scenario(1))
+        asyncio.run(scenario(3))
+
+    def test_json_backend(self, tmp_path: Path) -> None:
+        async def scenario() -> None:
+            async with AsyncJsonStore(JsonStore(tmp_path / "a.json", Item)) as store:
+                svc = AsyncExampleService(store=store)
+                await asyncio.gather(*(svc.create(ItemCreate(name=f"N{i}")) for i in range(10)))
+                assert len((await svc.list_page(limit=100)).data["items"]) == 10
+
+        asyncio.run(scenario())
+
+    def test_export_and_import_json_paths(self, tmp_path: Path) -> None:
+        path = tmp_path / "export.json"
+
+        async def scenario() -> None:
+            async with AsyncSqliteStore(SqliteStore(tmp_path / "a.db", "items", Item)) as store:
+                src = AsyncExampleService(store=store)
+                await asyncio.gather(*(src.create(ItemCreate(name=f"N{i}")) for i in range(5)))
+                exported = await src.export_json(path)
+                assert exported.data == {"path": str(path), "count": 5}
+            async with AsyncSqliteStore(SqliteStore(tmp_path / "b.db", "items", Item)) as store:
+                dst = AsyncExampleService(store=store)
+                assert (await dst.import_json(path, workers=1)).data["count"] == 5
+                assert len((await dst.list_items()).data) == 5
+
+        asyncio.run(scenario())
+
+
+@pytest.fixture()
+def recording() -> Iterator[None]:
+    from myapp.shared import metrics
+
+    metrics.REGISTRY.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.REGISTRY.reset()
+
+
+def _calls(method: str, owner: str) -> int:
+    from myapp.shared import metrics
+
+    return sum(
+        row.calls
+        for row in metrics.summarize(metrics.REGISTRY.snapshot())
+        if row.owner == owner and row.method == method
+    )
+
+
+class TestMetrics:
+    def test_disabled_by_default_leaves_methods_alone(self) -> None:
+        assert not hasattr(SqliteStore.get, "__metrics_original__")
+        assert not hasattr(ExampleService.create, "__metrics_original__")
+
+    def test_records_store_and_service_calls(self, tmp_path: Path, recording: None) -> None:
+        from myapp.shared import metrics
+
+        store = SqliteStore(tmp_path / "m.db", "items", Item)
+        svc = ExampleService(store=store)
+        svc.create(ItemCreate(id="a", name="A"))
+        svc.get("a")
+        svc.get("missing")
+        assert len(list(store.iter_all())) == 1
+        assert _calls("create", "ExampleService") == 1
+        assert _calls("get", "ExampleService") == 2
+        assert _calls("get_versioned", "SqliteStore") == 2
+        assert _calls("iter_all", "SqliteStore") == 1
+        text = metrics.prometheus_text(metrics.REGISTRY.snapshot())
+        assert "# TYPE myapp_store_seconds histogram" in text
+        assert 'myapp_service_seconds_count{method="get",service="ExampleService"} 2' in text
+        store.close()
+
+    def test_streaming_methods_time_the_whole_stream(self, tmp_path: Path, recording: None) -> None:
+        from myapp.shared import metrics
+
+        store = SqliteStore(tmp_path / "m.db", "items", Item)
+        store.save_many(Item(id=f"{i:04}", name="N") for i in range(2000))
+        svc = ExampleService(store=store)
+        assert sum(1 for _ in svc.list_raw()) == 2000
+        totals = {
+            row.owner: row.total
+            for row in metrics.summarize(metrics.REGISTRY.snapshot())
+            if row.method in ("list_raw", "iter_raw")
+        }
+        assert totals["ExampleService"] >= totals["SqliteStore"] > 0
+        store.close()
+
+    def test_counts_errors(self, tmp_path: Path, recording: None) -> None:
+        from myapp.shared import metrics
+
+        store = JsonStore(tmp_path / "m.json", Item)
+        with pytest.raises(ConflictError):
+            store.save(Item(id="a", name="A"), expected_version=3)
+        [row] = [r for r in metrics.summarize(metrics.REGISTRY.snapshot()) if r.method == "save"]
+        assert (row.calls, row.errors) == (1, 1)
+
+    def test_disable_restores_originals(self, recording: None) -> None:
+        from myapp.shared import metrics
+
+        assert hasattr(SqliteStore.get, "__metrics_original__")
+        metrics.disable()
+        assert not hasattr(SqliteStore.get, "__metrics_original__")
+        assert not hasattr(JsonStore.save, "__metrics_original__")
+
+    def test_quantile(self) -> None:
+        from myapp.shared.metrics import Histogram
+
+        hist = Histogram(bounds=(1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0):
+            hist.observe(value)
+        assert hist.quantile(0.5) == pytest.approx(1.5)
+        assert hist.quantile(1.0) == 4.0
+
+    def test_dump_merges_runs(self, tmp_path: Path, recording: None) -> None:
+        import json
+
+        from myapp.shared import metrics
+
+        svc = ExampleService(store=JsonStore(tmp_path / "m.json", Item))
+        svc.get("x")
+        metrics.dump(tmp_path / "metrics")
+        metrics.dump(tmp_path / "metrics")
+        snapshot = json.loads((tmp_path / "metrics" / "metrics.json").read_text())
+        [row] = [r for r in metrics.summarize(snapshot) if r.owner == "ExampleService"]
+        assert row.calls == 2
+        assert "myapp_service_seconds_bucket" in (tmp_path / "metrics" / "metrics.prom").read_text()
@@ -1,20 +1,27 @@
 """Tests for the example service CLI wiring."""
 
+from pathlib import Path
+
+import pytest
 from click.testing import CliRunner
 
 from myapp.cli.main import cli
 
 
+@pytest.fixture(autouse=True)
+def _isolated(example_data: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep commands on temporary stores, even if a real server is running."""
+    monkeypatch.setattr("myapp.server.client.SERVER_ROUTING", False)
+
+
 class TestExampleCLI:
-    def test_svc_example_list(self, tmp_path, monkeypatch) -> None:  # type: ignore[no-untyped-def]
+    def test_svc_example_list(self) -> None:
         """``project svc example list`` should run without error."""
-        monkeypatch.setenv("MYAPP_DB_DIR", str(tmp_path))
         runner = CliRunner()
         result = runner.invoke(cli, ["svc", "example", "list", "--backend", "json"])
         assert result.exit_code == 0
 
-    def test_svc_example_add_and_list(self, tmp_path, monkeypatch) -> None:  # type: ignore[no-untyped-def]
-        monkeypatch.setenv("MYAPP_DB_DIR", str(tmp_path))
+    def test_svc_example_add_and_list(self, example_data: Path) -> None:
         runner = CliRunner()
         # add an item
         result = runner.invoke(
@@ -22,6 +29,72 @@ class TestExampleCLI:
         )
         assert result.exit_code == 0
         assert "Created:" in result.output
+        assert (example_data / "json" / "example_items.json").exists()
+
+    def test_svc_example_update(self) -> None:
+        runner = CliRunner()
+        base = ["svc", "example"]
+        added = runner.invoke(cli, [*base, "add", "--name", "Before", "--backend", "json"])
+        item_id = added.output.split("Created:")[1].strip()
+        update = [*base, "update", item_id, "--name", "After", "--backend", "json"]
+        result = runner.invoke(cli, [*update, "--expected-version", "1"])
+        assert result.exit_code == 0, result.output
+        assert f"Updated: {item_id} (version 2)" in result.output
+        stale = runner.invoke(cli, [*update, "--expected-version", "1"])
+        assert stale.exit_code != 0
+        assert "Version conflict" in stale.output
+
+    def test_commands_close_the_service(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        from myapp.services.example.api import ExampleService
+
+        closed: list[ExampleService] = []
+        close = ExampleService.close
+
+        def recording_close(svc: ExampleService) -> None:
+            closed.append(svc)
+            close(svc)
+
+        monkeypatch.setattr(ExampleService, "close", recording_close)
+        runner = CliRunner()
+        for args in (["add", "--name", "A"], ["list"], ["get", "missing"]):
+            runner.invoke(cli, ["svc", "example", *args, "--backend", "sqlite"])
+        assert len(closed) == 3
+
+    def test_svc_example_jsonl_backend(self) -> None:
+        runner = CliRunner()
+        result = runner.invoke(cli, ["svc", "example", "list", "--backend", "jsonl"])
+        assert result.exit_code == 0
+
+    def test_svc_example_list_paged_and_streamed(self) -> None:
+        runner = CliRunner()
+        for args in (["--limit", "5"], ["--stream"], ["--limit", "5", "--stream"]):
+            result = runner.invoke(cli, ["svc", "example", "list", "--backend", "json", *args])
+            assert result.exit_code == 0, result.output
+
+    def test_svc_example_list_is_valid_json(self) -> None:
+        import json
+
+        runner = CliRunner()
+        runner.invoke(cli, ["svc", "example", "add", "--name", "Raw", "--backend", "json"])
+        result = runner.invoke(cli, ["svc", "example", "list", "--backend", "json"])
+        assert result.exit_code == 0
+        assert "Raw" in [item["name"] for item in json.loads(result.output)]
+        streamed = runner.invoke(cli, ["svc", "example", "list", "--backend", "json", "--stream"])
+        assert all(json.loads(line)["id"] for line in streamed.output.splitlines())
+
+    def test_svc_example_find(self) -> None:
+        runner = CliRunner()
+        result = runner.invoke(
+            cli,
+            ["svc", "example", "find", "--tag", "x", "--since", "2020-01-01", "--backend", "json"],
+        )
+        assert result.exit_code == 0, result.output
+
+    def test_svc_example_tags(self) -> None:
+        runner = CliRunner()
+        for args in (["tagged", "x", "--any"], ["tags"]):
+            result = runner.invoke(cli, ["svc", "example", *args, "--backend", "json"])
+            assert result.exit_code == 0, result.output
 
     def test_svc_example_schema(self) -> None:
         runner = CliRunner()
@@ -33,8 +106,186 @@ class TestExampleCLI:
         runner = CliRunner()
         result = runner.invoke(cli, ["doctor"])
         assert "Environment check" in result.output
+        assert "synchronous          FULL" in result.output  # durable profile
 
     def test_version_flag(self) -> None:
         runner = CliRunner()
         result = runner.invoke(cli, ["--version"])
         assert "0.1.0" in result.output
+
+
+class TestSnapshotCLI:
+    def test_export_import_ndjson(self, tmp_path: Path) -> None:
+        snapshot = tmp_path / "items.ndjson.gz"
+        runner = CliRunner()
+        runner.invoke(cli, ["svc", "example", "add", "--name", "Snap", "--backend", "json"])
+        result = runner.invoke(
+            cli, ["svc", "example", "export", "--backend", "json", "--output", str(snapshot)]
+        )
+        assert result.exit_code == 0, result.output
+        assert snapshot.read_bytes()[:2] == b"\x1f\x8b"  # gzip magic
+
+        result = runner.invoke(
+            cli,
+            [
+                "svc",
+                "example",
+                "import",
+                "--target",
+                "json",
+                "--input",
+                str(snapshot),
+                "--workers",
+                "2",
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        assert "Imported" in result.output
+
+    def test_ndjson_import_requires_input(self) -> None:
+        result = CliRunner().invoke(
+            cli, ["svc", "example", "import", "--target", "json", "--format", "ndjson"]
+        )
+        assert result.exit_code != 0
+        assert "--input is required" in result.output
+
+
+class TestBenchCLI:
+    def test_bench_writes_results_and_flags_regressions(self, tmp_path: Path) -> None:
+        import json
+        from dataclasses import replace
+
+        from myapp.benchmarks.harness import load_results, write_results
+
+        output = tmp_path / "latest.json"
+        baseline = tmp_path / "baseline.json"
+        args = ["bench", "--suite", "stores", "--suite", "transfer", "--sizes", "20", "--ops", "5"]
+        runner = CliRunner()
+        result = runner.invoke(
+            cli, [*args, "--output", str(output), "--baseline", str(baseline), "--save-baseline"]
+        )
+        assert result.exit_code == 0, result.output
+        payload = json.loads(output.read_text())
+        names = {r["name"] for r in payload["results"]}
+        assert {"json.get", "sqlite.save", "jsonl.list", "export.json", "import.ndjson"} <= names
+        assert baseline.exists()
+
+        # A baseline that is impossibly fast makes every benchmark a regression.
+        fast = [replace(r, ops_per_sec=r.ops_per_sec * 100) for r in load_results(baseline)]
+        write_results(baseline, fast)
+        result = runner.invoke(cli, [*args, "--output", str(output), "--baseline", str(baseline)])
+        assert result.exit_code == 1
+        assert "REGRESSION stores/json.get/20" in result.output
+
+    def test_bench_rejects_bad_sizes(self) -> None:
+        result = CliRunner().invoke(cli, ["bench", "--sizes", "1k"])
+        assert result.exit_code != 0
+        assert "comma-separated integers" in result.output
+
+
+class TestCLIStartup:
+    """Guard cold-start cost: top-level commands must not import any service."""
+
+    def _imported_after(self, args: list[str]) -> set[str]:
+        import json
+        import subprocess
+        import sys
+
+        script = (
+            "import json, sys\n"
+            "from myapp.cli.main import cli\n"
+            "try:\n"
+            f"    cli({args!r})\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print(json.dumps(sorted(sys.modules)))\n"
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True
+        )
+        return set(json.loads(proc.stdout.splitlines()[-1]))
+
+    def test_version_imports_no_service_or_pydantic(self) -> None:
+        modules = self._imported_after(["--version"])
+        assert "pydantic" not in modules
+        assert not any(m.startswith("myapp.services.") for m in modules)
+
+    def test_svc_subcommand_imports_its_service(self) -> None:
+        modules = self._imported_after(["svc", "example", "--help"])
+        assert "myapp.services.example.cli" in modules
+
+    def test_svc_lists_services_lazily(self) -> None:
+        result = CliRunner().invoke(cli, ["svc", "--help"])
+        assert result.exit_code == 0
+        assert "example" in result.output
+
+
+class TestMetricsCommand:
+    def test_shows_recorded_calls(self, tmp_path: Path) -> None:
+        from myapp.shared import metrics
+
+        registry = metrics.Registry(enabled=True)
+        hist = registry.histogram("myapp_store_seconds", "t", store="SqliteStore", method="get_all")
+        hist.observe(0.002)
+        metrics.dump(tmp_path, registry)
+        result = CliRunner().invoke(cli, ["metrics", "--input", str(tmp_path)])
+        assert result.exit_code == 0
+        assert "SqliteStore.get_all" in result.output
+        prom = CliRunner().invoke(
+            cli, ["metrics", "--input", str(tmp_path), "--format", "prometheus"]
+        )
+        assert "myapp_store_seconds_count" in prom.output
+        reset = CliRunner().invoke(cli, ["metrics", "--input", str(tmp_path), "--reset"])
+        assert reset.exit_code == 0
+        assert not (tmp_path / "metrics.json").exists()
+
+    def test_missing_metrics(self, tmp_path: Path) -> None:
+        result = CliRunner().invoke(cli, ["metrics", "--input", str(tmp_path)])
+        assert result.exit_code != 0
+        assert "MYAPP_METRICS=1" in result.output
+
+
+class TestProfilingOptions:
+    def test_profile_and_trace_alloc_write_reports(self, tmp_path: Path) -> None:
+        import pstats
+
+        out = tmp_path / "profiles"
+        result = CliRunner().invoke(
+            cli,
+            ["--profile", "--trace-alloc", "--profile-dir", str(out)]
+            + ["svc", "example", "list", "--backend", "json"],
+        )
+        assert result.exit_code == 0
+        assert "Profile written to" in result.stderr
+        assert "peak traced memory" in result.stderr
+        [stats_file] = out.glob("svc-*.pstats")
+        assert pstats.Stats(str(stats_file)).stats  # type: ignore[attr-defined]
+        [alloc_file] = out.glob("svc-*.alloc.txt")
+        assert alloc_file.read_text().startswith("peak traced memory:")
+
+    def test_without_options_writes_nothing(self, tmp_path: Path) -> None:
+        result = CliRunner().invoke(
+            cli, ["--profile-dir", str(tmp_path / "p"), "metrics", "--help"]
+        )
+        assert result.exit_code == 0
+        assert not (tmp_path / "p").exists()
+
+
+class TestLoggingOptions:
+    def test_json_debug_logs_on_stderr(self) -> None:
+        import json
+
+        result = CliRunner().invoke(
+            cli,
+            ["--log-level", "debug", "--log-format", "json"]
+            + ["svc", "example", "add", "--name", "Logged", "--backend", "jsonl"],
+        )
+        assert result.exit_code == 0
+        lines = [json.loads(line) for line in result.stderr.splitlines() if line.startswith("{")]
+        assert any(line["message"].startswith("Appended ") for line in lines)
+
+    def test_invalid_env_levels(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr("myapp.shared.logging.LOG_LEVELS", "example")
+        result = CliRunner().invoke(cli, ["run"])
+        assert result.exit_code != 0
+        assert "Invalid logging configuration" in result.output
@@ -3,7 +3,7 @@
 import pytest
 from pydantic import ValidationError
 
-from myapp.services.example.schemas import Item, ItemCreate
+from myapp.services.example.schemas import Item, ItemCreate, ItemUpdate
 
 
 class TestItem:
@@ -45,3 +45,12 @@ class TestItemCreate:
     def test_explicit_id(self) -> None:
         ic = ItemCreate(id="custom", name="Custom")
         assert ic.id == "custom"
+
+
+class TestItemUpdate:
+    def test_fields_are_optional(self) -> None:
+        assert ItemUpdate().model_dump(exclude_none=True) == {}
+
+    def test_name_still_validated(self) -> None:
+        with pytest.raises(ValidationError):
+            ItemUpdate(name="")
@@ -0,0 +1,418 @@
+"""Tests for serving the example service over RPC (``project serve``)."""
+
+import http.client
+import json
+import os
+import signal
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Iterator
+from contextlib import nullcontext
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+from click.testing import CliRunner
+
+from myapp.cli.main import cli
+from myapp.server import client as client_module
+from myapp.server.client import (
+    RemoteResponse,
+    RpcError,
+    ServiceClient,
+    connect_to_server,
+    discover,
+)
+from myapp.server.httpd import (
+    RpcServer,
+    host_name,
+    is_loopback,
+    listen,
+    make_server,
+    serve,
+    socket_url,
+)
+from myapp.server.rpc import Dispatcher, ServedService, served_services
+from myapp.server.workers import Supervisor
+from myapp.services.example.api import RPC_METHODS, ExampleService
+from myapp.services.example.schemas import Item, ItemCreate, ItemUpdate
+from myapp.shared.persistence.sqlite_store import SqliteStore
+
+
+def _start(server: RpcServer, discovery: Path) -> threading.Thread:
+    ready = threading.Event()
+    thread = threading.Thread(
+        target=serve,
+        args=(server,),
+        kwargs={"discovery": discovery, "ready": lambda _: ready.set()},
+        daemon=True,
+    )
+    thread.start()
+    assert ready.wait(5)
+    return thread
+
+
+@pytest.fixture()
+def dispatcher(tmp_path: Path) -> Dispatcher:
+    store = SqliteStore(tmp_path / "served.db", "items", Item)
+    return Dispatcher({"example": ExampleService(store=store)}, {"example": RPC_METHODS})
+
+
+@pytest.fixture()
+def server(dispatcher: Dispatcher, tmp_path: Path) -> Iterator[RpcServer]:
+    server = make_server(dispatcher, port=0)
+    thread = _start(server, tmp_path / "server.json")
+    yield server
+    server.shutdown()
+    thread.join(5)
+
+
+@pytest.fixture()
+def client(server: RpcServer) -> Iterator[ServiceClient]:
+    with ServiceClient(server.url) as client:
+        yield client
+
+
+class TestDispatcher:
+    def test_describe_lists_the_allowed_methods(self, dispatcher: Dispatcher) -> None:
+        assert dispatcher.describe() == {"example": sorted(RPC_METHODS)}
+
+    def test_path_taking_methods_are_not_served(self, dispatcher: Dispatcher) -> None:
+        for method in ("export_json", "import_json", "export_snapshot", "import_snapshot"):
+            with pytest.raises(RpcError) as excinfo:
+                dispatcher.call("example", method, b'{"args":["/tmp/x.ndjson"]}')
+            assert excinfo.value.status == 404
+
+    def test_allowlist_must_name_sync_public_methods(self, tmp_path: Path) -> None:
+        service = ExampleService(store=SqliteStore(tmp_path / "s.db", "items", Item))
+        for method in ("_store", "nope", "SERVICE"):
+            with pytest.raises(ValueError):
+                Dispatcher({"example": service}, {"example": [method]})
+        service.close()
+
+    def test_arguments_are_validated_against_hints(self, dispatcher: Dispatcher) -> None:
+        created = json.loads(dispatcher.call("example", "create", b'{"args":[{"name":"A"}]}'))
+        assert created["type"] == "response"
+        assert created["result"]["data"]["name"] == "A"
+        with pytest.raises(RpcError) as excinfo:
+            dispatcher.call("example", "create", b'{"args":[{"tags":"x"}]}')
+        assert excinfo.value.status == 400
+
+    def test_unknown_service_and_method(self, dispatcher: Dispatcher) -> None:
+        for service, method in (("nope", "get"), ("example", "nope"), ("example", "_store")):
+            with pytest.raises(RpcError) as excinfo:
+                dispatcher.call(service, method, b"{}")
+            assert excinfo.value.status == 404
+
+    @pytest.mark.usefixtures("example_data")
+    def test_served_services(self) -> None:
+        served = served_services(["example"])
+        assert served["example"].methods == frozenset(RPC_METHODS)
+        dispatcher = Dispatcher.build(served)
+        assert isinstance(dispatcher.services["example"], ExampleService)
+        dispatcher.close()
+
+
+class TestServiceClient:
+    def test_round_trip(self, client: ServiceClient) -> None:
+        example = client.service("example")
+        created = example.create(ItemCreate(id="a", name="Alpha", tags=["x"]))
+        assert isinstance(created, RemoteResponse)
+        assert created.success and example.get("a").version == 1
+        assert example.get("a").data["name"] == "Alpha"
+        updated = example.update("a", ItemUpdate(name="Beta"), expected_version=1)
+        assert updated.version == 2
+        stale = example.update("a", ItemUpdate(name="Gamma"), expected_version=1)
+        assert not stale.success
+        assert not example.get("missing").success
+
+    def test_raw_records_and_datetimes(self, client: ServiceClient) -> None:
+        example = client.service("example")
+        example.create(ItemCreate(id="a", name="Alpha", tags=["x"]))
+        example.create(ItemCreate(id="b", name="Beta"))
+        records = [json.loads(record) for record in example.list_raw()]
+        assert [record["id"] for record in records] == ["a", "b"]
+        since = datetime.now(UTC) - timedelta(minutes=1)
+        found = example.search(tags=["x"], created_after=since)
+        assert [item["id"] for item in found.data] == ["a"]
+
+    def test_errors_are_raised(self, client: ServiceClient) -> None:
+        with pytest.raises(RpcError) as excinfo:
+            client.call("example", "get")
+        assert excinfo.value.status == 400
+        with pytest.raises(RpcError) as excinfo:
+            client.call("example", "nope")
+        assert excinfo.value.kind == "unknown_method"
+
+    def test_health_and_describe(self, server: RpcServer, client: ServiceClient) -> None:
+        health = client.health()
+        assert health["pid"] == os.getpid()
+        assert health["services"] == ["example"]
+        with urllib.request.urlopen(f"{server.url}/rpc") as response:
+            assert "get" in json.load(response)["example"]
+
+    def _post(self, server: RpcServer, headers: dict[str, str]) -> int:
+        url = urlsplit(server.url)
+        conn = http.client.HTTPConnection(url.hostname or "", url.port, timeout=5)
+        try:
+            conn.request("POST", "/rpc/example/create", b'{"args":[{"name":"A"}]}', headers)
+            return conn.getresponse().status
+        finally:
+            conn.close()
+
+    def test_only_json_posts_are_accepted(self, server: RpcServer) -> None:
+        assert self._post(server, {"Content-Type": "text/plain"}) == 415
+        assert self._post(server, {}) == 415
+        json_type = {"Content-Type": "application/json; charset=utf-8"}
+        assert self._post(server, json_type) == 200
+        assert len(server.dispatcher.services["example"].list_items().data) == 1
+
+    def test_only_loopback_hosts_are_accepted(self, server: RpcServer) -> None:
+        json_type = {"Content-Type": "application/json"}
+        assert self._post(server, {**json_type, "Host": "evil.example:8765"}) == 403
+        for host in ("localhost:1", "127.0.0.1", "[::1]:8765"):
+            assert self._post(server, {**json_type, "Host": host}) == 200
+        assert host_name("[::1]:80") == "::1" and host_name("::1") == "::1"
+        request = urllib.request.Request(f"{server.url}/health", headers={"Host": "evil.example"})
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(request)
+        assert excinfo.value.code == 403
+
+    def test_reconnects_after_the_server_closes_the_connection(self) -> None:
+        listener = socket.create_server(("127.0.0.1", 0))
+        body = b'{"type":"value","result":1}'
+        answer = b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+        closed = threading.Event()
+
+        def answer_once_per_connection() -> None:
+            for _ in range(2):
+                conn, _ = listener.accept()
+                conn.recv(65536)
+                conn.sendall(answer)
+                conn.close()
+                closed.set()
+
+        thread = threading.Thread(target=answer_once_per_connection, daemon=True)
+        thread.start()
+        with ServiceClient(socket_url(listener), timeout=5) as client:
+            assert client.call("example", "create", {"name": "A"}) == 1
+            assert closed.wait(5)
+            assert client.call("example", "create", {"name": "B"}) == 1
+        thread.join(5)
+        listener.close()
+
+    def test_a_sent_call_is_not_repeated(self) -> None:
+        listener = socket.create_server(("127.0.0.1", 0))
+        with ServiceClient(socket_url(listener), timeout=5) as client:
+            client.connect()
+            conn, _ = listener.accept()
+            listener.setblocking(False)
+
+            def read_and_hang_up() -> None:
+                conn.recv(65536)
+                conn.close()
+
+            thread = threading.Thread(target=read_and_hang_up)
+            thread.start()
+            # The call may have run, but its answer is lost: it is not sent again.
+            with pytest.raises(ConnectionError):
+                client.call("example", "create", {"name": "A"})
+            thread.join(5)
+            with pytest.raises(BlockingIOError):
+                listener.accept()
+        listener.close()
+
+    @pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+    def test_unix_socket(self, dispatcher: Dispatcher, tmp_path: Path) -> None:
+        path = tmp_path / "rpc.sock"
+        server = make_server(dispatcher, socket_path=path)
+        thread = _start(server, tmp_path / "server.json")
+        try:
+            with ServiceClient(server.url) as client:
+                assert client.call("example", "create", ItemCreate(name="Sock")).success
+        finally:
+            server.shutdown()
+            thread.join(5)
+        assert not path.exists()
+
+
+class TestDiscovery:
+    def test_announced_while_serving(self, server: RpcServer, tmp_path: Path) -> None:
+        info = discover(tmp_path / "server.json")
+        assert info is not None and info["url"] == server.url
+        assert connect_to_server("example", tmp_path / "server.json") is not None
+        assert connect_to_server("other", tmp_path / "server.json") is None
+
+    def test_proxy_closes_its_connection(self, server: RpcServer, tmp_path: Path) -> None:
+        proxy = connect_to_server("example", tmp_path / "server.json")
+        assert proxy is not None
+        with proxy:
+            assert proxy.list_page(limit=1).success
+            assert proxy._client._conn is not None
+        assert proxy._client._conn is None
+
+    def test_withdrawn_on_shutdown(self, dispatcher: Dispatcher, tmp_path: Path) -> None:
+        server = make_server(dispatcher, port=0)
+        thread = _start(server, tmp_path / "server.json")
+        server.shutdown()
+        thread.join(5)
+        assert not (tmp_path / "server.json").exists()
+
+    def test_stale_file_is_ignored(self, tmp_path: Path) -> None:
+        path = tmp_path / "server.json"
+        path.write_text(json.dumps({"url": "http://127.0.0.1:1", "pid": 0, "services": []}))
+        assert discover(path) is None
+        assert connect_to_server("example", path) is None
+
+    def test_routing_off(
+        self, server: RpcServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(client_module, "SERVER_ROUTING", False)
+        assert connect_to_server("example", tmp_path / "server.json") is None
+
+
+class TestCliRouting:
+    @pytest.mark.usefixtures("example_data")
+    def test_commands_use_the_server(
+        self, server: RpcServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        discovery = tmp_path / "server.json"
+        monkeypatch.setattr(
+            "myapp.services.example.cli.connect_to_server",
+            lambda service: connect_to_server(service, discovery),
+        )
+        runner = CliRunner()
+        added = runner.invoke(cli, ["svc", "example", "add", "--name", "Routed"])
+        assert added.exit_code == 0, added.output
+        item_id = added.output.split("Created:")[1].strip()
+        # The item lives in the server's store, not the default database.
+        assert server.dispatcher.services["example"].get(item_id).success
+        got = runner.invoke(cli, ["svc", "example", "get", item_id])
+        assert got.exit_code == 0, got.output
+        assert "Routed" in got.output
+        listed = runner.invoke(cli, ["svc", "example", "list"])
+        assert [item["id"] for item in json.loads(listed.output)] == [item_id]
+
+    def test_output_does_not_depend_on_routing(
+        self, server: RpcServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        discovery = tmp_path / "server.json"
+        service = server.dispatcher.services["example"]
+        item_id = service.create(ItemCreate(name="Alpha", tags=["x"])).data["id"]
+        commands = [
+            ["get", item_id],
+            ["find", "--prefix", "Al"],
+            ["tagged", "x"],
+            ["list", "--limit", "5"],
+            ["list", "--limit", "5", "--stream"],
+        ]
+        runner = CliRunner()
+
+        def outputs() -> list[str]:
+            results = [runner.invoke(cli, ["svc", "example", *args]) for args in commands]
+            assert all(result.exit_code == 0 for result in results)
+            return [result.stdout for result in results]
+
+        monkeypatch.setattr(
+            "myapp.services.example.cli.connect_to_server",
+            lambda name: connect_to_server(name, discovery),
+        )
+        routed = outputs()
+        # The server's own service: the commands must not close it.
+        monkeypatch.setattr(
+            "myapp.services.example.cli._get_service",
+            lambda backend, remote=True: nullcontext(service),
+        )
+        local = outputs()
+        assert routed == local
+        assert json.loads(local[0])["created_at"].endswith("Z")
+
+    def test_serve_refuses_a_public_host(self) -> None:
+        result = CliRunner().invoke(cli, ["serve", "--host", "0.0.0.0", "--port", "0"])
+        assert result.exit_code != 0
+        assert "--allow-remote" in result.output
+        assert is_loopback("localhost") and is_loopback("127.0.0.1") and is_loopback("::1")
+        assert not is_loopback("0.0.0.0") and not is_loopback("example.com")
+
+
+def _served_example(db_path: Path) -> ExampleService:
+    return ExampleService(store=SqliteStore(db_path, "items", Item))
+
+
+def _served(db_path: Path) -> ServedService:
+    return ServedService(partial(_served_example, db_path), frozenset(RPC_METHODS))
+
+
+class TestWorkers:
+    @pytest.fixture()
+    def supervisor(self, tmp_path: Path) -> Iterator[Supervisor]:
+        supervisor = Supervisor(
+            listen(port=0),
+            {"example": _served(tmp_path / "shared.db")},
+            workers=2,
+        )
+        thread = threading.Thread(
+            target=supervisor.run, kwargs={"discovery": tmp_path / "server.json"}, daemon=True
+        )
+        thread.start()
+        yield supervisor
+        supervisor.stop()
+        thread.join(30)
+
+    def test_workers_share_socket_and_database(self, supervisor: Supervisor) -> None:
+        with ServiceClient(supervisor.url) as client:
+            assert client.call("example", "create", {"id": "a", "name": "Alpha"}).success
+        pids = set()
+        for _ in range(10):
+            # A new connection each time, accepted by whichever worker wins it.
+            with ServiceClient(supervisor.url) as client:
+                assert client.call("example", "get", "a").data["name"] == "Alpha"
+                pids.add(client.health()["pid"])
+        assert pids <= {process.pid for process in supervisor.processes}
+        assert os.getpid() not in pids
+
+    def test_dead_worker_is_restarted(self, supervisor: Supervisor) -> None:
+        with ServiceClient(supervisor.url) as client:
+            victim = client.health()["pid"]
+        os.kill(victim, signal.SIGKILL)
+        deadline = time.monotonic() + 30
+        while supervisor.restarts == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert supervisor.restarts == 1
+        assert len(supervisor.processes) == 2
+        assert victim not in {process.pid for process in supervisor.processes}
+        with ServiceClient(supervisor.url) as client:
+            assert client.health()["pid"] != victim
+
+    @pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+    def test_stop_cleans_up(self, tmp_path: Path) -> None:
+        path = tmp_path / "rpc.sock"
+        discovery = tmp_path / "server.json"
+        supervisor = Supervisor(
+            listen(socket_path=path),
+            {"example": _served(tmp_path / "shared.db")},
+            workers=2,
+        )
+        started = threading.Event()
+        thread = threading.Thread(
+            target=supervisor.run,
+            kwargs={"discovery": discovery, "ready": lambda _: started.set()},
+            daemon=True,
+        )
+        thread.start()
+        assert started.wait(30)
+        with ServiceClient(supervisor.url) as client:
+            assert client.call("example", "create", {"name": "Sock"}).success
+        assert discover(discovery) is not None
+        processes = list(supervisor.processes)
+        supervisor.stop()
+        thread.join(30)
+        assert not any(process.is_alive() for process in processes)
+        assert all(process.exitcode == 0 for process in processes)
+        assert not path.exists()
+        assert not discovery.exists()
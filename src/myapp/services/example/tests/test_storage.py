@@ -1,11 +1,38 @@
 """Tests for JSON and SQLite storage backends."""
 
+import io
+import json
+import logging
+import sqlite3
+import subprocess
+import sys
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
 import pytest
 
 from myapp.services.example.schemas import Item
+from myapp.shared.logging import (
+    DebugSampler,
+    configure_logging,
+    get_logger,
+    lazy,
+    parse_levels,
+    shutdown_logging,
+)
+from myapp.shared.persistence.base import BaseStore, ConflictError
+from myapp.shared.persistence.cached_store import CachedStore
+from myapp.shared.persistence.decoding import RecordDecoder
+from myapp.shared.persistence.group_commit import GroupCommitWriter
 from myapp.shared.persistence.json_store import JsonStore
+from myapp.shared.persistence.jsonl_store import JsonlStore
+from myapp.shared.persistence.pool import ConnectionPool
+from myapp.shared.persistence.profiles import effective_settings, parse_pragmas
+from myapp.shared.persistence.query import Query
 from myapp.shared.persistence.sqlite_store import SqliteStore
 
 
@@ -13,6 +40,314 @@ def _make_item(id: str = "t1", name: str = "Test") -> Item:
     return Item(id=id, name=name, description="desc", tags=["a"])
 
 
+def _walk_pages(store: BaseStore[Item], limit: int) -> list[str]:
+    seen: list[str] = []
+    after: str | None = None
+    while page := store.list_page(after_id=after, limit=limit):
+        seen.extend(i.id for i in page)
+        after = page[-1].id
+    return seen
+
+
+@pytest.fixture(
+    params=["json", "json-trusted", "jsonl", "sqlite", "sqlite-indexed", "sqlite-compact"]
+)
+def any_store(request: pytest.FixtureRequest, tmp_path: Path) -> Iterator[BaseStore[Item]]:
+    """Each concrete backend, for behaviour every store must share."""
+    store: BaseStore[Item]
+    if request.param == "json":
+        store = JsonStore(tmp_path / "items.json", Item)
+    elif request.param == "json-trusted":
+        store = JsonStore(tmp_path / "items.json", Item, trusted_reads=True)
+    elif request.param == "jsonl":
+        store = JsonlStore(tmp_path / "items.jsonl", Item)
+    elif request.param == "sqlite-indexed":
+        fields = ["name", "tags", "created_at"]
+        store = SqliteStore(tmp_path / "items.db", "items", Item, indexed_fields=fields)
+    elif request.param == "sqlite-compact":
+        fields = ["name", "tags"]
+        store = SqliteStore(
+            tmp_path / "items.db", "items", Item, indexed_fields=fields, codec="compact-zlib"
+        )
+    else:
+        store = SqliteStore(tmp_path / "items.db", "items", Item)
+    with store:
+        yield store
+
+
+# ── shared behaviour ──────────────────────────────────────────────────
+
+
+class TestStreamingAndPaging:
+    def test_iter_all_yields_everything(self, any_store: BaseStore[Item]) -> None:
+        any_store.save_many(_make_item(f"{i:03}") for i in range(25))
+        assert sorted(i.id for i in any_store.iter_all()) == [f"{i:03}" for i in range(25)]
+
+    def test_list_page_walks_in_id_order(self, any_store: BaseStore[Item]) -> None:
+        ids = [f"{i:03}" for i in range(25)]
+        any_store.save_many(_make_item(i) for i in reversed(ids))
+        assert _walk_pages(any_store, limit=7) == ids
+
+    def test_list_page_after_unknown_id(self, any_store: BaseStore[Item]) -> None:
+        any_store.save_many(_make_item(i) for i in ["a", "c", "e"])
+        assert [i.id for i in any_store.list_page(after_id="b", limit=10)] == ["c", "e"]
+
+
+class TestRawRecords:
+    def test_iter_raw_matches_models(self, any_store: BaseStore[Item]) -> None:
+        any_store.save_many(_make_item(f"{i:03}", name=f"ñ{i}") for i in range(5))
+        raw = sorted(any_store.iter_raw())
+        models = sorted(i.model_dump_json().encode() for i in any_store.iter_all())
+        assert raw == models
+
+    def test_json_save_many_raw(self, tmp_path: Path) -> None:
+        source = SqliteStore(tmp_path / "src.db", "items", Item)
+        source.save_many(_make_item(f"{i:03}") for i in range(5))
+        target = JsonStore(tmp_path / "out.json", Item, indexed_fields=["tags"])
+        target.save(_make_item("keep"))
+        assert target.save_many_raw(source.iter_raw()) == 5
+        assert len(target.list_all()) == 6
+        assert target.get("001") == source.get("001")
+        assert target.value_counts("tags") == {"a": 6}
+        source.close()
+
+    def test_save_many_raw(self, any_store: BaseStore[Item]) -> None:
+        items = [_make_item(f"{i:03}") for i in range(5)]
+        assert any_store.save_many_raw(i.model_dump_json().encode() for i in items) == 5
+        assert any_store.get("002") == items[2]
+        assert len(any_store.find_by_values("tags", ["a"])) == 5
+
+    def test_sqlite_save_many_raw_is_atomic(self, tmp_path: Path) -> None:
+        store = SqliteStore(tmp_path / "items.db", "items", Item, indexed_fields=["tags"])
+
+        def records() -> Iterator[bytes]:
+            yield _make_item("ok").model_dump_json().encode()
+            raise ValueError("bad record")
+
+        with pytest.raises(ValueError):
+            store.save_many_raw(records())
+        assert store.list_all() == []
+        assert store.value_counts("tags") == {}
+        store.close()
+
+
+class TestVersions:
+    def test_compare_and_swap(self, any_store: BaseStore[Item]) -> None:
+        item = _make_item()
+        any_store.save(item, expected_version=0)
+        any_store.save(item)
+        assert any_store.get_versioned("t1") == (item, 2)
+        with pytest.raises(ConflictError) as info:
+            any_store.save(_make_item(name="Stale"), expected_version=1)
+        assert (info.value.expected, info.value.actual) == (1, 2)
+        with pytest.raises(ConflictError):
+            any_store.save(item, expected_version=0)
+        any_store.save(_make_item(name="Fresh"), expected_version=2)
+        found = any_store.get_versioned("t1")
+        assert found is not None and found[0].name == "Fresh" and found[1] == 3
+
+    def test_bulk_writes_and_deletes(self, any_store: BaseStore[Item]) -> None:
+        any_store.save_many([_make_item("a"), _make_item("b")])
+        any_store.save_many_raw([_make_item("a").model_dump_json()])
+        assert [any_store.get_versioned(i)[1] for i in "ab"] == [2, 1]  # type: ignore[index]
+        any_store.delete("a")
+        assert any_store.get_versioned("a") is None
+        with pytest.raises(ConflictError) as info:
+            any_store.save(_make_item("a"), expected_version=2)
+        assert info.value.actual == 0
+        any_store.save(_make_item("a"), expected_version=0)
+        assert any_store.get_versioned("a")[1] == 1  # type: ignore[index]
+
+    @pytest.mark.parametrize("kind", ["json", "jsonl"])
+    def test_file_writers_do_not_lose_updates(self, tmp_path: Path, kind: str) -> None:
+        """Two store objects on one file stand in for two processes."""
+
+        def open_store() -> BaseStore[Item]:
+            if kind == "json":
+                return JsonStore(tmp_path / "shared.json", Item)
+            return JsonlStore(tmp_path / "shared.jsonl", Item)
+
+        stores = [open_store(), open_store()]
+        stores[0].save(_make_item("counter", "0"))
+
+        def increment(store: BaseStore[Item]) -> None:
+            while True:
+                found = store.get_versioned("counter")
+                assert found is not None
+                item, version = found
+                bumped = item.model_copy(update={"name": str(int(item.name) + 1)})
+                try:
+                    store.save(bumped, expected_version=version)
+                    return
+                except ConflictError:
+                    continue
+
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(increment, stores * 20))
+        found = open_store().get_versioned("counter")
+        assert found is not None
+        assert (found[0].name, found[1]) == ("40", 41)
+
+    def test_versions_survive_reopen_and_compaction(self, tmp_path: Path) -> None:
+        item = _make_item()
+        store = JsonlStore(tmp_path / "v.jsonl", Item)
+        for _ in range(3):
+            store.save(item)
+        store.compact()
+        assert JsonlStore(tmp_path / "v.jsonl", Item).get_versioned("t1") == (item, 3)
+
+    def test_json_file_without_versions(self, tmp_path: Path) -> None:
+        import json
+
+        item = _make_item()
+        path = tmp_path / "old.json"
+        path.write_text(json.dumps({"t1": item.model_dump(mode="json")}))
+        store = JsonStore(path, Item)
+        assert store.get_versioned("t1") == (item, 1)
+        store.save(item, expected_version=1)
+        assert JsonStore(path, Item).get_versioned("t1") == (item, 2)
+
+    def test_json_versions_live_outside_the_data_file(self, tmp_path: Path) -> None:
+        import json
+
+        path = tmp_path / "items.json"
+        store = JsonStore(path, Item)
+        reserved = _make_item("__versions__")
+        store.save(reserved)
+        item = _make_item("t1")
+        store.save(item)
+        store.save(item)
+        assert set(json.loads(path.read_text())) == {"__versions__", "t1"}
+        reopened = JsonStore(path, Item)
+        assert reopened.get_versioned("__versions__") == (reserved, 1)
+        assert reopened.get_versioned("t1") == (item, 2)
+
+    def test_json_file_with_legacy_versions_key(self, tmp_path: Path) -> None:
+        import json
+
+        item = _make_item()
+        path = tmp_path / "old.json"
+        path.write_text(json.dumps({"t1": item.model_dump(mode="json"), "__versions__": {"t1": 4}}))
+        store = JsonStore(path, Item)
+        assert store.list_all() == [item]
+        store.save(item, expected_version=4)
+        assert list(json.loads(path.read_text())) == ["t1"]
+        assert JsonStore(path, Item).get_versioned("t1") == (item, 5)
+
+    def test_sqlite_table_without_version_column(self, tmp_path: Path) -> None:
+        item = _make_item()
+        path = tmp_path / "old.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE items (id TEXT PRIMARY KEY, data TEXT NOT NULL,"
+                " created_at TEXT DEFAULT CURRENT_TIMESTAMP,"
+                " updated_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+            )
+            conn.execute("INSERT INTO items (id, data) VALUES ('t1', ?)", (item.model_dump_json(),))
+        conn.close()
+        with SqliteStore(path, "items", Item) as store:
+            assert store.get_versioned("t1") == (item, 1)
+            store.save(item, expected_version=1)
+            assert store.get_versioned("t1") == (item, 2)
+
+    def test_group_commit_conflict_fails_its_future(self, tmp_path: Path) -> None:
+        item = _make_item()
+        with SqliteStore(tmp_path / "g.db", "items", Item, group_commit=True) as store:
+            store.save(item)
+            stale = store.submit_save(_make_item("t1", "Stale"), expected_version=5)
+            fresh = store.submit_save(_make_item("t2"), expected_version=0)
+            with pytest.raises(ConflictError):
+                stale.result()
+            assert fresh.result().id == "t2"
+            assert store.get_versioned("t1") == (item, 1)
+
+
+class TestFind:
+    @pytest.fixture()
+    def store(self, any_store: BaseStore[Item]) -> BaseStore[Item]:
+        base = datetime(2026, 1, 1, tzinfo=UTC)
+        any_store.save_many(
+            [
+                Item(id="1", name="alpha", tags=["x", "y"], created_at=base),
+                Item(id="2", name="alpine", tags=["y"], created_at=base + timedelta(days=1)),
+                Item(id="3", name="beta", tags=["x"], created_at=base + timedelta(days=2)),
+                Item(id="4", name="Alps", created_at=base + timedelta(days=3, microseconds=5)),
+            ]
+        )
+        return any_store
+
+    def _ids(self, store: BaseStore[Item], query: Query) -> list[str]:
+        return [i.id for i in store.find(query)]
+
+    def test_eq_and_prefix(self, store: BaseStore[Item]) -> None:
+        assert self._ids(store, Query().where("name", "eq", "beta")) == ["3"]
+        q = Query().where("name", "prefix", "alp").order("id")
+        assert self._ids(store, q) == ["1", "2"]  # prefix is case-sensitive
+
+    def test_tag_contains(self, store: BaseStore[Item]) -> None:
+        q = Query().where("tags", "contains", "x").where("tags", "contains", "y")
+        assert self._ids(store, q) == ["1"]
+
+    def test_created_at_range(self, store: BaseStore[Item]) -> None:
+        base = datetime(2026, 1, 1, tzinfo=UTC)
+        q = (
+            Query()
+            .where("created_at", "gte", base + timedelta(days=1))
+            .where("created_at", "lt", base + timedelta(days=3, microseconds=5))
+            .order("created_at")
+        )
+        assert self._ids(store, q) == ["2", "3"]
+
+    def test_order_and_limit(self, store: BaseStore[Item]) -> None:
+        q = Query().order("created_at", descending=True).take(2)
+        assert self._ids(store, q) == ["4", "3"]
+
+    def test_unknown_field_rejected(self, store: BaseStore[Item]) -> None:
+        with pytest.raises(ValueError):
+            store.find(Query().where("nope", "eq", 1))
+
+
+class TestValueIndex:
+    @pytest.fixture(params=["json", "sqlite"])
+    def store(self, request: pytest.FixtureRequest, tmp_path: Path) -> Iterator[BaseStore[Item]]:
+        store: BaseStore[Item]
+        if request.param == "json":
+            store = JsonStore(tmp_path / "t.json", Item, indexed_fields=["tags"])
+        else:
+            store = SqliteStore(tmp_path / "t.db", "items", Item, indexed_fields=["tags"])
+        with store:
+            store.save_many(
+                [
+                    Item(id="1", name="one", tags=["red", "big"]),
+                    Item(id="2", name="two", tags=["red"]),
+                    Item(id="3", name="three", tags=["blue", "big"]),
+                ]
+            )
+            yield store
+
+    def _ids(self, items: list[Item]) -> list[str]:
+        return [i.id for i in items]
+
+    def test_match_all_and_any(self, store: BaseStore[Item]) -> None:
+        assert self._ids(store.find_by_values("tags", ["red"])) == ["1", "2"]
+        assert self._ids(store.find_by_values("tags", ["red", "big"])) == ["1"]
+        hits = store.find_by_values("tags", ["red", "blue"], match="any", limit=2)
+        assert self._ids(hits) == ["1", "2"]
+        assert store.find_by_values("tags", ["missing"]) == []
+
+    def test_counts_follow_writes(self, store: BaseStore[Item]) -> None:
+        assert store.value_counts("tags") == {"red": 2, "big": 2, "blue": 1}
+        store.save(Item(id="2", name="two", tags=["blue"]))
+        store.delete("1")
+        assert store.value_counts("tags") == {"big": 1, "blue": 2}
+        assert self._ids(store.find_by_values("tags", ["blue"])) == ["2", "3"]
+
+    def test_unindexed_store_scans(self, any_store: BaseStore[Item]) -> None:
+        any_store.save(Item(id="x", name="X", tags=["a", "b"]))
+        assert self._ids(any_store.find_by_values("tags", ["a", "b"])) == ["x"]
+        assert any_store.value_counts("tags") == {"a": 1, "b": 1}
+
+
 # ── JSON store ────────────────────────────────────────────────────────
 
 
@@ -62,14 +397,143 @@ class TestJsonStore:
         assert restored.name == original.name
         assert restored.tags == original.tags
 
+    def test_reads_served_from_cache(
+        self, store: JsonStore[Item], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        store.save(_make_item())
+        monkeypatch.setattr(
+            Path, "read_text", lambda *a, **kw: pytest.fail("file re-read while unchanged")
+        )
+        assert store.get("t1") is not None
+        assert len(store.list_all()) == 1
+
+    def test_external_edit_invalidates_cache(self, tmp_path: Path) -> None:
+        import json
+
+        path = tmp_path / "shared.json"
+        store = JsonStore(path, Item)
+        store.save(_make_item("a", "A"))
+        assert store.get("b") is None
+
+        other = JsonStore(path, Item)
+        other.save(_make_item("b", "B"))
+        assert store.get("b") is not None
+
+        raw = json.loads(path.read_text())
+        raw["a"]["name"] = "Edited by hand"
+        path.write_text(json.dumps(raw))
+        fetched = store.get("a")
+        assert fetched is not None
+        assert fetched.name == "Edited by hand"
+
+    def test_bulk_operations(self, store: JsonStore[Item]) -> None:
+        assert store.save_many(_make_item(str(i)) for i in range(5)) == 5
+        assert set(store.get_many(["0", "3", "missing"])) == {"0", "3"}
+        assert store.delete_many(["0", "1", "missing"]) == 2
+        assert len(store.list_all()) == 3
+
+    def test_save_many_writes_file_once(
+        self, store: JsonStore[Item], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        writes: list[int] = []
+        original = store._write_all
+
+        def counting_write(data: dict[str, dict], changed: Iterable[str] | None = None) -> None:
+            writes.append(len(data))
+            original(data, changed)
+
+        monkeypatch.setattr(store, "_write_all", counting_write)
+        store.save_many(_make_item(str(i)) for i in range(20))
+        assert len(writes) == 1
+
+
+# ── JSONL store ───────────────────────────────────────────────────────
+
+
+class TestJsonlStore:
+    @pytest.fixture()
+    def store(self, tmp_path: Path) -> JsonlStore[Item]:
+        return JsonlStore(tmp_path / "items.jsonl", Item)
+
+    def test_save_get_delete(self, store: JsonlStore[Item]) -> None:
+        store.save(_make_item("a", "A"))
+        store.save(_make_item("b", "B"))
+        assert store.get("a") is not None
+        assert store.delete("a") is True
+        assert store.delete("a") is False
+        assert [i.id for i in store.list_all()] == ["b"]
+
+    def test_writes_append_lines(self, store: JsonlStore[Item]) -> None:
+        store.save(_make_item("a", "V1"))
+        store.save(_make_item("a", "V2"))
+        store.delete("a")
+        assert len(store.path.read_text().splitlines()) == 3
+
+    def test_state_rebuilt_on_open(self, store: JsonlStore[Item]) -> None:
+        store.save_many(_make_item(str(i)) for i in range(3))
+        store.save(_make_item("1", "Updated"))
+        store.delete("2")
+        reopened = JsonlStore(store.path, Item)
+        assert sorted(reopened.get_many(["0", "1", "2"])) == ["0", "1"]
+        fetched = reopened.get("1")
+        assert fetched is not None
+        assert fetched.name == "Updated"
+
+    def test_sees_appends_from_other_writers(self, store: JsonlStore[Item]) -> None:
+        other = JsonlStore(store.path, Item)
+        other.save(_make_item("x"))
+        assert store.get("x") is not None
+        other.compact()
+        store.save(_make_item("y"))
+        assert {i.id for i in store.list_all()} == {"x", "y"}
+
+    def test_compacts_past_garbage_threshold(self, tmp_path: Path) -> None:
+        store = JsonlStore(tmp_path / "c.jsonl", Item, compact_min_garbage=5)
+        for i in range(10):
+            store.save(_make_item("same", f"V{i}"))
+        assert len(store.path.read_text().splitlines()) < 10
+        fetched = store.get("same")
+        assert fetched is not None
+        assert fetched.name == "V9"
+
+    def test_one_instance_shared_by_threads(self, tmp_path: Path) -> None:
+        store = JsonlStore(tmp_path / "t.jsonl", Item, compact_min_garbage=50)
+        other = JsonlStore(store.path, Item)
+
+        def write(n: int) -> None:
+            for i in range(40):
+                (store if i % 2 else other).save(_make_item(f"{n}-{i % 10}", f"V{i}"))
+
+        def read(_: int) -> None:
+            for _ in range(40):
+                ids = [i.id for i in store.list_all()]
+                assert len(ids) == len(set(ids))
+                store.get_many(ids)
+                store.list_page(limit=5)
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda n: write(n) if n < 4 else read(n), range(8)))
+        assert len(store.list_all()) == 40
+        versions = {store.get_versioned(f"{n}-{i}")[1] for n in range(4) for i in range(10)}  # type: ignore[index]
+        assert versions == {4}
+
+    def test_torn_trailing_line_is_skipped(self, store: JsonlStore[Item]) -> None:
+        store.save(_make_item("ok"))
+        with store.path.open("a") as fh:
+            fh.write('{"op": "put", "id": "torn", "da')
+        store.save(_make_item("after"))
+        reopened = JsonlStore(store.path, Item)
+        assert {i.id for i in reopened.list_all()} == {"ok", "after"}
+
 
 # ── SQLite store ──────────────────────────────────────────────────────
 
 
 class TestSqliteStore:
     @pytest.fixture()
-    def store(self, tmp_path: Path) -> SqliteStore[Item]:
-        return SqliteStore(tmp_path / "test.db", "items", Item)
+    def store(self, tmp_path: Path) -> Iterator[SqliteStore[Item]]:
+        with SqliteStore(tmp_path / "test.db", "items", Item) as store:
+            yield store
 
     def test_save_and_get(self, store: SqliteStore[Item]) -> None:
         item = _make_item()
@@ -106,3 +570,503 @@ class TestSqliteStore:
         assert restored is not None
         assert restored.name == original.name
         assert restored.tags == original.tags
+
+    def test_bulk_operations(self, store: SqliteStore[Item]) -> None:
+        assert store.save_many(_make_item(str(i)) for i in range(1200)) == 1200
+        ids = [str(i) for i in range(0, 1200, 2)] + ["missing"]
+        assert len(store.get_many(ids)) == 600
+        assert store.delete_many(["0", "1", "missing"]) == 2
+        assert len(store.list_all()) == 1198
+
+    def test_connections_are_reused(self, store: SqliteStore[Item]) -> None:
+        for i in range(10):
+            store.save(_make_item(str(i)))
+            store.get(str(i))
+        assert store._pool.size == 1
+
+    def test_streams_hold_no_connection_between_pages(self, tmp_path: Path) -> None:
+        pool = ConnectionPool(tmp_path / "s.db", max_size=1, timeout=0.05)
+        with SqliteStore(tmp_path / "s.db", "items", Item, pool=pool) as store:
+            store.save_many(_make_item(f"{i:04}") for i in range(1200))
+            items, records = store.iter_all(), store.iter_raw()
+            assert next(items).id == next(iter(store.iter_all())).id == "0000"
+            next(records)
+            store.save(_make_item("late"))
+            assert sum(1 for _ in items) + 1 == 1201
+            assert sum(1 for _ in records) + 1 == 1201
+
+    def test_close_releases_connections(self, tmp_path: Path) -> None:
+        store = SqliteStore(tmp_path / "closed.db", "items", Item)
+        store.save(_make_item())
+        store.close()
+        assert store._pool.size == 0
+        with pytest.raises(RuntimeError):
+            store.get("t1")
+
+
+class TestSqliteIndexes:
+    def _plan(self, store: SqliteStore[Item], query: Query) -> str:
+        sql, params = store._compile(query)
+        with store._connect() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return " | ".join(r[-1] for r in rows)
+
+    def test_indexed_lookups_use_indexes(self, tmp_path: Path) -> None:
+        with SqliteStore(tmp_path / "i.db", "items", Item, indexed_fields=["name", "tags"]) as st:
+            st.save_many(_make_item(str(i), f"N{i}") for i in range(50))
+            assert "items__idx_name" in self._plan(st, Query().where("name", "eq", "N1"))
+            plan = self._plan(st, Query().where("tags", "contains", "a"))
+            assert "items__ix_tags" in plan
+            assert [i.id for i in st.find(Query().where("name", "eq", "N7"))] == ["7"]
+
+    def test_prefix_is_a_range_on_the_index(self, tmp_path: Path) -> None:
+        names = ["N1", "N10", "N19", "N2", "Na", "Né", "N\U0010ffff", "M"]
+        with SqliteStore(tmp_path / "i.db", "items", Item, indexed_fields=["name"]) as st:
+            st.save_many(_make_item(str(i), name) for i, name in enumerate(names))
+            plan = self._plan(st, Query().where("name", "prefix", "N1"))
+            assert "SEARCH" in plan and "items__idx_name" in plan
+            for prefix in ("N1", "N", "", "Né", "N\U0010ffff", "Z"):
+                found = st.find(Query().where("name", "prefix", prefix))
+                expected = [n for n in names if n.startswith(prefix)]
+                assert sorted(i.name for i in found) == sorted(expected), prefix
+
+    def test_side_table_tracks_writes(self, tmp_path: Path) -> None:
+        with SqliteStore(tmp_path / "i.db", "items", Item, indexed_fields=["tags"]) as st:
+            st.save(Item(id="x", name="X", tags=["old"]))
+            st.save(Item(id="x", name="X", tags=["new"]))
+            assert st.find(Query().where("tags", "contains", "old")) == []
+            assert len(st.find(Query().where("tags", "contains", "new"))) == 1
+            st.delete("x")
+            assert st.find(Query().where("tags", "contains", "new")) == []
+
+    def test_migration_backfills_and_drops(self, tmp_path: Path) -> None:
+        db = tmp_path / "m.db"
+        with SqliteStore(db, "items", Item) as plain:
+            plain.save(Item(id="x", name="X", tags=["t"]))
+        with SqliteStore(db, "items", Item, indexed_fields=["name", "tags"]) as indexed:
+            assert len(indexed.find(Query().where("tags", "contains", "t"))) == 1
+        with SqliteStore(db, "items", Item) as plain, plain._connect() as conn:
+            names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+        assert not any(n.startswith("items__") for n in names)
+
+    def test_unknown_indexed_field(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError):
+            SqliteStore(tmp_path / "i.db", "items", Item, indexed_fields=["nope"])
+
+
+# ── cached store ──────────────────────────────────────────────────────
+
+
+class TestCachedStore:
+    @pytest.fixture()
+    def backing(self, tmp_path: Path) -> Iterator[SqliteStore[Item]]:
+        with SqliteStore(tmp_path / "c.db", "items", Item) as store:
+            store.save_many(_make_item(str(i)) for i in range(5))
+            yield store
+
+    def test_hit_skips_backing_store(
+        self, backing: SqliteStore[Item], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        cached = CachedStore(backing)
+        first = cached.get("1")
+        monkeypatch.setattr(backing, "get", lambda _id: pytest.fail("backing store hit"))
+        assert cached.get("1") is first
+        assert (cached.stats.hits, cached.stats.misses) == (1, 1)
+
+    def test_writes_invalidate(self, backing: SqliteStore[Item]) -> None:
+        cached = CachedStore(backing)
+        cached.get("1")
+        cached.save(_make_item("1", "Renamed"))
+        fetched = cached.get("1")
+        assert fetched is not None
+        assert fetched.name == "Renamed"
+        cached.delete_many(["1"])
+        assert cached.get("1") is None
+
+    def test_lru_eviction(self, backing: SqliteStore[Item]) -> None:
+        cached = CachedStore(backing, max_size=2)
+        for record_id in ("0", "1", "0", "2"):
+            cached.get(record_id)
+        assert cached.stats.evictions == 1
+        assert set(cached._entries) == {"0", "2"}
+
+    def test_ttl_expiry(self, backing: SqliteStore[Item]) -> None:
+        now = [0.0]
+        cached = CachedStore(backing, ttl=10, clock=lambda: now[0])
+        cached.get("1")
+        now[0] = 11.0
+        cached.get("1")
+        assert cached.stats.expirations == 1
+        assert cached.stats.misses == 2
+
+    def test_get_many_mixes_hits_and_misses(self, backing: SqliteStore[Item]) -> None:
+        cached = CachedStore(backing)
+        cached.get("1")
+        assert set(cached.get_many(["1", "2", "missing"])) == {"1", "2"}
+        assert cached.stats.hits == 1
+        assert len(cached) == 2
+
+    def test_versions_are_cached_and_invalidated(self, backing: SqliteStore[Item]) -> None:
+        cached = CachedStore(backing)
+        cached.get("1")
+        assert cached.get_versioned("1") == (cached.get("1"), 1)
+        assert cached.get_versioned("1") is not None
+        assert (cached.stats.hits, cached.stats.misses) == (2, 2)
+        item = _make_item("1", "Renamed")
+        cached.save(item, expected_version=1)
+        assert cached.get_versioned("1") == (item, 2)
+        # A write behind the wrapper's back: the stale version makes the
+        # compare-and-swap fail, which drops the entry.
+        backing.save(_make_item("1", "Elsewhere"))
+        with pytest.raises(ConflictError):
+            cached.save(_make_item("1", "Mine"), expected_version=2)
+        found = cached.get_versioned("1")
+        assert found is not None and found[1] == 3
+
+    def test_service_get_hits_the_cache(self, backing: SqliteStore[Item]) -> None:
+        from myapp.services.example.api import ExampleService
+
+        cached = CachedStore(backing)
+        svc = ExampleService(store=cached)
+        for _ in range(5):
+            assert svc.get("1").version == 1
+        assert (cached.stats.hits, cached.stats.misses) == (4, 1)
+
+
+# ── connection pool ───────────────────────────────────────────────────
+
+
+class TestConnectionPool:
+    def test_pragmas_applied_once(self, tmp_path: Path) -> None:
+        pool = ConnectionPool(tmp_path / "p.db", pragmas={"journal_mode": "WAL"})
+        with pool.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        pool.close()
+
+    def test_bounded(self, tmp_path: Path) -> None:
+        pool = ConnectionPool(tmp_path / "p.db", max_size=1, timeout=0.05)
+        with pool.connection(), pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+        pool.close()
+
+    def test_open_transaction_rolled_back_on_return(self, tmp_path: Path) -> None:
+        pool = ConnectionPool(tmp_path / "p.db", max_size=1)
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.execute("INSERT INTO t VALUES (1)")
+        with pool.connection() as conn:
+            assert not conn.in_transaction
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        pool.close()
+
+
+class TestGroupCommit:
+    @pytest.fixture()
+    def store(self, tmp_path: Path) -> Iterator[SqliteStore[Item]]:
+        store = SqliteStore(
+            tmp_path / "gc.db", "items", Item, indexed_fields=["tags"], group_commit=True
+        )
+        yield store
+        store.close()
+
+    def test_concurrent_saves_and_deletes(self, store: SqliteStore[Item]) -> None:
+        items = [_make_item(f"{i:03}") for i in range(200)]
+        with ThreadPoolExecutor(8) as pool:
+            assert list(pool.map(store.save, items)) == items
+        assert len(store.list_all()) == 200
+        assert store.delete("007")
+        assert not store.delete("007")
+        assert store.value_counts("tags") == {"a": 199}
+
+    def test_futures_resolve_after_commit(self, store: SqliteStore[Item]) -> None:
+        futures = [store.submit_save(_make_item(f"{i}")) for i in range(50)]
+        assert [f.result().id for f in futures] == [str(i) for i in range(50)]
+        assert store.submit_delete("3").result() is True
+        assert store.get("3") is None
+
+    def test_failed_operation_only_fails_its_future(self, tmp_path: Path) -> None:
+        pool = ConnectionPool(tmp_path / "w.db")
+        with pool.connection() as conn, conn:
+            conn.execute("CREATE TABLE t (x INTEGER PRIMARY KEY)")
+
+        @contextmanager
+        def connect() -> Iterator[sqlite3.Connection]:
+            with pool.connection() as conn, conn:
+                yield conn
+
+        writer = GroupCommitWriter(connect, max_delay=0.05)
+        ok = writer.submit(lambda c: c.execute("INSERT INTO t VALUES (1)").rowcount)
+        bad = writer.submit(lambda c: c.execute("INSERT INTO t VALUES (1)").rowcount)
+        writer.close()
+        assert ok.result() == 1
+        with pytest.raises(sqlite3.IntegrityError):
+            bad.result()
+        with pytest.raises(RuntimeError):
+            writer.submit(lambda c: None)
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+        pool.close()
+
+    def test_close_flushes_pending_writes(self, tmp_path: Path) -> None:
+        path = tmp_path / "flush.db"
+        store = SqliteStore(path, "items", Item, group_commit=True, commit_delay=0.05)
+        futures = [store.submit_save(_make_item(f"{i}")) for i in range(20)]
+        store.close()
+        assert all(f.done() for f in futures)
+        with SqliteStore(path, "items", Item) as reopened:
+            assert len(reopened.list_all()) == 20
+
+    def test_without_group_commit_futures_are_done(self, tmp_path: Path) -> None:
+        with SqliteStore(tmp_path / "d.db", "items", Item) as store:
+            future = store.submit_save(_make_item())
+            assert future.done()
+            assert store.get("t1") == future.result()
+
+
+class TestSqliteCodecs:
+    def _items(self) -> list[Item]:
+        return [
+            Item(id=f"{i:03}", name=f"n{i}", description="long text " * (i % 40), tags=["a"])
+            for i in range(60)
+        ]
+
+    @pytest.mark.parametrize("codec", ["json-zlib", "compact", "compact-zlib"])
+    def test_round_trip_and_raw(self, tmp_path: Path, codec: str) -> None:
+        items = self._items()
+        with SqliteStore(tmp_path / "c.db", "items", Item, codec=codec) as store:
+            store.save_many(items)
+            assert store.list_all() == items
+            assert sorted(store.iter_raw()) == sorted(i.model_dump_json().encode() for i in items)
+            assert store.find(Query().where("name", "prefix", "n1").take(3))[0].id == "001"
+
+    def test_migrate_codec_both_ways(self, tmp_path: Path) -> None:
+        db = tmp_path / "m.db"
+        items = self._items()
+        with SqliteStore(db, "items", Item, indexed_fields=["name", "tags"]) as plain:
+            plain.save_many(items)
+        with SqliteStore(db, "items", Item, indexed_fields=["name"], codec="compact-zlib") as s:
+            rows, before, after = s.migrate_codec()
+            assert rows == 60
+            assert after < before / 2
+            assert s.get("042") == items[42]
+        with SqliteStore(db, "items", Item, indexed_fields=["name", "tags"]) as plain:
+            # Compact rows read back transparently; queries fall back to memory.
+            assert len(plain.find(Query().where("name", "eq", "n7"))) == 1
+            plain.save(_make_item("new"))
+            plain.migrate_codec()
+            with plain._connect() as conn:
+                types = {r[0] for r in conn.execute("SELECT DISTINCT typeof(data) FROM items")}
+            assert types == {"text"}
+            assert plain.value_counts("tags") == {"a": 61}
+            assert plain.find(Query().where("name", "eq", "n7"))[0] == items[7]
+
+    def test_queries_follow_another_stores_codec_changes(self, tmp_path: Path) -> None:
+        db = tmp_path / "s.db"
+        query = Query().where("name", "eq", "n1")
+        with (
+            SqliteStore(db, "items", Item, indexed_fields=["name"]) as plain,
+            SqliteStore(db, "items", Item, codec="compact") as compact,
+        ):
+            plain.save_many(self._items())
+            assert [i.id for i in plain.find(query)] == ["001"]
+            compact.save(Item(id="new", name="n1"))  # marks the table mixed
+            assert [i.id for i in plain.find(query)] == ["001", "new"]
+            compact.migrate_codec()
+            assert [i.id for i in plain.find(query)] == ["001", "new"]
+            plain.migrate_codec()
+            assert [i.id for i in compact.find(query)] == ["001", "new"]
+
+    def test_new_fields_get_a_new_layout(self, tmp_path: Path) -> None:
+        class Wider(Item):
+            note: str = ""
+
+        db = tmp_path / "w.db"
+        old = _make_item("old")
+        with SqliteStore(db, "items", Item, codec="compact") as narrow:
+            narrow.save(old)
+        with SqliteStore(db, "items", Wider, codec="compact") as wide:
+            wide.save(Wider(id="new", name="N", note="hi"))
+            assert wide.get("old") == Wider(**old.model_dump())
+            assert wide.get("new").note == "hi"  # type: ignore[union-attr]
+
+
+class TestSqliteProfiles:
+    def _settings(self, store: SqliteStore[Item]) -> dict[str, str]:
+        with store.pool.connection() as conn:
+            return effective_settings(conn)
+
+    def test_default_is_durable(self, tmp_path: Path) -> None:
+        with SqliteStore(tmp_path / "d.db", "items", Item) as store:
+            settings = self._settings(store)
+        assert settings["journal_mode"] == "wal"
+        assert settings["synchronous"] == "FULL"
+
+    def test_profile_and_overrides(self, tmp_path: Path) -> None:
+        pragmas = parse_pragmas("cache_size=-2048, temp_store=FILE")
+        with SqliteStore(
+            tmp_path / "b.db", "items", Item, profile="balanced", pragmas=pragmas
+        ) as store:
+            settings = self._settings(store)
+        assert settings["synchronous"] == "NORMAL"
+        assert settings["cache_size"] == "-2048"
+        assert settings["temp_store"] == "FILE"
+
+    def test_bulk_load_and_checkpoint(self, tmp_path: Path) -> None:
+        path = tmp_path / "bulk.db"
+        store = SqliteStore(path, "items", Item, profile="bulk-load")
+        store.save_many(_make_item(f"{i}") for i in range(100))
+        wal = path.with_name("bulk.db-wal")
+        assert wal.stat().st_size > 0
+        busy, frames, done = store.checkpoint("truncate")
+        assert busy == 0 and frames == done
+        assert wal.stat().st_size == 0
+        store.close()
+        with SqliteStore(path, "items", Item) as reopened:
+            assert len(reopened.list_all()) == 100
+
+    def test_invalid_configuration(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="Unknown SQLite profile"):
+            SqliteStore(tmp_path / "x.db", "items", Item, profile="turbo")
+        with pytest.raises(ValueError, match="own pool"):
+            SqliteStore(
+                tmp_path / "x.db",
+                "items",
+                Item,
+                pool=ConnectionPool(tmp_path / "x.db"),
+                profile="fast",
+            )
+        with pytest.raises(ValueError, match="Invalid pragma"):
+            parse_pragmas("synchronous=OFF; DROP TABLE items")
+
+
+class TestTrustedReads:
+    def test_trusted_decode_matches_validation(self) -> None:
+        item = _make_item()
+        raw = item.model_dump(mode="json")
+        decoded = RecordDecoder(Item, trusted=True).from_dict(raw)
+        assert decoded == item
+        assert decoded.model_dump() == item.model_dump()
+        # Lists are copied, so mutating the model leaves the stored dict intact.
+        decoded.tags.append("b")
+        assert raw["tags"] == ["a"]
+
+    def test_other_schema_versions_are_validated(self) -> None:
+        decoder = RecordDecoder(Item, trusted=True)
+        raw = {**_make_item().model_dump(mode="json"), "schema_version": 0, "name": ""}
+        with pytest.raises(ValueError):
+            decoder.from_dict(raw)
+
+    def test_unexpected_keys_are_validated(self) -> None:
+        raw = _make_item().model_dump(mode="json")
+        del raw["tags"]
+        assert RecordDecoder(Item, trusted=True).from_dict(raw).tags == []
+
+    def test_unsupported_models_always_validate(self) -> None:
+        from pydantic import BaseModel
+
+        class Nested(BaseModel):
+            id: str
+            child: Item
+
+        assert not RecordDecoder(Nested, trusted=True).trusted
+        assert RecordDecoder(Item, trusted=True).trusted
+
+    def test_bulk_reads_leave_gc_alone(self, tmp_path: Path) -> None:
+        import gc
+
+        store = JsonStore(tmp_path / "items.json", Item, trusted_reads=True)
+        store.save_many(_make_item(f"{i:03}") for i in range(10))
+        assert len(store.list_all()) == 10
+        assert gc.isenabled()
+
+
+@pytest.fixture()
+def log_stream() -> Iterator[io.StringIO]:
+    stream = io.StringIO()
+    configure_logging(level="DEBUG", fmt="json", levels={}, stream=stream)
+    yield stream
+    configure_logging()
+
+
+def _log_lines(stream: io.StringIO) -> list[dict]:
+    shutdown_logging()  # drains the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestLogging:
+    def test_store_writes_json_lines(self, tmp_path: Path, log_stream: io.StringIO) -> None:
+        store = JsonlStore(tmp_path / "items.jsonl", Item)
+        store.save(_make_item())
+        get_logger("myapp.test").info("done", extra={"request_id": "r1"})
+        lines = _log_lines(log_stream)
+        assert lines[0]["level"] == "DEBUG"
+        assert lines[0]["logger"] == "myapp.shared.persistence.jsonl_store"
+        assert lines[0]["message"].startswith("Appended t1 to ")
+        assert lines[-1]["request_id"] == "r1"
+
+    def test_mutable_arguments_are_rendered_at_call_time(self, log_stream: io.StringIO) -> None:
+        tags = ["a"]
+        get_logger("myapp.test").info("tags %s", tags)
+        tags.append("b")
+        assert _log_lines(log_stream)[0]["message"] == "tags ['a']"
+
+    def test_lazy_arguments_only_run_when_emitted(self, log_stream: io.StringIO) -> None:
+        calls: list[str] = []
+
+        def expensive(value: str) -> str:
+            calls.append(value)
+            return value
+
+        logger = get_logger("myapp.test")
+        logger.setLevel(logging.INFO)
+        try:
+            logger.debug("%s", lazy(lambda: expensive("skipped")))
+            logger.info("%s", lazy(lambda: expensive("x")))
+        finally:
+            logger.setLevel(logging.NOTSET)
+        assert calls == ["x"]
+        assert _log_lines(log_stream)[0]["message"] == "x"
+
+    def test_listener_starts_with_the_first_record(self) -> None:
+        code = "import threading, myapp.services.example.api; print(threading.active_count())"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        assert result.stdout.strip() == "1", result.stderr
+        configure_logging(stream=io.StringIO())
+        try:
+            threads = threading.active_count()
+            logger = get_logger("myapp.test")
+            assert threading.active_count() == threads
+            logger.warning("first")
+            assert threading.active_count() == threads + 1
+        finally:
+            configure_logging()
+
+    def test_debug_sampling(self) -> None:
+        sampler = DebugSampler(3)
+
+        def record(level: int, msg: str) -> logging.LogRecord:
+            return logging.LogRecord("myapp.test", level, __file__, 1, msg, None, None)
+
+        kept = [sampler.filter(record(logging.DEBUG, "hot %s")) for _ in range(7)]
+        assert kept == [True, False, False, True, False, False, True]
+        assert sampler.filter(record(logging.DEBUG, "rare"))
+        assert all(sampler.filter(record(logging.INFO, "hot %s")) for _ in range(3))
+
+    def test_per_service_levels(self) -> None:
+        levels = parse_levels("example=debug, myapp.shared.persistence=WARNING")
+        assert levels == {
+            "myapp.services.example": logging.DEBUG,
+            "myapp.shared.persistence": logging.WARNING,
+        }
+        configure_logging(level="INFO", levels=levels, stream=io.StringIO())
+        try:
+            assert get_logger("myapp.services.example.api").isEnabledFor(logging.DEBUG)
+            assert not get_logger("myapp.shared.persistence.sqlite_store").isEnabledFor(
+                logging.INFO
+            )
+        finally:
+            configure_logging()
+        assert not get_logger("myapp.services.example.api").isEnabledFor(logging.DEBUG)
+        with pytest.raises(ValueError):
+            parse_levels("example")
@@ -1,8 +1,27 @@
-"""Shared libraries used across services."""
+"""Shared libraries used across services.
 
-from myapp.shared.config import DB_DIR, DEFAULT_DB_PATH, JSON_DIR, ROOT_DIR, ensure_data_dirs
-from myapp.shared.logging import get_logger
-from myapp.shared.schemas import BaseRecord, ServiceResponse
+Names are resolved lazily (PEP 562) so that importing a submodule such as
+``myapp.shared.config`` does not drag in pydantic through ``schemas``.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from myapp.shared.config import DB_DIR, DEFAULT_DB_PATH, JSON_DIR, ROOT_DIR, ensure_data_dirs
+    from myapp.shared.logging import get_logger
+    from myapp.shared.schemas import BaseRecord, ServiceResponse
+
+_EXPORTS = {
+    "BaseRecord": "myapp.shared.schemas",
+    "DB_DIR": "myapp.shared.config",
+    "DEFAULT_DB_PATH": "myapp.shared.config",
+    "JSON_DIR": "myapp.shared.config",
+    "ROOT_DIR": "myapp.shared.config",
+    "ServiceResponse": "myapp.shared.schemas",
+    "ensure_data_dirs": "myapp.shared.config",
+    "get_logger": "myapp.shared.logging",
+}
 
 __all__ = [
     "BaseRecord",
@@ -14,3 +33,10 @@ __all__ = [
     "ensure_data_dirs",
     "get_logger",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
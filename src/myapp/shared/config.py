@@ -1,5 +1,6 @@
 """Application-wide configuration."""
 
+import os
 from pathlib import Path
 
 # Repository root (two levels up from src/myapp/)
@@ -9,6 +10,47 @@ DATA_DIR = ROOT_DIR / "data"
 JSON_DIR = DATA_DIR / "json"
 DB_DIR = DATA_DIR / "db"
 DEFAULT_DB_PATH = DB_DIR / "myapp.db"
+BENCH_DIR = DATA_DIR / "bench"
+METRICS_DIR = DATA_DIR / "metrics"
+PROFILE_DIR = DATA_DIR / "profiles"
+SERVER_FILE = DATA_DIR / "server.json"
+
+# Read-through cache in front of default service stores (0 disables it).
+CACHE_SIZE = int(os.environ.get("MYAPP_CACHE_SIZE", "0"))
+CACHE_TTL = float(os.environ.get("MYAPP_CACHE_TTL", "60"))
+
+# Skip pydantic validation when reading records written by this schema version.
+TRUSTED_READS = os.environ.get("MYAPP_TRUSTED_READS", "") == "1"
+
+# SQLite pragma profile (durable, balanced, fast, bulk-load) and per-pragma
+# overrides as "name=value,name=value".
+SQLITE_PROFILE = os.environ.get("MYAPP_SQLITE_PROFILE", "durable")
+SQLITE_PRAGMAS = os.environ.get("MYAPP_SQLITE_PRAGMAS", "")
+
+# Encoding of new SQLite rows: json, json-zlib, compact or compact-zlib.
+SQLITE_CODEC = os.environ.get("MYAPP_SQLITE_CODEC", "json")
+
+# Commit single-record SQLite writes in batches from one writer thread.
+SQLITE_GROUP_COMMIT = os.environ.get("MYAPP_SQLITE_GROUP_COMMIT", "") == "1"
+SQLITE_COMMIT_BATCH = int(os.environ.get("MYAPP_SQLITE_COMMIT_BATCH", "256"))
+SQLITE_COMMIT_DELAY = float(os.environ.get("MYAPP_SQLITE_COMMIT_DELAY", "0"))
+
+# Logging: default level, per-service/logger overrides ("example=DEBUG,..."),
+# text or json output, and keep-1-in-N sampling of repeated DEBUG messages.
+LOG_LEVEL = os.environ.get("MYAPP_LOG_LEVEL", "INFO")
+LOG_LEVELS = os.environ.get("MYAPP_LOG_LEVELS", "")
+LOG_FORMAT = os.environ.get("MYAPP_LOG_FORMAT", "text")
+LOG_DEBUG_SAMPLE = int(os.environ.get("MYAPP_LOG_DEBUG_SAMPLE", "1"))
+
+# `project serve` listen address and worker processes; MYAPP_SERVER=off keeps
+# CLI commands from routing through a running server.
+SERVER_HOST = os.environ.get("MYAPP_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("MYAPP_SERVER_PORT", "8765"))
+SERVER_WORKERS = int(os.environ.get("MYAPP_SERVER_WORKERS", "1"))
+SERVER_ROUTING = os.environ.get("MYAPP_SERVER", "auto") != "off"
+
+# Time store and service calls; the CLI writes them to METRICS_DIR on exit.
+METRICS_ENABLED = os.environ.get("MYAPP_METRICS", "") == "1"
 
 
 def ensure_data_dirs() -> None:
@@ -1,19 +1,287 @@
-"""Centralized logging configuration."""
+"""Centralized logging configuration.
 
+All ``myapp.*`` loggers share one pipeline, installed on the ``myapp``
+logger the first time :func:`get_logger` is called (or explicitly by
+:func:`configure_logging`):
+
+* Callers only pay for the level check and for putting the record on a
+  queue; a :class:`~logging.handlers.QueueListener` thread formats and
+  writes it, so a slow stderr never stalls a request. The thread starts
+  with the first record, not when the pipeline is installed: importing
+  modules that create loggers starts no thread.
+* Messages are formatted lazily. Records whose arguments are immutable
+  scalars cross the queue as ``msg`` + ``args`` and are rendered on the
+  listener thread; anything else is rendered before it is queued, so a
+  mutable argument changed right after the call cannot alter the line.
+  Wrap an expensive argument in :class:`lazy` to compute it only when a
+  record is actually emitted.
+* ``MYAPP_LOG_FORMAT=json`` writes one JSON object per line, including
+  any ``extra={...}`` fields.
+* ``MYAPP_LOG_DEBUG_SAMPLE=N`` keeps the first DEBUG record of every
+  message template and then one in ``N`` — enough to see what a hot path
+  does without flooding the output.
+* ``MYAPP_LOG_LEVEL`` sets the level of every ``myapp`` logger, and
+  ``MYAPP_LOG_LEVELS="example=DEBUG,myapp.shared.persistence=WARNING"``
+  overrides it per service (a bare name means ``myapp.services.<name>``)
+  or per logger.
+"""
+
+import atexit
+import itertools
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+from collections.abc import Callable, Iterator, Mapping
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, TextIO
 
+from myapp.shared.config import LOG_DEBUG_SAMPLE, LOG_FORMAT, LOG_LEVEL, LOG_LEVELS
 
-def get_logger(name: str, level: int = logging.INFO) -> logging.Logger:
-    """Return a configured logger that writes to stderr."""
-    logger = logging.getLogger(name)
-    if not logger.handlers:
-        handler = logging.StreamHandler(sys.stderr)
+ROOT_LOGGER = "myapp"
+LOG_FORMATS = ("text", "json")
+
+# Argument types that cannot change between the call and the listener thread.
+_IMMUTABLE = (str, int, float, bool, bytes, type(None))
+
+# Attributes every LogRecord has; anything else came in through ``extra``.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_lock = threading.Lock()
+_listener: QueueListener | None = None
+_handler: QueueHandler | None = None
+# Whether _listener's thread runs; it is started by the first record queued.
+_listening = False
+_configured_levels: list[str] = []
+# Loggers outside ``myapp`` that get_logger attached the handler to.
+_attached: list[str] = []
+
+
+class lazy:  # noqa: N801 - used like a function: logger.debug("%s", lazy(fn))
+    """Defer an expensive log argument: ``fn`` runs only if the record is emitted."""
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Callable[[], Any]) -> None:
+        self.fn = fn
+
+    def __str__(self) -> str:
+        return str(self.fn())
+
+    def __repr__(self) -> str:
+        return repr(self.fn())
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """Pass the first DEBUG record of each message template, then one in ``rate``.
+
+    Records above DEBUG always pass. Counting is per (logger, template),
+    so a rare debug message is not drowned out by a frequent one.
+    """
+
+    def __init__(self, rate: int) -> None:
+        super().__init__()
+        if rate < 1:
+            raise ValueError("rate must be at least 1")
+        self.rate = rate
+        self._counters: dict[tuple[str, object], Iterator[int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        key = (record.name, record.msg)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters.setdefault(key, itertools.count())
+        return next(counter) % self.rate == 0
+
+
+class _LazyQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread when it is safe.
+
+    The stock handler formats every record on the caller's thread before
+    queueing it. Nothing here crosses a process boundary, so records whose
+    arguments cannot change are queued as they are.
+    """
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if not _listening:
+            _start_listener()
+        super().enqueue(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (
+            isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE) for arg in args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def parse_levels(spec: str) -> dict[str, int]:
+    """Parse ``"name=LEVEL,..."`` (e.g. ``MYAPP_LOG_LEVELS``) into logger names and levels."""
+    levels: dict[str, int] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, sep, level = (s.strip() for s in part.partition("="))
+        if not sep or not name:
+            raise ValueError(f"Invalid log level {part.strip()!r}; expected name=LEVEL")
+        if name != ROOT_LOGGER and not name.startswith(f"{ROOT_LOGGER}."):
+            name = f"{ROOT_LOGGER}.services.{name}"
+        levels[name] = parse_level(level)
+    return levels
+
+
+def parse_level(level: str | int) -> int:
+    """Turn ``"debug"``, ``"INFO"`` or ``10`` into a logging level number."""
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(level.strip().upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level {level!r}")
+    return value
+
+
+def configure_logging(
+    *,
+    level: str | int | None = None,
+    fmt: str | None = None,
+    levels: Mapping[str, int] | None = None,
+    debug_sample: int | None = None,
+    stream: TextIO | None = None,
+) -> None:
+    """(Re)install the pipeline; arguments left as None come from the environment.
+
+    Replaces any previous configuration, flushing what it had queued.
+    """
+    fmt = fmt or LOG_FORMAT
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format {fmt!r}; choose from {', '.join(LOG_FORMATS)}")
+    formatter: logging.Formatter
+    if fmt == "json":
+        formatter = JsonFormatter()
+    else:
         formatter = logging.Formatter(
             "%(asctime)s | %(name)s | %(levelname)s | %(message)s",
             datefmt="%Y-%m-%d %H:%M:%S",
         )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    logger.setLevel(level)
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(formatter)
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    handler = _LazyQueueHandler(records)
+    handler.addFilter(DebugSampler(debug_sample or LOG_DEBUG_SAMPLE))
+    listener = QueueListener(records, output)
+
+    global _listener, _handler
+    with _lock:
+        _shutdown()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(parse_level(level if level is not None else LOG_LEVEL))
+        if levels is None:
+            levels = parse_levels(LOG_LEVELS)
+        for name, value in levels.items():
+            logging.getLogger(name).setLevel(value)
+            _configured_levels.append(name)
+        root.addHandler(handler)
+        _handler, _listener = handler, listener
+
+
+def _start_listener() -> None:
+    global _listening
+    with _lock:
+        if _listener is not None and not _listening:
+            _listener.start()
+            _listening = True
+
+
+def _stop_listener() -> None:
+    global _listening
+    if _listener is not None and _listening:
+        _listener.stop()
+    _listening = False
+
+
+def _shutdown() -> None:
+    global _listener, _handler
+    _stop_listener()
+    if _handler is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        while _attached:
+            logging.getLogger(_attached.pop()).removeHandler(_handler)
+    while _configured_levels:
+        logging.getLogger(_configured_levels.pop()).setLevel(logging.NOTSET)
+    _listener = _handler = None
+
+
+def shutdown_logging() -> None:
+    """Write out everything queued and stop the listener thread.
+
+    Runs at interpreter exit; the CLI also calls it when a command ends.
+    A later :func:`get_logger` call installs the pipeline again.
+    """
+    with _lock:
+        _shutdown()
+
+
+def _before_fork() -> None:
+    # Forking while the listener thread runs could leave the child with a
+    # lock held by a thread that no longer exists; stop it (writing out
+    # what is queued). The next record on either side starts a new one.
+    _lock.acquire()
+    _stop_listener()
+
+
+def _after_fork() -> None:
+    _lock.release()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(before=_before_fork, after_in_parent=_after_fork, after_in_child=_after_fork)
+
+
+def get_logger(name: str, level: int | None = None) -> logging.Logger:
+    """Return a logger that writes through the shared pipeline.
+
+    Loggers under ``myapp`` take their level from the configuration
+    unless ``level`` is given; others get the pipeline's handler attached.
+    """
+    if _handler is None:
+        configure_logging()
+    logger = logging.getLogger(name)
+    if name != ROOT_LOGGER and not name.startswith(f"{ROOT_LOGGER}."):
+        with _lock:
+            if _handler is not None and _handler not in logger.handlers:
+                logger.addHandler(_handler)
+                _attached.append(name)
+    if level is not None:
+        logger.setLevel(level)
     return logger
@@ -0,0 +1,468 @@
+"""In-process metrics: counters, latency histograms and a registry.
+
+Stores and services are instrumented automatically — every
+``BaseStore`` subclass via ``BaseStore.__init_subclass__``, services via
+the :func:`instrumented` class decorator — but their methods are only
+wrapped while metrics are enabled (``MYAPP_METRICS=1`` or
+:func:`enable`). Disabled, the classes keep their original functions, so
+instrumentation costs nothing at all.
+
+Each wrapped method feeds two series labelled with the class and method
+name:
+
+* ``myapp_<kind>_seconds`` — a histogram of call latency. Generator
+  methods (``iter_all``, ``iter_raw``) count only the time spent inside
+  the generator, not in the consumer between items.
+* ``myapp_<kind>_errors_total`` — calls that raised.
+
+Histograms use fixed power-of-two buckets from 1µs to ~16s, so
+percentiles are estimates (interpolated within a bucket, like
+Prometheus' ``histogram_quantile``). :meth:`Registry.snapshot` returns
+everything as plain JSON-able data; :func:`prometheus_text` renders a
+snapshot in the Prometheus text exposition format.
+"""
+
+import functools
+import inspect
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+from myapp.shared.config import METRICS_ENABLED
+
+C = TypeVar("C", bound=type)
+
+# Upper bounds (seconds) of the histogram buckets: 1µs, 2µs, 4µs, ... ~16.8s.
+BUCKETS: tuple[float, ...] = tuple(2**k / 1_000_000 for k in range(25))
+
+# Public methods that are never timed.
+_SKIPPED = frozenset({"close"})
+
+
+class Counter:
+    """A monotonically increasing count."""
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Counts of observed values per bucket, plus their sum."""
+
+    def __init__(self, bounds: tuple[float, ...] = BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        return quantile(self.bounds, self.counts, q)
+
+
+def quantile(bounds: tuple[float, ...] | list[float], counts: list[int], q: float) -> float:
+    """Estimate the ``q`` quantile (0..1) from bucket counts by linear interpolation."""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if index == len(bounds):  # +Inf bucket: the best we can say is "above the top"
+                return bounds[-1]
+            lower = bounds[index - 1] if index else 0.0
+            return lower + (bounds[index] - lower) * (rank - seen) / count
+        seen += count
+    return bounds[-1]
+
+
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class _Family:
+    name: str
+    kind: str  # "counter" or "histogram"
+    help: str
+    series: dict[Labels, Any] = field(default_factory=dict)
+
+
+class Registry:
+    """Every metric recorded in this process, by name and labels."""
+
+    def __init__(self, *, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._families: dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, kind: str, help: str, labels: dict[str, str], new: Any) -> Any:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = _Family(name, kind, help)
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name!r} is a {family.kind}, not a {kind}")
+            metric = family.series.get(key)
+            if metric is None:
+                metric = family.series[key] = new()
+            return metric
+
+    def counter(self, name: str, help: str, **labels: str) -> Counter:
+        """The counter ``name`` with ``labels``, created on first use."""
+        return self._get(name, "counter", help, labels, Counter)  # type: ignore[no-any-return]
+
+    def histogram(self, name: str, help: str, **labels: str) -> Histogram:
+        """The histogram ``name`` with ``labels``, created on first use."""
+        return self._get(name, "histogram", help, labels, Histogram)  # type: ignore[no-any-return]
+
+    def reset(self) -> None:
+        """Forget every recorded value (wrapped methods keep their series objects)."""
+        with self._lock:
+            for family in self._families.values():
+                for metric in family.series.values():
+                    with metric._lock:
+                        if isinstance(metric, Counter):
+                            metric.value = 0
+                        else:
+                            metric.counts = [0] * len(metric.counts)
+                            metric.sum = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        """Everything recorded so far as JSON-able data (see :func:`prometheus_text`).
+
+        Series that never recorded anything are left out.
+        """
+        metrics = []
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda f: f.name)
+            for family in families:
+                series = []
+                for key, metric in sorted(family.series.items()):
+                    entry: dict[str, Any] = {"labels": dict(key)}
+                    if isinstance(metric, Counter):
+                        if not metric.value:
+                            continue
+                        entry["value"] = metric.value
+                    else:
+                        if not metric.count:
+                            continue
+                        entry.update(count=metric.count, sum=metric.sum, buckets=metric.counts)
+                    series.append(entry)
+                if not series:
+                    continue
+                metrics.append(
+                    {
+                        "name": family.name,
+                        "type": family.kind,
+                        "help": family.help,
+                        "series": series,
+                    }
+                )
+        return {"buckets": list(BUCKETS), "metrics": metrics}
+
+
+REGISTRY = Registry(enabled=METRICS_ENABLED)
+
+
+# -- instrumentation -----------------------------------------------------------
+
+# (class, kind) pairs to wrap whenever metrics are enabled.
+_targets: list[tuple[type, str]] = []
+# (class, name, own attribute or None if inherited) for every wrapper installed.
+_installed: list[tuple[type, str, Any]] = []
+_targets_lock = threading.RLock()
+
+
+def _timed(fn: Callable[..., Any], seconds: Histogram, errors: Counter) -> Callable[..., Any]:
+    clock = time.perf_counter
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def timed_coroutine(*args: Any, **kwargs: Any) -> Any:
+            start = clock()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(clock() - start)
+
+        wrapper: Callable[..., Any] = timed_coroutine
+
+    elif inspect.isgeneratorfunction(fn):
+
+        @functools.wraps(fn)
+        def timed_generator(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            iterator = fn(*args, **kwargs)
+            elapsed = 0.0
+            try:
+                while True:
+                    start = clock()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    except Exception:
+                        errors.inc()
+                        raise
+                    finally:
+                        elapsed += clock() - start
+                    yield item
+            finally:
+                iterator.close()
+                seconds.observe(elapsed)
+
+        wrapper = timed_generator
+
+    else:
+
+        @functools.wraps(fn)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(clock() - start)
+
+        wrapper = timed
+
+    wrapper.__metrics_original__ = fn  # type: ignore[attr-defined]
+    return wrapper
+
+
+def _wrap(cls: type, kind: str) -> None:
+    for name in dir(cls):
+        if name.startswith("_") or name in _SKIPPED:
+            continue
+        attr = inspect.getattr_static(cls, name)
+        if not inspect.isfunction(attr) or getattr(attr, "__isabstractmethod__", False):
+            continue
+        if inspect.isasyncgenfunction(attr):
+            continue
+        original = getattr(attr, "__metrics_original__", attr)
+        labels = {kind: cls.__name__, "method": name}
+        seconds = REGISTRY.histogram(
+            f"myapp_{kind}_seconds", f"Time spent in {kind} methods, in seconds.", **labels
+        )
+        errors = REGISTRY.counter(
+            f"myapp_{kind}_errors_total", f"Calls to {kind} methods that raised.", **labels
+        )
+        _installed.append((cls, name, cls.__dict__.get(name)))
+        setattr(cls, name, _timed(original, seconds, errors))
+
+
+def instrument_class(cls: type, kind: str) -> None:
+    """Time every public method of ``cls`` (inherited ones included) while enabled.
+
+    Series are labelled ``{kind}=<class name>`` and ``method=<name>``.
+    """
+    with _targets_lock:
+        _targets.append((cls, kind))
+        if REGISTRY.enabled:
+            _wrap(cls, kind)
+
+
+def instrumented(kind: str) -> Callable[[C], C]:
+    """Class decorator form of :func:`instrument_class`."""
+
+    def decorate(cls: C) -> C:
+        instrument_class(cls, kind)
+        return cls
+
+    return decorate
+
+
+def enable() -> None:
+    """Start recording: wrap every instrumented class defined so far (and later ones)."""
+    with _targets_lock:
+        if REGISTRY.enabled:
+            return
+        REGISTRY.enabled = True
+        for cls, kind in _targets:
+            _wrap(cls, kind)
+
+
+def disable() -> None:
+    """Stop recording and put the original methods back. Recorded values are kept."""
+    with _targets_lock:
+        REGISTRY.enabled = False
+        while _installed:
+            cls, name, own = _installed.pop()
+            if own is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, own)
+
+
+# -- export ----------------------------------------------------------------------
+
+
+def _label_text(labels: dict[str, str], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels.items()]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+_INF = 'le="+Inf"'
+
+
+def _le(bound: float) -> str:
+    return f'le="{bound:.6g}"'
+
+
+def prometheus_text(snapshot: dict[str, Any]) -> str:
+    """Render a :meth:`Registry.snapshot` in the Prometheus text exposition format."""
+    bounds = snapshot["buckets"]
+    lines: list[str] = []
+    for family in snapshot["metrics"]:
+        name = family["name"]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for series in family["series"]:
+            labels = series["labels"]
+            if family["type"] == "counter":
+                lines.append(f"{name}{_label_text(labels)} {series['value']}")
+                continue
+            cumulative = 0
+            for bound, count in zip(bounds, series["buckets"], strict=False):
+                cumulative += count
+                lines.append(f"{name}_bucket{_label_text(labels, _le(bound))} {cumulative}")
+            lines.append(f"{name}_bucket{_label_text(labels, _INF)} {series['count']}")
+            lines.append(f"{name}_sum{_label_text(labels)} {series['sum']:.9f}")
+            lines.append(f"{name}_count{_label_text(labels)} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def merge(base: dict[str, Any], extra: dict[str, Any]) -> dict[str, Any]:
+    """Add the values of snapshot ``extra`` to snapshot ``base`` (which is modified)."""
+    if base["buckets"] != extra["buckets"]:
+        raise ValueError("Cannot merge snapshots with different histogram buckets")
+    families = {family["name"]: family for family in base["metrics"]}
+    for family in extra["metrics"]:
+        target = families.get(family["name"])
+        if target is None:
+            families[family["name"]] = family
+            continue
+        series = {tuple(sorted(s["labels"].items())): s for s in target["series"]}
+        for entry in family["series"]:
+            existing = series.get(tuple(sorted(entry["labels"].items())))
+            if existing is None:
+                target["series"].append(entry)
+            elif family["type"] == "counter":
+                existing["value"] += entry["value"]
+            else:
+                existing["count"] += entry["count"]
+                existing["sum"] += entry["sum"]
+                existing["buckets"] = [a + b for a, b in zip(existing["buckets"], entry["buckets"])]
+    base["metrics"] = sorted(families.values(), key=lambda f: f["name"])
+    return base
+
+
+def dump(directory: Path, registry: Registry = REGISTRY) -> None:
+    """Add this process's metrics to ``metrics.json`` and ``metrics.prom`` in ``directory``.
+
+    CLI processes are short-lived, so each one merges what it recorded
+    into the totals left by earlier runs (under a file lock). Delete the
+    files, or run ``project metrics --reset``, to start over.
+    ``metrics.prom`` suits a node_exporter textfile collector. Both
+    files are replaced atomically, so a scraper never sees half a file.
+    """
+    from myapp.shared.persistence.files import atomic_write, file_lock
+
+    snapshot = registry.snapshot()
+    if not snapshot["metrics"]:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / "metrics.json"
+    with file_lock(path):
+        if path.exists():
+            previous = json.loads(path.read_text(encoding="utf-8"))
+            if previous.get("buckets") == snapshot["buckets"]:
+                snapshot = merge(previous, snapshot)
+        with atomic_write(path) as fh:
+            json.dump(snapshot, fh)
+            fh.write("\n")
+        with atomic_write(directory / "metrics.prom") as fh:
+            fh.write(prometheus_text(snapshot))
+
+
+@dataclass(frozen=True)
+class CallSummary:
+    """One instrumented method's numbers from a snapshot (times in seconds)."""
+
+    kind: str
+    owner: str
+    method: str
+    calls: int
+    errors: int
+    total: float
+    p50: float
+    p95: float
+    p99: float
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+def summarize(snapshot: dict[str, Any]) -> list[CallSummary]:
+    """Per-method summaries of a snapshot's ``*_seconds`` histograms, slowest total first."""
+    bounds = snapshot["buckets"]
+    errors: dict[tuple[str, tuple[tuple[str, str], ...]], int] = {}
+    for family in snapshot["metrics"]:
+        if family["name"].endswith("_errors_total"):
+            prefix = family["name"].removesuffix("_errors_total")
+            for series in family["series"]:
+                errors[prefix, tuple(sorted(series["labels"].items()))] = series["value"]
+    rows = []
+    for family in snapshot["metrics"]:
+        if family["type"] != "histogram" or not family["name"].endswith("_seconds"):
+            continue
+        prefix = family["name"].removesuffix("_seconds")
+        kind = prefix.removeprefix("myapp_")
+        for series in family["series"]:
+            if not series["count"]:
+                continue
+            labels = series["labels"]
+            counts = series["buckets"]
+            rows.append(
+                CallSummary(
+                    kind=kind,
+                    owner=labels.get(kind, ""),
+                    method=labels.get("method", ""),
+                    calls=series["count"],
+                    errors=errors.get((prefix, tuple(sorted(labels.items()))), 0),
+                    total=series["sum"],
+                    p50=quantile(bounds, counts, 0.50),
+                    p95=quantile(bounds, counts, 0.95),
+                    p99=quantile(bounds, counts, 0.99),
+                )
+            )
+    return sorted(rows, key=lambda row: row.total, reverse=True)
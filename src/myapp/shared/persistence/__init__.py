@@ -1,7 +1,65 @@
-"""Persistence backends — JSON and SQLite."""
+"""Persistence backends — JSON, JSON Lines and SQLite.
 
-from myapp.shared.persistence.base import BaseStore
-from myapp.shared.persistence.json_store import JsonStore
-from myapp.shared.persistence.sqlite_store import SqliteStore
+Names are resolved lazily (PEP 562), like in :mod:`myapp.shared`, so that
+importing one submodule (e.g. ``codecs`` for its names) does not import
+every backend, asyncio included.
+"""
 
-__all__ = ["BaseStore", "JsonStore", "SqliteStore"]
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from myapp.shared.persistence.async_store import (
+        AsyncBaseStore,
+        AsyncJsonStore,
+        AsyncSqliteStore,
+        ExecutorStore,
+    )
+    from myapp.shared.persistence.base import BaseStore, ConflictError
+    from myapp.shared.persistence.cached_store import CachedStore, CacheStats
+    from myapp.shared.persistence.json_store import JsonStore
+    from myapp.shared.persistence.jsonl_store import JsonlStore
+    from myapp.shared.persistence.pool import ConnectionPool
+    from myapp.shared.persistence.query import Condition, Query
+    from myapp.shared.persistence.sqlite_store import SqliteStore
+
+_EXPORTS = {
+    "AsyncBaseStore": "myapp.shared.persistence.async_store",
+    "AsyncJsonStore": "myapp.shared.persistence.async_store",
+    "AsyncSqliteStore": "myapp.shared.persistence.async_store",
+    "BaseStore": "myapp.shared.persistence.base",
+    "CacheStats": "myapp.shared.persistence.cached_store",
+    "CachedStore": "myapp.shared.persistence.cached_store",
+    "Condition": "myapp.shared.persistence.query",
+    "ConflictError": "myapp.shared.persistence.base",
+    "ConnectionPool": "myapp.shared.persistence.pool",
+    "ExecutorStore": "myapp.shared.persistence.async_store",
+    "JsonStore": "myapp.shared.persistence.json_store",
+    "JsonlStore": "myapp.shared.persistence.jsonl_store",
+    "Query": "myapp.shared.persistence.query",
+    "SqliteStore": "myapp.shared.persistence.sqlite_store",
+}
+
+__all__ = [
+    "AsyncBaseStore",
+    "AsyncJsonStore",
+    "AsyncSqliteStore",
+    "BaseStore",
+    "CacheStats",
+    "CachedStore",
+    "Condition",
+    "ConflictError",
+    "ConnectionPool",
+    "ExecutorStore",
+    "JsonStore",
+    "JsonlStore",
+    "Query",
+    "SqliteStore",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
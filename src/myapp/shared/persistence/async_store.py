@@ -0,0 +1,273 @@
+"""Asyncio counterparts of the blocking stores.
+
+The blocking backends stay the single source of truth for storage logic;
+:class:`ExecutorStore` runs their methods off the event loop. Every
+database file gets one dedicated writer thread whose executor queue
+serializes all writes to it (so concurrent coroutines never contend for
+SQLite's write lock), while reads can use a separate pool of threads.
+"""
+
+import asyncio
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import TracebackType
+from typing import Any, Generic, ParamSpec, Self, TypeVar
+
+from pydantic import BaseModel
+
+from myapp.shared.persistence.base import BaseStore, Match, record_id_of
+from myapp.shared.persistence.json_store import JsonStore
+from myapp.shared.persistence.jsonl_store import JsonlStore
+from myapp.shared.persistence.query import Query
+from myapp.shared.persistence.sqlite_store import SqliteStore
+
+T = TypeVar("T", bound=BaseModel)
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class AsyncBaseStore(ABC, Generic[T]):
+    """Async interface mirroring :class:`~myapp.shared.persistence.base.BaseStore`."""
+
+    @abstractmethod
+    async def get(self, record_id: str) -> T | None:
+        """Fetch a single record by ID, or None."""
+
+    @abstractmethod
+    async def list_all(self) -> list[T]:
+        """Return every record in the store."""
+
+    @abstractmethod
+    async def get_versioned(self, record_id: str) -> tuple[T, int] | None:
+        """Fetch a record together with its current version, or None."""
+
+    @abstractmethod
+    async def save(self, item: T, *, expected_version: int | None = None) -> T:
+        """Create or update a record, optionally only at ``expected_version``."""
+
+    @abstractmethod
+    async def delete(self, record_id: str) -> bool:
+        """Delete a record. Returns True if it existed."""
+
+    @abstractmethod
+    async def list_page(self, after_id: str | None = None, limit: int = 100) -> list[T]:
+        """Return up to ``limit`` records ordered by ID, starting after ``after_id``."""
+
+    @abstractmethod
+    async def find(self, query: Query) -> list[T]:
+        """Return the records matching ``query``."""
+
+    @abstractmethod
+    async def find_by_values(
+        self,
+        field: str,
+        values: Sequence[Any],
+        *,
+        match: Match = "all",
+        limit: int | None = None,
+    ) -> list[T]:
+        """Return records whose list ``field`` holds all (or any) of ``values``."""
+
+    @abstractmethod
+    async def value_counts(self, field: str) -> dict[Any, int]:
+        """Count how many records hold each value of list ``field``."""
+
+    @abstractmethod
+    async def get_many(self, record_ids: Iterable[str]) -> dict[str, T]:
+        """Fetch several records by ID. Missing IDs are left out of the result."""
+
+    @abstractmethod
+    async def save_many(self, items: Iterable[T]) -> int:
+        """Create or update several records. Returns how many were saved."""
+
+    @abstractmethod
+    async def save_many_raw(self, records: Iterable[bytes | str]) -> int:
+        """Create or update records given as serialized JSON (see ``BaseStore.save_many_raw``)."""
+
+    @abstractmethod
+    async def delete_many(self, record_ids: Iterable[str]) -> int:
+        """Delete several records. Returns how many of them existed."""
+
+    async def iter_raw(self, page_size: int = 500) -> AsyncIterator[bytes]:
+        """Yield every record as compact UTF-8 JSON (see ``BaseStore.iter_raw``)."""
+        async for item in self.iter_all(page_size):
+            yield item.model_dump_json().encode()
+
+    async def iter_all(self, page_size: int = 500) -> AsyncIterator[T]:
+        """Yield every record, fetching one keyset page at a time."""
+        after_id: str | None = None
+        while page := await self.list_page(after_id=after_id, limit=page_size):
+            for item in page:
+                yield item
+            after_id = record_id_of(page[-1])
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def close(self) -> None:
+        """Release any resources held by the store (no-op by default)."""
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+
+# -- per-database writer threads -------------------------------------------
+
+_writers: dict[str, tuple[ThreadPoolExecutor, int]] = {}
+_writers_lock = threading.Lock()
+
+
+def _acquire_writer(key: str) -> ThreadPoolExecutor:
+    with _writers_lock:
+        executor, refs = _writers.get(key, (None, 0))
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-writer")
+        _writers[key] = (executor, refs + 1)
+        return executor
+
+
+def _release_writer(key: str) -> None:
+    with _writers_lock:
+        executor, refs = _writers[key]
+        if refs > 1:
+            _writers[key] = (executor, refs - 1)
+            return
+        del _writers[key]
+    executor.shutdown(wait=True)
+
+
+def _take(records: Iterator[R], count: int) -> list[R]:
+    return list(itertools.islice(records, count))
+
+
+class ExecutorStore(AsyncBaseStore[T], Generic[T]):
+    """Run a blocking store's methods on executor threads.
+
+    Writes go through the writer thread shared by every ``ExecutorStore``
+    with the same ``key`` (normally the database file). Reads use their
+    own pool of ``read_workers`` threads, or the writer thread when
+    ``read_workers`` is 0 — required for stores that are not thread-safe.
+    """
+
+    def __init__(self, store: BaseStore[T], *, key: str, read_workers: int = 0) -> None:
+        self.store = store
+        self._key = key
+        self._writer = _acquire_writer(key)
+        self._reader = (
+            ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="store-reader")
+            if read_workers
+            else None
+        )
+
+    async def _read(self, fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._reader or self._writer, partial(fn, *args, **kwargs)
+        )
+
+    async def _write(self, fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, partial(fn, *args, **kwargs))
+
+    # -- reads -------------------------------------------------------------
+
+    async def get(self, record_id: str) -> T | None:
+        return await self._read(self.store.get, record_id)
+
+    async def get_versioned(self, record_id: str) -> tuple[T, int] | None:
+        return await self._read(self.store.get_versioned, record_id)
+
+    async def list_all(self) -> list[T]:
+        return await self._read(self.store.list_all)
+
+    async def list_page(self, after_id: str | None = None, limit: int = 100) -> list[T]:
+        return await self._read(self.store.list_page, after_id, limit)
+
+    async def iter_raw(self, page_size: int = 500) -> AsyncIterator[bytes]:
+        """Step the blocking store's ``iter_raw`` ``page_size`` records per executor call."""
+        records = self.store.iter_raw()
+        while page := await self._read(_take, records, page_size):
+            for record in page:
+                yield record
+
+    async def find(self, query: Query) -> list[T]:
+        return await self._read(self.store.find, query)
+
+    async def find_by_values(
+        self,
+        field: str,
+        values: Sequence[Any],
+        *,
+        match: Match = "all",
+        limit: int | None = None,
+    ) -> list[T]:
+        return await self._read(self.store.find_by_values, field, values, match=match, limit=limit)
+
+    async def value_counts(self, field: str) -> dict[Any, int]:
+        return await self._read(self.store.value_counts, field)
+
+    async def get_many(self, record_ids: Iterable[str]) -> dict[str, T]:
+        return await self._read(self.store.get_many, list(record_ids))
+
+    # -- writes ------------------------------------------------------------
+
+    async def save(self, item: T, *, expected_version: int | None = None) -> T:
+        return await self._write(self.store.save, item, expected_version=expected_version)
+
+    async def delete(self, record_id: str) -> bool:
+        return await self._write(self.store.delete, record_id)
+
+    async def save_many(self, items: Iterable[T]) -> int:
+        return await self._write(self.store.save_many, list(items))
+
+    async def save_many_raw(self, records: Iterable[bytes | str]) -> int:
+        return await self._write(self.store.save_many_raw, list(records))
+
+    async def delete_many(self, record_ids: Iterable[str]) -> int:
+        return await self._write(self.store.delete_many, list(record_ids))
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def close(self) -> None:
+        """Close the wrapped store, then release the executor threads."""
+        await self._write(self.store.close)
+        if self._reader is not None:
+            self._reader.shutdown(wait=False)
+        await asyncio.get_running_loop().run_in_executor(None, _release_writer, self._key)
+
+
+class AsyncSqliteStore(ExecutorStore[T], Generic[T]):
+    """Async wrapper for a :class:`SqliteStore`.
+
+    Writes are serialized on the database file's writer thread, which
+    keeps one pooled connection for itself; reads run concurrently on one
+    thread per remaining connection (on the writer thread when the pool
+    has a single connection).
+    """
+
+    def __init__(self, store: SqliteStore[T]) -> None:
+        super().__init__(
+            store, key=str(store.db_path.resolve()), read_workers=store.pool.max_size - 1
+        )
+
+
+class AsyncJsonStore(ExecutorStore[T], Generic[T]):
+    """Async wrapper for a :class:`JsonStore` or :class:`JsonlStore`.
+
+    The file stores keep unsynchronized in-memory state, so reads and
+    writes share the file's single writer thread.
+    """
+
+    def __init__(self, store: JsonStore[T] | JsonlStore[T]) -> None:
+        super().__init__(store, key=str(store.path.resolve()))
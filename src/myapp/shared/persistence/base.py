@@ -1,15 +1,68 @@
 """Abstract base for all persistence stores."""
 
+import heapq
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from collections import Counter
+from collections.abc import Iterable, Iterator, Sequence
+from types import TracebackType
+from typing import Any, Generic, Literal, Self, TypeVar
 
 from pydantic import BaseModel
 
+from myapp.shared.metrics import instrument_class
+from myapp.shared.persistence.query import Query
+
 T = TypeVar("T", bound=BaseModel)
 
+Match = Literal["all", "any"]
+
+
+def record_id_of(item: BaseModel) -> str:
+    """Return the ``id`` field every persisted record carries."""
+    return str(getattr(item, "id"))
+
+
+class ConflictError(Exception):
+    """A write's ``expected_version`` did not match the stored record.
+
+    ``actual`` is the version found, 0 when the record does not exist.
+    """
+
+    def __init__(self, record_id: str, expected: int, actual: int) -> None:
+        super().__init__(record_id, expected, actual)
+        self.record_id = record_id
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self) -> str:
+        found = f"version {self.actual}" if self.actual else "no record"
+        return f"id={self.record_id}: expected version {self.expected}, found {found}"
+
+
+def check_version(record_id: str, expected: int | None, actual: int) -> None:
+    """Raise :class:`ConflictError` unless ``expected`` is None or equals ``actual``."""
+    if expected is not None and expected != actual:
+        raise ConflictError(record_id, expected, actual)
+
 
 class BaseStore(ABC, Generic[T]):
-    """Interface that every store backend must implement."""
+    """Interface that every store backend must implement.
+
+    Every record carries a version: 1 when it is first saved, one more on
+    each later save. Passing ``expected_version`` to :meth:`save` makes it
+    a compare-and-swap — it raises :class:`ConflictError` instead of
+    overwriting a record that changed since it was read (0 means "must
+    not exist yet").
+
+    Subclasses are instrumented for :mod:`myapp.shared.metrics`: their
+    public methods are timed while metrics are enabled.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        instrument_class(cls, "store")
+
+    model_class: type[T]
 
     @abstractmethod
     def get(self, record_id: str) -> T | None:
@@ -20,9 +73,136 @@ class BaseStore(ABC, Generic[T]):
         """Return every record in the store."""
 
     @abstractmethod
-    def save(self, item: T) -> T:
-        """Create or update a record. Returns the saved item."""
+    def get_versioned(self, record_id: str) -> tuple[T, int] | None:
+        """Fetch a record together with its current version, or None."""
+
+    @abstractmethod
+    def save(self, item: T, *, expected_version: int | None = None) -> T:
+        """Create or update a record. Returns the saved item.
+
+        With ``expected_version`` the write only happens if the stored
+        version still matches; otherwise :class:`ConflictError` is raised.
+        """
 
     @abstractmethod
     def delete(self, record_id: str) -> bool:
         """Delete a record. Returns True if it existed."""
+
+    # -- streaming & pagination --------------------------------------------
+
+    def iter_all(self) -> Iterator[T]:
+        """Yield every record. Backends override this to avoid materializing the store."""
+        yield from self.list_all()
+
+    def iter_raw(self) -> Iterator[bytes]:
+        """Yield every record as compact UTF-8 JSON, in :meth:`iter_all` order.
+
+        For output that only needs serialized records. Backends that keep
+        records as JSON hand them out without building models; this
+        default serializes :meth:`iter_all`.
+        """
+        for item in self.iter_all():
+            yield item.model_dump_json().encode()
+
+    def list_page(self, after_id: str | None = None, limit: int = 100) -> list[T]:
+        """Return up to ``limit`` records ordered by ID, starting after ``after_id``.
+
+        Pass the ID of the last record of one page as ``after_id`` to get the next.
+        """
+        candidates = (
+            item for item in self.iter_all() if after_id is None or record_id_of(item) > after_id
+        )
+        return heapq.nsmallest(limit, candidates, key=record_id_of)
+
+    # -- queries -----------------------------------------------------------
+
+    def find(self, query: Query) -> list[T]:
+        """Return the records matching ``query``.
+
+        The default evaluates the query in memory over :meth:`iter_all`;
+        backends with a query language override this to push it down.
+        """
+        query.check(self.model_class)
+        return query.apply(self.iter_all())
+
+    def find_by_values(
+        self,
+        field: str,
+        values: Sequence[Any],
+        *,
+        match: Match = "all",
+        limit: int | None = None,
+    ) -> list[T]:
+        """Return records whose list ``field`` holds all (or any) of ``values``, by ID.
+
+        Backends with an inverted index on ``field`` override this; the
+        default scans every record.
+        """
+        wanted = set(values)
+        if not wanted:
+            return []
+
+        def hit(item: T) -> bool:
+            present = set(getattr(item, field) or ())
+            return wanted <= present if match == "all" else not wanted.isdisjoint(present)
+
+        matched = sorted((i for i in self.iter_all() if hit(i)), key=record_id_of)
+        return matched if limit is None else matched[:limit]
+
+    def value_counts(self, field: str) -> dict[Any, int]:
+        """Count how many records hold each value of list ``field``."""
+        counts: Counter[Any] = Counter()
+        for item in self.iter_all():
+            counts.update(set(getattr(item, field) or ()))
+        return dict(counts)
+
+    # -- bulk operations ---------------------------------------------------
+    #
+    # Defaults fall back to the single-record methods; backends override
+    # them with batched implementations.
+
+    def get_many(self, record_ids: Iterable[str]) -> dict[str, T]:
+        """Fetch several records by ID. Missing IDs are left out of the result."""
+        found: dict[str, T] = {}
+        for record_id in record_ids:
+            item = self.get(record_id)
+            if item is not None:
+                found[record_id] = item
+        return found
+
+    def save_many(self, items: Iterable[T]) -> int:
+        """Create or update several records. Returns how many were saved."""
+        count = 0
+        for item in items:
+            self.save(item)
+            count += 1
+        return count
+
+    def save_many_raw(self, records: Iterable[bytes | str]) -> int:
+        """Create or update records given as serialized JSON (e.g. from :meth:`iter_raw`).
+
+        Records must already be valid for ``model_class``: backends that keep
+        JSON store them without validating. This default validates them
+        because it needs models to call :meth:`save_many`.
+        """
+        return self.save_many(self.model_class.model_validate_json(r) for r in records)
+
+    def delete_many(self, record_ids: Iterable[str]) -> int:
+        """Delete several records. Returns how many of them existed."""
+        return sum(1 for record_id in record_ids if self.delete(record_id))
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def close(self) -> None:
+        """Release any resources held by the store (no-op by default)."""
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
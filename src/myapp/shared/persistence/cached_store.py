@@ -0,0 +1,246 @@
+"""Read-through LRU/TTL cache in front of any store.
+
+:class:`CachedStore` keeps validated model instances by ID, with their
+version once one has been read, so a hot ``get`` or ``get_versioned``
+costs a dict lookup instead of a query plus pydantic validation.
+Every write through the wrapper invalidates the affected IDs; writes
+made behind its back (another process, another store object) are only
+picked up once the entry's TTL expires.
+
+Cached instances are shared between callers and must be treated as
+read-only.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+from pydantic import BaseModel
+
+from myapp.shared.persistence.base import BaseStore, Match, record_id_of
+from myapp.shared.persistence.query import Query
+
+T = TypeVar("T", bound=BaseModel)
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how well the cache is doing."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class CachedStore(BaseStore[T], Generic[T]):
+    """Wrap ``store`` with an LRU cache of at most ``max_size`` records.
+
+    Entries older than ``ttl`` seconds are treated as misses; pass
+    ``ttl=None`` to keep entries until they are evicted or invalidated.
+    """
+
+    def __init__(
+        self,
+        store: BaseStore[T],
+        *,
+        max_size: int = 1024,
+        ttl: float | None = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.store = store
+        self.model_class = store.model_class
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        # record id -> (stored at, item, version or None if not read yet)
+        self._entries: OrderedDict[str, tuple[float, T, int | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every write; a read that overlaps a write must not
+        # repopulate the cache with what it fetched.
+        self._generation = 0
+
+    # -- cache bookkeeping -------------------------------------------------
+
+    def _lookup(self, record_id: str, *, versioned: bool = False) -> tuple[T, int | None] | None:
+        """Return a fresh cached entry (counting the hit) or None. Lock held.
+
+        With ``versioned``, an entry whose version has not been read is a miss.
+        """
+        entry = self._entries.get(record_id)
+        if entry is None:
+            return None
+        stored_at, item, version = entry
+        if self.ttl is not None and self._clock() - stored_at >= self.ttl:
+            del self._entries[record_id]
+            self.stats.expirations += 1
+            return None
+        if versioned and version is None:
+            return None
+        self._entries.move_to_end(record_id)
+        self.stats.hits += 1
+        return item, version
+
+    def _fill(self, entries: Iterable[tuple[T, int | None]], generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            now = self._clock()
+            for item, version in entries:
+                record_id = record_id_of(item)
+                if version is None and record_id in self._entries:
+                    version = self._entries[record_id][2]
+                self._entries[record_id] = (now, item, version)
+                self._entries.move_to_end(record_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def _invalidate(self, record_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for record_id in record_ids:
+                self._entries.pop(record_id, None)
+
+    def clear(self) -> None:
+        """Drop every cached entry (stats are kept)."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -- cached reads ------------------------------------------------------
+
+    def get(self, record_id: str) -> T | None:
+        with self._lock:
+            entry = self._lookup(record_id)
+            if entry is not None:
+                return entry[0]
+            self.stats.misses += 1
+            generation = self._generation
+        item = self.store.get(record_id)
+        if item is not None:
+            self._fill([(item, None)], generation)
+        return item
+
+    def get_versioned(self, record_id: str) -> tuple[T, int] | None:
+        # A stale version only makes a compare-and-swap fail, and a failed
+        # save through this wrapper invalidates the entry like any other.
+        with self._lock:
+            entry = self._lookup(record_id, versioned=True)
+            if entry is not None:
+                item, version = entry
+                if version is not None:
+                    return item, version
+            self.stats.misses += 1
+            generation = self._generation
+        found = self.store.get_versioned(record_id)
+        if found is not None:
+            self._fill([found], generation)
+        return found
+
+    def get_many(self, record_ids: Iterable[str]) -> dict[str, T]:
+        found: dict[str, T] = {}
+        missing: list[str] = []
+        with self._lock:
+            for record_id in dict.fromkeys(record_ids):
+                entry = self._lookup(record_id)
+                if entry is None:
+                    missing.append(record_id)
+                else:
+                    found[record_id] = entry[0]
+            self.stats.misses += len(missing)
+            generation = self._generation
+        if missing:
+            fetched = self.store.get_many(missing)
+            self._fill(((item, None) for item in fetched.values()), generation)
+            found.update(fetched)
+        return found
+
+    # -- writes (invalidate, then delegate) --------------------------------
+
+    def save(self, item: T, *, expected_version: int | None = None) -> T:
+        try:
+            return self.store.save(item, expected_version=expected_version)
+        finally:
+            self._invalidate([record_id_of(item)])
+
+    def delete(self, record_id: str) -> bool:
+        try:
+            return self.store.delete(record_id)
+        finally:
+            self._invalidate([record_id])
+
+    def save_many(self, items: Iterable[T]) -> int:
+        ids: list[str] = []
+
+        def tracked() -> Iterator[T]:
+            for item in items:
+                ids.append(record_id_of(item))
+                yield item
+
+        try:
+            return self.store.save_many(tracked())
+        finally:
+            self._invalidate(ids)
+
+    def save_many_raw(self, records: Iterable[bytes | str]) -> int:
+        # IDs would have to be parsed out of every record; drop the lot instead.
+        try:
+            return self.store.save_many_raw(records)
+        finally:
+            self.clear()
+
+    def delete_many(self, record_ids: Iterable[str]) -> int:
+        ids = list(record_ids)
+        try:
+            return self.store.delete_many(ids)
+        finally:
+            self._invalidate(ids)
+
+    # -- uncached reads ----------------------------------------------------
+
+    def list_all(self) -> list[T]:
+        return self.store.list_all()
+
+    def iter_all(self) -> Iterator[T]:
+        return self.store.iter_all()
+
+    def iter_raw(self) -> Iterator[bytes]:
+        return self.store.iter_raw()
+
+    def list_page(self, after_id: str | None = None, limit: int = 100) -> list[T]:
+        return self.store.list_page(after_id=after_id, limit=limit)
+
+    def find(self, query: Query) -> list[T]:
+        return self.store.find(query)
+
+    def find_by_values(
+        self,
+        field: str,
+        values: Sequence[Any],
+        *,
+        match: Match = "all",
+        limit: int | None = None,
+    ) -> list[T]:
+        return self.store.find_by_values(field, values, match=match, limit=limit)
+
+    def value_counts(self, field: str) -> dict[Any, int]:
+        return self.store.value_counts(field)
+
+    def close(self) -> None:
+        self.clear()
+        self.store.close()
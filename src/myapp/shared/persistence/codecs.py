@@ -0,0 +1,99 @@
+"""Encodings for the ``data`` column of :class:`SqliteStore` tables.
+
+A codec name is a layout, optionally followed by ``-zlib``:
+
+* ``json`` — the record as a JSON object (TEXT). The default, and the
+  only layout SQLite's JSON1 functions can look inside, so it is the only
+  one that supports query pushdown and expression indexes.
+* ``compact`` — a JSON array ``[layout, value, value, ...]`` holding the
+  field values in model order, without repeating the field names in
+  every row. ``layout`` numbers the field list, which is kept in the
+  table's ``<table>__codec`` side table; a model that gains or loses
+  fields gets a new layout while old rows keep decoding with theirs.
+* ``*-zlib`` — payloads of at least :data:`COMPRESS_MIN` bytes are
+  zlib-compressed and stored as BLOBs; shorter ones are stored as is.
+
+Decoding sniffs every value, so a table may hold any mix of encodings,
+e.g. while ``migrate-codec`` is rewriting it: a BLOB starting with
+``x`` is zlib, text starting with ``[`` is compact and anything else is
+a JSON object.
+"""
+
+import zlib
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any
+
+from pydantic_core import from_json, to_json
+
+CODECS = ("json", "json-zlib", "compact", "compact-zlib")
+
+# Smallest encoded payload worth compressing.
+COMPRESS_MIN = 128
+
+_ZLIB_LEVEL = 6
+
+
+class RecordCodec:
+    """Encode records for the ``data`` column and decode any stored form back.
+
+    ``layouts`` maps the compact layout numbers known so far to their field
+    names; ``layout`` is the one new rows are written with (required by the
+    compact codecs). ``load_layout`` is called for numbers written by
+    another store since this one started.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        layout: int | None,
+        layouts: Mapping[int, Sequence[str]],
+        load_layout: Callable[[int], Sequence[str]],
+    ) -> None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown codec {name!r}; choose from {', '.join(CODECS)}")
+        self.name = name
+        self.compact = name.startswith("compact")
+        self.compress = name.endswith("-zlib")
+        self._layouts = {number: tuple(fields) for number, fields in layouts.items()}
+        if self.compact and layout is None:
+            raise ValueError(f"Codec {name!r} needs a layout")
+        self.layout = layout
+        self._fields = self._layouts[layout] if layout is not None else ()
+        self._load_layout = load_layout
+
+    def _pack(self, payload: bytes) -> str | bytes:
+        if self.compress and len(payload) >= COMPRESS_MIN:
+            return zlib.compress(payload, _ZLIB_LEVEL)
+        return payload.decode()
+
+    def encode(self, values: dict[str, Any]) -> str | bytes:
+        """Encode a record given as its JSON-mode dict (``model_dump(mode="json")``)."""
+        if self.compact:
+            return self._pack(to_json([self.layout, *(values[f] for f in self._fields)]))
+        return self._pack(to_json(values))
+
+    def encode_json(self, text: str) -> str | bytes:
+        """Encode a record given as JSON object text (``model_dump_json()``)."""
+        if self.compact:
+            return self.encode(from_json(text))
+        return self._pack(text.encode()) if self.compress else text
+
+    def decode(self, data: str | bytes) -> str | bytes | dict[str, Any]:
+        """Return JSON object text, or a dict for compact rows."""
+        if isinstance(data, bytes) and data[:1] == b"x":
+            data = zlib.decompress(data)
+        if data[:1] not in ("[", b"["):
+            return data
+        number, *values = from_json(data)
+        fields = self._layouts.get(number)
+        if fields is None:
+            fields = self._layouts[number] = tuple(self._load_layout(number))
+        return dict(zip(fields, values, strict=True))
+
+    def decode_bytes(self, data: str | bytes) -> bytes:
+        """Return the record as compact JSON object bytes."""
+        payload = self.decode(data)
+        if isinstance(payload, dict):
+            return to_json(payload)
+        return payload.encode() if isinstance(payload, str) else payload
@@ -0,0 +1,158 @@
+"""Turn stored payloads back into models, validating only when needed.
+
+Stores write records with ``model_dump`` / ``model_dump_json``, so a
+record read back unchanged by the same code is already valid. With
+``trusted=True`` a :class:`RecordDecoder` builds such records directly —
+converting ISO strings back to datetimes and copying lists, nothing
+more — and falls back to full pydantic validation whenever it cannot
+vouch for the payload:
+
+* the model has a field type the fast path does not understand (nested
+  models, sets, enums, ...), private attributes or ``extra="allow"``;
+* the payload's keys differ from the model's fields;
+* the payload's ``schema_version`` differs from the model's default,
+  i.e. it was written by an older (or newer) version of the schema.
+
+Per record, building is only modestly cheaper than pydantic-core's
+native validation, so the gain is on stores that keep parsed records
+(JSON, JSONL). The cyclic garbage collector is left alone: it is
+process-wide, and pausing it for one read would pause it for every
+other thread in a long-running server too.
+
+Writes are never affected: they always go through validated models.
+"""
+
+import types
+from collections.abc import Callable, Iterable
+from datetime import datetime
+from typing import Any, Generic, TypeVar, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+_SCALARS: frozenset[Any] = frozenset({str, int, float, bool, type(None)})
+
+
+def _parse_datetime(value: Any) -> Any:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _copy_list(value: Any) -> Any:
+    return list(value) if isinstance(value, list) else value
+
+
+def _copy_dict(value: Any) -> Any:
+    return dict(value) if isinstance(value, dict) else value
+
+
+def _converter(annotation: Any) -> Callable[[Any], Any] | None:
+    """How to rebuild a field from its JSON form.
+
+    Returns a converter, or None when the JSON value can be used as is.
+    Raises ``TypeError`` when the fast path does not support the type.
+    """
+    if annotation in _SCALARS or annotation is Any:
+        return None
+    if annotation is datetime:
+        return _parse_datetime
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin in (Union, types.UnionType):
+        members = [a for a in args if a is not type(None)]
+        if len(members) == 1:
+            return _converter(members[0])
+        if all(a in _SCALARS for a in members):
+            return None
+    if origin is list and all(a in _SCALARS for a in args):
+        return _copy_list
+    if origin is dict and all(a in _SCALARS for a in args):
+        return _copy_dict
+    raise TypeError(f"no fast decoding for {annotation!r}")
+
+
+class RecordDecoder(Generic[T]):
+    """Build ``model_class`` instances from stored dicts or JSON text."""
+
+    def __init__(self, model_class: type[T], *, trusted: bool = False) -> None:
+        self.model_class = model_class
+        converters: list[tuple[str, Callable[[Any], Any]]] = []
+        supported = (
+            not model_class.__private_attributes__
+            and model_class.model_config.get("extra") != "allow"
+        )
+        for name, info in model_class.model_fields.items():
+            try:
+                converter = _converter(info.annotation)
+            except TypeError:
+                supported = False
+                continue
+            if converter is not None:
+                converters.append((name, converter))
+        self.trusted = trusted and supported
+        self._build = self._make_builder(converters)
+
+    def _make_builder(
+        self, converters: list[tuple[str, Callable[[Any], Any]]]
+    ) -> Callable[[dict[str, Any]], T | None]:
+        """Compile the fast path; it returns None for payloads it cannot vouch for.
+
+        Everything is bound to locals up front: this runs once per record.
+        """
+        cls = self.model_class
+        fields = frozenset(cls.model_fields)
+        version_field = cls.model_fields.get("schema_version")
+        version = version_field.default if version_field is not None else None
+        post_init = cls.__pydantic_post_init__ is not None
+        new = cls.__new__
+        set_attr = object.__setattr__
+
+        def build(raw: dict[str, Any]) -> T | None:
+            if raw.get("schema_version") != version or raw.keys() != fields:
+                return None
+            values = raw.copy()
+            for name, convert in converters:
+                values[name] = convert(values[name])
+            # What model_construct does, minus its per-call field walk.
+            item = new(cls)
+            set_attr(item, "__dict__", values)
+            set_attr(item, "__pydantic_fields_set__", set(values))
+            set_attr(item, "__pydantic_extra__", None)
+            set_attr(item, "__pydantic_private__", None)
+            if post_init:
+                item.model_post_init(None)
+            return item
+
+        return build
+
+    def from_dict(self, raw: dict[str, Any]) -> T:
+        """Decode a record parsed from JSON (``raw`` itself is never mutated)."""
+        if self.trusted and (item := self._build(raw)) is not None:
+            return item
+        return self.model_class.model_validate(raw)
+
+    def from_json(self, data: str | bytes) -> T:
+        """Decode a record stored as JSON text.
+
+        pydantic-core parses and validates JSON in one native pass, which
+        is at least as fast as parsing it here and building the model
+        in Python, so text payloads are always validated.
+        """
+        return self.model_class.model_validate_json(data)
+
+    def from_payload(self, payload: str | bytes | dict[str, Any]) -> T:
+        """Decode a record that is either JSON text or already parsed."""
+        if isinstance(payload, dict):
+            return self.from_dict(payload)
+        return self.model_class.model_validate_json(payload)
+
+    def many_from_payloads(self, payloads: Iterable[str | bytes | dict[str, Any]]) -> list[T]:
+        """Decode a batch mixing JSON text and parsed records."""
+        return [self.from_payload(payload) for payload in payloads]
+
+    def many_from_dicts(self, raws: Iterable[dict[str, Any]]) -> list[T]:
+        """Decode a batch of parsed records."""
+        return [self.from_dict(raw) for raw in raws]
+
+    def many_from_json(self, payloads: Iterable[str | bytes]) -> list[T]:
+        """Decode a batch of JSON text records."""
+        return [self.model_class.model_validate_json(data) for data in payloads]
@@ -0,0 +1,87 @@
+"""File helpers shared by the file-based backends."""
+
+import os
+import sys
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, TextIO
+
+from pydantic_core import to_json
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock(fd: int) -> None:
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    def _unlock(fd: int) -> None:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def json_bytes(record: dict[str, Any]) -> bytes:
+    """Compact UTF-8 JSON for one stored record (the format ``iter_raw`` yields).
+
+    pydantic-core's serializer writes the same bytes as ``model_dump_json``
+    and is several times faster than ``json.dumps`` here.
+    """
+    return to_json(record)
+
+
+@contextmanager
+def _staged(path: Path) -> Iterator[int]:
+    """Yield a temp file descriptor next to ``path``; replace ``path`` with it on success."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        yield fd
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+@contextmanager
+def atomic_write(path: Path) -> Iterator[TextIO]:
+    """Write to a temp file next to ``path``, then ``os.replace`` it into place.
+
+    If the block raises, the temp file is removed and ``path`` is untouched.
+    """
+    with _staged(path) as fd, os.fdopen(fd, "w", encoding="utf-8") as fh:
+        yield fh
+
+
+@contextmanager
+def atomic_write_bytes(path: Path) -> Iterator[BinaryIO]:
+    """Binary twin of :func:`atomic_write`."""
+    with _staged(path) as fd, os.fdopen(fd, "wb") as fh:
+        yield fh
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``<path>.lock`` for the duration of the block.
+
+    Serializes read-modify-write cycles on ``path`` across threads and
+    processes. The lock is advisory: only writers that take it are kept
+    out. The lock file is left in place, since removing it would race
+    with the next writer.
+    """
+    lock_path = path.with_name(path.name + ".lock")
+    with lock_path.open("a+b") as fh:
+        fh.seek(0)
+        _lock(fh.fileno())
+        try:
+            yield
+        finally:
+            _unlock(fh.fileno())
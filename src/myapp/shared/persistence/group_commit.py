@@ -0,0 +1,136 @@
+"""Group commit: one writer thread that commits queued writes in batches.
+
+Every SQLite commit in WAL mode ends with an fsync, so a store that
+commits each ``save`` on its own is capped at the disk's fsync rate, and
+several threads writing at once fight over the database lock.
+:class:`GroupCommitWriter` funnels writes through a single thread instead:
+it takes whatever operations are queued (up to ``max_batch``, waiting at
+most ``max_delay`` seconds for more), runs them in one transaction and
+commits once.
+
+Each operation runs inside its own savepoint, so one failing operation
+only fails its own future. Futures resolve after the commit, i.e. once
+the write is durable.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from contextlib import AbstractContextManager
+from typing import Any, TypeVar
+
+from myapp.shared.logging import get_logger
+
+R = TypeVar("R")
+
+Operation = Callable[[sqlite3.Connection], Any]
+
+_STOP = None
+
+logger = get_logger(__name__)
+
+
+class GroupCommitWriter:
+    """Run submitted operations on a background thread, committing in batches.
+
+    ``connect`` must return a context manager that yields a connection in
+    sqlite3's default transaction mode and commits when the block exits,
+    like ``SqliteStore._connect``.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], AbstractContextManager[sqlite3.Connection]],
+        *,
+        max_batch: int = 256,
+        max_delay: float = 0.0,
+        name: str = "group-commit",
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        if max_delay < 0:
+            raise ValueError("max_delay must not be negative")
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._connect = connect
+        self._queue: queue.SimpleQueue[tuple[Operation, Future[Any]] | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: Callable[[sqlite3.Connection], R]) -> Future[R]:
+        """Queue ``operation``; its future resolves once the batch holding it commits."""
+        future: Future[R] = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GroupCommitWriter is closed")
+            self._queue.put((operation, future))
+        return future
+
+    def close(self) -> None:
+        """Commit everything submitted so far, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    # -- writer thread -----------------------------------------------------
+
+    def _run(self) -> None:
+        while (first := self._queue.get()) is not _STOP:
+            batch = [first]
+            stop = self._collect(batch)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _collect(self, batch: list[tuple[Operation, Future[Any]]]) -> bool:
+        """Top ``batch`` up from the queue; return True if the stop marker was seen."""
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    entry = self._queue.get(timeout=remaining)
+                else:
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if entry is _STOP:
+                return True
+            batch.append(entry)
+        return False
+
+    def _commit(self, batch: list[tuple[Operation, Future[Any]]]) -> None:
+        live = [(op, f) for op, f in batch if f.set_running_or_notify_cancel()]
+        if not live:
+            return
+        results: list[tuple[Future[Any], Any]] = []
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for op, future in live:
+                    conn.execute("SAVEPOINT op")
+                    try:
+                        result = op(conn)
+                    except Exception as exc:
+                        conn.execute("ROLLBACK TO op")
+                        future.set_exception(exc)
+                    else:
+                        results.append((future, result))
+                    conn.execute("RELEASE op")
+        except Exception as exc:
+            # The transaction itself failed: nothing in it was committed.
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        logger.debug("Committed %d of %d operation(s) in one batch", len(results), len(live))
+        for future, result in results:
+            future.set_result(result)
@@ -2,51 +2,189 @@
 
 Writes are atomic: data is written to a temporary file first,
 then atomically moved into place via ``os.replace``.
+
+The parsed file is kept in memory, indexed by ``id``, and only re-read
+when the file's inode, size or mtime changes — so edits made by other
+processes or by hand are still picked up. List fields named in
+``indexed_fields`` additionally get in-memory posting lists
+(value -> set of IDs), updated incrementally on every write.
+
+Writers hold an exclusive lock on ``<file>.lock`` (see
+:func:`~myapp.shared.persistence.files.file_lock`) from reading the file
+to replacing it, so concurrent processes no longer lose each other's
+writes. Record versions are kept next to the file, in ``<file>.versions``
+(an ``{id: version}`` object), so the data file stays a plain object keyed
+by ``id``; records without an entry (written before versions existed, or
+added by hand) are at version 1. The sidecar is replaced before the data
+file, so a crash in between can only leave versions ahead, never behind.
 """
 
 import json
-import os
-import tempfile
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator, Sequence
 from pathlib import Path
-from typing import Generic, TypeVar
+from typing import Any, Generic, TypeVar
 
 from pydantic import BaseModel
 
-from myapp.shared.persistence.base import BaseStore
+from myapp.shared.logging import get_logger
+from myapp.shared.persistence.base import BaseStore, Match, check_version
+from myapp.shared.persistence.decoding import RecordDecoder
+from myapp.shared.persistence.files import atomic_write, file_lock, json_bytes
 
 T = TypeVar("T", bound=BaseModel)
 
+logger = get_logger(__name__)
+
+# Where versions were kept inside the data file before the sidecar; still read.
+_LEGACY_VERSIONS_KEY = "__versions__"
+
 
 class JsonStore(BaseStore[T], Generic[T]):
-    """Store records as a JSON object keyed by ``id``."""
+    """Store records as a JSON object keyed by ``id``.
+
+    ``trusted_reads=True`` skips pydantic validation for records written by
+    the current schema version (see :mod:`~myapp.shared.persistence.decoding`).
+    """
 
-    def __init__(self, path: Path, model_class: type[T]) -> None:
+    def __init__(
+        self,
+        path: Path,
+        model_class: type[T],
+        *,
+        indexed_fields: Sequence[str] = (),
+        trusted_reads: bool = False,
+    ) -> None:
         self.path = path
+        self.versions_path = path.with_name(path.name + ".versions")
         self.model_class = model_class
+        self._decoder = RecordDecoder(model_class, trusted=trusted_reads)
+        self.indexed_fields = tuple(indexed_fields)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._cache: dict[str, dict] = {}
+        self._versions: dict[str, int] = {}
+        self._signature: tuple[int, int, int] | None = None
+        self._sorted_ids: list[str] | None = None
+        self._postings: dict[str, dict[Any, set[str]]] | None = None
 
     # -- internal helpers --------------------------------------------------
 
-    def _read_all(self) -> dict[str, dict]:
-        if not self.path.exists():
-            return {}
-        text = self.path.read_text(encoding="utf-8")
-        if not text.strip():
-            return {}
-        return json.loads(text)  # type: ignore[no-any-return]
-
-    def _write_all(self, data: dict[str, dict]) -> None:
-        """Atomic write: tmp file -> os.replace."""
-        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+    def _stat_signature(self) -> tuple[int, int, int] | None:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _read_all(self, *, locked: bool = False) -> dict[str, dict]:
+        """Return the cached records, reloading them if the file changed.
+
+        The returned dict is shared with the cache: callers that intend to
+        modify it must use :meth:`_read_for_update` instead. A reload takes
+        the writers' lock (unless ``locked`` says it is held) so the data
+        file and its versions sidecar are read as a pair.
+        """
+        # Stat before reading so a concurrent replace is caught next time.
+        signature = self._stat_signature()
+        if signature != self._signature:
+            if locked:
+                self._load(signature)
+            else:
+                with file_lock(self.path):
+                    self._load(self._stat_signature())
+        return self._cache
+
+    def _load(self, signature: tuple[int, int, int] | None) -> None:
+        if signature is None:
+            self._cache, self._versions = {}, {}
+        else:
+            text = self.path.read_text(encoding="utf-8")
+            self._cache = json.loads(text) if text.strip() else {}
+            self._versions = self._read_versions()
+        self._signature = signature
+        self._sorted_ids = self._postings = None
+
+    def _read_versions(self) -> dict[str, int]:
+        legacy = self._cache.get(_LEGACY_VERSIONS_KEY)
+        if isinstance(legacy, dict) and legacy.get("id") != _LEGACY_VERSIONS_KEY:
+            del self._cache[_LEGACY_VERSIONS_KEY]
+        else:
+            legacy = {}
         try:
-            with os.fdopen(fd, "w", encoding="utf-8") as fh:
-                json.dump(data, fh, indent=2, default=str)
-                fh.write("\n")
-            os.replace(tmp, self.path)
-        except BaseException:
-            if os.path.exists(tmp):
-                os.unlink(tmp)
-            raise
+            versions: dict[str, int] = json.loads(self.versions_path.read_bytes())
+        except FileNotFoundError:
+            return legacy
+        return versions
+
+    def _read_for_update(self) -> dict[str, dict]:
+        """Return a private copy of the records for a read-modify-write.
+
+        Hold :func:`file_lock` from this call until the matching :meth:`_write_all`.
+        """
+        return dict(self._read_all(locked=True))
+
+    def _version(self, record_id: str) -> int:
+        """Current version of ``record_id`` in the cached snapshot (0 if absent)."""
+        if record_id not in self._cache:
+            return 0
+        return self._versions.get(record_id, 1)
+
+    def _write_all(self, data: dict[str, dict], changed: Iterable[str] | None = None) -> None:
+        """Atomic write: tmp file -> os.replace.
+
+        ``changed`` lists the IDs that differ from the cached copy: their
+        versions are bumped and their postings patched instead of rebuilt.
+        """
+        changed = list(changed) if changed is not None else None
+        versions = dict(self._versions)
+        for record_id in changed or ():
+            if record_id in data:
+                versions[record_id] = self._version(record_id) + 1
+            else:
+                versions.pop(record_id, None)
+        with atomic_write(self.versions_path) as fh:
+            json.dump(versions, fh)
+            fh.write("\n")
+        with atomic_write(self.path) as fh:
+            json.dump(data, fh, indent=2, default=str)
+            fh.write("\n")
+        logger.debug("Rewrote %s with %d record(s)", self.path, len(data))
+        previous = self._cache
+        self._cache, self._versions = data, versions
+        self._signature = self._stat_signature()
+        self._sorted_ids = None
+        if self._postings is not None and changed is not None:
+            for record_id in changed:
+                self._unpost(record_id, previous.get(record_id))
+                self._post(record_id, data.get(record_id))
+        else:
+            self._postings = None
+
+    def _post(self, record_id: str, raw: dict | None) -> None:
+        if raw is None or self._postings is None:
+            return
+        for field, postings in self._postings.items():
+            for value in raw.get(field) or ():
+                postings.setdefault(value, set()).add(record_id)
+
+    def _unpost(self, record_id: str, raw: dict | None) -> None:
+        if raw is None or self._postings is None:
+            return
+        for field, postings in self._postings.items():
+            for value in raw.get(field) or ():
+                ids = postings.get(value)
+                if ids is not None:
+                    ids.discard(record_id)
+                    if not ids:
+                        del postings[value]
+
+    def _postings_for(self, field: str) -> dict[Any, set[str]]:
+        data = self._read_all()
+        if self._postings is None:
+            self._postings = {f: {} for f in self.indexed_fields}
+            for record_id, raw in data.items():
+                self._post(record_id, raw)
+        return self._postings[field]
 
     # -- public API --------------------------------------------------------
 
@@ -55,23 +193,129 @@ class JsonStore(BaseStore[T], Generic[T]):
         raw = data.get(record_id)
         if raw is None:
             return None
-        return self.model_class.model_validate(raw)
+        return self._decoder.from_dict(raw)
 
-    def list_all(self) -> list[T]:
+    def get_versioned(self, record_id: str) -> tuple[T, int] | None:
         data = self._read_all()
-        return [self.model_class.model_validate(v) for v in data.values()]
+        raw = data.get(record_id)
+        if raw is None:
+            return None
+        return self._decoder.from_dict(raw), self._version(record_id)
 
-    def save(self, item: T) -> T:
+    def list_all(self) -> list[T]:
         data = self._read_all()
+        return self._decoder.many_from_dicts(data.values())
+
+    def save(self, item: T, *, expected_version: int | None = None) -> T:
         item_dict = item.model_dump(mode="json")
-        data[item_dict["id"]] = item_dict
-        self._write_all(data)
+        with file_lock(self.path):
+            data = self._read_for_update()
+            check_version(item_dict["id"], expected_version, self._version(item_dict["id"]))
+            data[item_dict["id"]] = item_dict
+            self._write_all(data, [item_dict["id"]])
         return item
 
     def delete(self, record_id: str) -> bool:
-        data = self._read_all()
-        if record_id not in data:
-            return False
-        del data[record_id]
-        self._write_all(data)
+        with file_lock(self.path):
+            data = self._read_for_update()
+            if record_id not in data:
+                return False
+            del data[record_id]
+            self._write_all(data, [record_id])
         return True
+
+    # -- streaming & pagination --------------------------------------------
+
+    def iter_all(self) -> Iterator[T]:
+        """Validate records one at a time from the cached snapshot."""
+        for raw in self._read_all().values():
+            yield self._decoder.from_dict(raw)
+
+    def iter_raw(self) -> Iterator[bytes]:
+        """Serialize records straight from the cached snapshot."""
+        for raw in list(self._read_all().values()):
+            yield json_bytes(raw)
+
+    def list_page(self, after_id: str | None = None, limit: int = 100) -> list[T]:
+        data = self._read_all()
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(data)
+        start = 0 if after_id is None else bisect_right(self._sorted_ids, after_id)
+        ids = self._sorted_ids[start : start + limit]
+        return self._decoder.many_from_dicts(data[record_id] for record_id in ids)
+
+    # -- inverted index ----------------------------------------------------
+
+    def find_by_values(
+        self,
+        field: str,
+        values: Sequence[Any],
+        *,
+        match: Match = "all",
+        limit: int | None = None,
+    ) -> list[T]:
+        """Intersect (or union) posting lists when ``field`` is indexed."""
+        if field not in self.indexed_fields:
+            return super().find_by_values(field, values, match=match, limit=limit)
+        wanted = list(dict.fromkeys(values))
+        if not wanted:
+            return []
+        postings = self._postings_for(field)
+        hits = [postings.get(value, set()) for value in wanted]
+        if match == "all":
+            ids = set.intersection(*sorted(hits, key=len))
+        else:
+            ids = set.union(*hits)
+        data = self._read_all()
+        return self._decoder.many_from_dicts(data[rid] for rid in sorted(ids)[:limit])
+
+    def value_counts(self, field: str) -> dict[Any, int]:
+        if field not in self.indexed_fields:
+            return super().value_counts(field)
+        return {value: len(ids) for value, ids in self._postings_for(field).items()}
+
+    # -- bulk operations ---------------------------------------------------
+    #
+    # One read-modify-write per call instead of one per record.
+
+    def get_many(self, record_ids: Iterable[str]) -> dict[str, T]:
+        data = self._read_all()
+        return {
+            record_id: self._decoder.from_dict(data[record_id])
+            for record_id in record_ids
+            if record_id in data
+        }
+
+    def save_many(self, items: Iterable[T]) -> int:
+        dumped = [item.model_dump(mode="json") for item in items]
+        with file_lock(self.path):
+            data = self._read_for_update()
+            for item_dict in dumped:
+                data[item_dict["id"]] = item_dict
+            if dumped:
+                self._write_all(data, {item_dict["id"]: None for item_dict in dumped})
+        return len(dumped)
+
+    def save_many_raw(self, records: Iterable[bytes | str]) -> int:
+        """Upsert serialized records (e.g. another store's :meth:`iter_raw`).
+
+        The records are trusted: they are parsed but not validated, so
+        only feed this from stores holding the same model.
+        """
+        parsed = [json.loads(record) for record in records]
+        with file_lock(self.path):
+            data = self._read_for_update()
+            for item_dict in parsed:
+                data[item_dict["id"]] = item_dict
+            if parsed:
+                self._write_all(data, {item_dict["id"]: None for item_dict in parsed})
+        return len(parsed)
+
+    def delete_many(self, record_ids: Iterable[str]) -> int:
+        ids = set(record_ids)
+        with file_lock(self.path):
+            data = self._read_for_update()
+            removed = [record_id for record_id in ids if data.pop(record_id, None)]
+            if removed:
+                self._write_all(data, removed)
+        return len(removed)
@@ -0,0 +1,275 @@
+"""Append-only JSON Lines persistence backend.
+
+Every mutation appends one line to the log — an upsert
+(``{"op": "put", "id": ..., "data": {...}}``) or a tombstone
+(``{"op": "del", "id": ...}``) — so write cost no longer grows with the
+size of the store. State is rebuilt by replaying the log on open.
+
+Once superseded lines outnumber live records (and pass a minimum count)
+the log is compacted: live records are rewritten to a temp file that is
+atomically moved into place via ``os.replace``.
+
+Upserts carry the record's new version (``"version": n``); lines written
+before versions existed count one up from the previous line for the
+same ID. Writers hold an exclusive lock on ``<file>.lock`` (see
+:func:`~myapp.shared.persistence.files.file_lock`) while they check
+versions and append, so compare-and-swap saves hold across processes.
+Within a process, the replayed state is guarded by a lock that writers
+take inside the file lock and readers take around syncing and reading.
+"""
+
+import heapq
+import json
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Generic, TypeVar
+
+from pydantic import BaseModel
+
+from myapp.shared.logging import get_logger
+from myapp.shared.persistence.base import BaseStore, check_version, record_id_of
+from myapp.shared.persistence.decoding import RecordDecoder
+from myapp.shared.persistence.files import atomic_write, file_lock, json_bytes
+
+T = TypeVar("T", bound=BaseModel)
+
+logger = get_logger(__name__)
+
+
+def _encode(entry: dict) -> str:
+    return json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+
+
+class JsonlStore(BaseStore[T], Generic[T]):
+    """Store records as an append-only log of JSON lines.
+
+    Appends made by other processes are picked up on the next call; the
+    log is re-read from scratch when its inode changes (i.e. after
+    another process compacted it). One instance may be shared between
+    threads. ``trusted_reads=True`` skips pydantic validation for records
+    written by the current schema version.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        model_class: type[T],
+        *,
+        compact_min_garbage: int = 1000,
+        compact_ratio: float = 1.0,
+        trusted_reads: bool = False,
+    ) -> None:
+        self.path = path
+        self.model_class = model_class
+        self._decoder = RecordDecoder(model_class, trusted=trusted_reads)
+        self.compact_min_garbage = compact_min_garbage
+        self.compact_ratio = compact_ratio
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._records: dict[str, dict] = {}
+        self._versions: dict[str, int] = {}
+        self._entries = 0
+        self._offset = 0
+        self._inode: int | None = None
+        # Guards the replayed state; reentrant because writers sync and append under it.
+        self._lock = threading.RLock()
+        self._sync()
+
+    # -- internal helpers --------------------------------------------------
+
+    @property
+    def garbage(self) -> int:
+        """Number of log lines that no longer describe a live record."""
+        return self._entries - len(self._records)
+
+    def _reset(self) -> None:
+        self._records, self._versions = {}, {}
+        self._entries, self._offset, self._inode = 0, 0, None
+
+    def _sync(self) -> None:
+        """Bring in-memory state up to date with the log on disk."""
+        with self._lock:
+            try:
+                st = self.path.stat()
+            except FileNotFoundError:
+                self._reset()
+                return
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self._reset()
+                self._inode = st.st_ino
+            if st.st_size > self._offset:
+                with self.path.open("rb") as fh:
+                    fh.seek(self._offset)
+                    self._replay(fh)
+
+    def _synced_records(self) -> dict[str, dict]:
+        """Sync, then return a snapshot of the live records that later writes leave alone."""
+        with self._lock:
+            self._sync()
+            return dict(self._records)
+
+    def _replay(self, fh: BinaryIO) -> None:
+        for line in fh:
+            if not line.endswith(b"\n"):
+                break  # partial line still being written; pick it up later
+            self._offset += len(line)
+            self._entries += 1
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                if line.strip():
+                    logger.warning("Skipping corrupt line in %s", self.path)
+                continue
+            record_id = entry["id"]
+            if entry.get("op") == "del":
+                self._records.pop(record_id, None)
+                self._versions.pop(record_id, None)
+            else:
+                self._records[record_id] = entry["data"]
+                self._versions[record_id] = (
+                    entry.get("version") or self._versions.get(record_id, 0) + 1
+                )
+
+    def _put_entries(self, records: Iterable[tuple[str, dict]]) -> list[dict]:
+        """Upsert lines for ``(id, data)`` pairs, numbered from the synced versions."""
+        versions: dict[str, int] = {}
+        entries = []
+        for record_id, data in records:
+            version = versions[record_id] = versions.get(record_id, self._version(record_id)) + 1
+            entries.append({"op": "put", "id": record_id, "data": data, "version": version})
+        return entries
+
+    def _version(self, record_id: str) -> int:
+        return self._versions.get(record_id, 0)
+
+    def _append(self, entries: list[dict]) -> None:
+        """Append ``entries``; call with :meth:`_locked` held, after :meth:`_sync`."""
+        if not entries:
+            return
+        payload = "".join(_encode(e) for e in entries)
+        with self._lock:
+            with self.path.open("a+b") as fh:
+                # Terminate a torn line left by a crashed writer.
+                if fh.tell() > 0:
+                    fh.seek(-1, 2)
+                    if fh.read(1) != b"\n":
+                        payload = "\n" + payload
+                fh.write(payload.encode("utf-8"))
+            self._sync()
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        garbage = self.garbage
+        if (
+            garbage >= self.compact_min_garbage
+            and garbage > len(self._records) * self.compact_ratio
+        ):
+            self._compact()
+
+    def _compact(self) -> None:
+        with self._lock:
+            self._sync()
+            with atomic_write(self.path) as fh:
+                for record_id, data in self._records.items():
+                    version = self._versions[record_id]
+                    entry = {"op": "put", "id": record_id, "data": data, "version": version}
+                    fh.write(_encode(entry))
+            logger.debug("Compacted %s to %d record(s)", self.path, len(self._records))
+            self._reset()
+            self._sync()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the writers' file lock, then the in-process lock (always in that order)."""
+        with file_lock(self.path), self._lock:
+            yield
+
+    # -- public API --------------------------------------------------------
+
+    def compact(self) -> None:
+        """Rewrite the log so it holds exactly one line per live record."""
+        with self._locked():
+            self._compact()
+
+    def get(self, record_id: str) -> T | None:
+        with self._lock:
+            self._sync()
+            raw = self._records.get(record_id)
+        if raw is None:
+            return None
+        return self._decoder.from_dict(raw)
+
+    def get_versioned(self, record_id: str) -> tuple[T, int] | None:
+        with self._lock:
+            self._sync()
+            raw = self._records.get(record_id)
+            version = self._version(record_id)
+        if raw is None:
+            return None
+        return self._decoder.from_dict(raw), version
+
+    def list_all(self) -> list[T]:
+        return self._decoder.many_from_dicts(self._synced_records().values())
+
+    def save(self, item: T, *, expected_version: int | None = None) -> T:
+        record_id = record_id_of(item)
+        data = item.model_dump(mode="json")
+        with self._locked():
+            self._sync()
+            check_version(record_id, expected_version, self._version(record_id))
+            self._append(self._put_entries([(record_id, data)]))
+        logger.debug("Appended %s to %s", record_id, self.path)
+        return item
+
+    def delete(self, record_id: str) -> bool:
+        return self.delete_many([record_id]) > 0
+
+    # -- streaming & pagination --------------------------------------------
+
+    def iter_all(self) -> Iterator[T]:
+        for raw in self._synced_records().values():
+            yield self._decoder.from_dict(raw)
+
+    def iter_raw(self) -> Iterator[bytes]:
+        for raw in self._synced_records().values():
+            yield json_bytes(raw)
+
+    def list_page(self, after_id: str | None = None, limit: int = 100) -> list[T]:
+        with self._lock:
+            self._sync()
+            ids = heapq.nsmallest(
+                limit, (rid for rid in self._records if after_id is None or rid > after_id)
+            )
+            raws = [self._records[rid] for rid in ids]
+        return self._decoder.many_from_dicts(raws)
+
+    # -- bulk operations ---------------------------------------------------
+
+    def get_many(self, record_ids: Iterable[str]) -> dict[str, T]:
+        with self._lock:
+            self._sync()
+            raws = {rid: self._records[rid] for rid in record_ids if rid in self._records}
+        return {record_id: self._decoder.from_dict(raw) for record_id, raw in raws.items()}
+
+    def save_many(self, items: Iterable[T]) -> int:
+        records = [(record_id_of(item), item.model_dump(mode="json")) for item in items]
+        return self._put(records)
+
+    def save_many_raw(self, records: Iterable[bytes | str]) -> int:
+        parsed = [json.loads(record) for record in records]
+        return self._put([(data["id"], data) for data in parsed])
+
+    def _put(self, records: list[tuple[str, dict]]) -> int:
+        with self._locked():
+            self._sync()
+            self._append(self._put_entries(records))
+        return len(records)
+
+    def delete_many(self, record_ids: Iterable[str]) -> int:
+        ids = list(dict.fromkeys(record_ids))
+        with self._locked():
+            self._sync()
+            doomed = [rid for rid in ids if rid in self._records]
+            self._append([{"op": "del", "id": rid} for rid in doomed])
+        return len(doomed)
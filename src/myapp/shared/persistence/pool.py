@@ -0,0 +1,106 @@
+"""Bounded pool of persistent SQLite connections.
+
+Opening a connection and issuing pragmas is far more expensive than a
+single-row lookup, so stores check connections out of a pool instead of
+connecting per call. Pragmas are applied exactly once, when a connection
+is first opened.
+"""
+
+import queue
+import sqlite3
+import threading
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_PRAGMAS: dict[str, str] = {"journal_mode": "WAL"}
+
+
+class ConnectionPool:
+    """Hand out up to ``max_size`` reusable connections to one database file.
+
+    Connections are created lazily and returned to the pool after use.
+    A caller that finds every connection checked out waits up to
+    ``timeout`` seconds before a ``TimeoutError`` is raised.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        max_size: int = 4,
+        timeout: float = 5.0,
+        pragmas: Mapping[str, str] | None = None,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._open: set[sqlite3.Connection] = set()
+        self._closed = False
+
+    # -- internal helpers --------------------------------------------------
+
+    def _create(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        with self._lock:
+            self._open.add(conn)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._open.discard(conn)
+        conn.close()
+
+    # -- public API --------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        """Number of connections currently open (idle or checked out)."""
+        with self._lock:
+            return len(self._open)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for the duration of the ``with`` block.
+
+        Any transaction left open by the caller is rolled back before the
+        connection goes back into the pool.
+        """
+        if self._closed:
+            raise RuntimeError(f"Connection pool for {self.db_path} is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free connection to {self.db_path} after {self.timeout}s")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._create()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                if self._closed:
+                    self._discard(conn)
+                else:
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """Close every idle connection; busy ones close when returned."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -0,0 +1,147 @@
+"""Named SQLite pragma profiles, from safest to fastest.
+
+Every profile keeps WAL journaling (readers never block the writer) and
+differs in how much it trades durability for speed:
+
+* ``durable`` — ``synchronous=FULL``: a committed write survives power
+  loss. The default, and what stores did before profiles existed.
+* ``balanced`` — ``synchronous=NORMAL`` plus a larger page cache, memory
+  mapping and in-memory temp tables. The database cannot be corrupted,
+  but the last commits may be lost on power loss (not on a crash of the
+  process).
+* ``fast`` — ``synchronous=OFF``: no fsyncs at all; an OS crash or power
+  loss can corrupt the database. For caches and scratch data.
+* ``bulk-load`` — ``fast`` with a bigger cache and automatic WAL
+  checkpoints disabled; the store checkpoints once when it is closed.
+  For one-off imports into a database you can rebuild.
+
+Pragmas are applied once per pooled connection (see
+:class:`~myapp.shared.persistence.pool.ConnectionPool`).
+"""
+
+import re
+import sqlite3
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+DEFAULT_PROFILE = "durable"
+
+# Pragmas reported by :func:`effective_settings`, in display order.
+REPORTED_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "busy_timeout",
+    "wal_autocheckpoint",
+)
+
+_SYNCHRONOUS = {"0": "OFF", "1": "NORMAL", "2": "FULL", "3": "EXTRA"}
+_TEMP_STORE = {"0": "DEFAULT", "1": "FILE", "2": "MEMORY"}
+
+_PRAGMA_NAME = re.compile(r"[a-z_]+")
+_PRAGMA_VALUE = re.compile(r"-?\w+")
+
+
+@dataclass(frozen=True)
+class SqliteProfile:
+    """A named set of pragmas plus the checkpoint policy that goes with them."""
+
+    name: str
+    summary: str
+    pragmas: Mapping[str, str] = field(default_factory=dict)
+    checkpoint_on_close: bool = False
+
+
+PROFILES: dict[str, SqliteProfile] = {
+    p.name: p
+    for p in (
+        SqliteProfile(
+            "durable",
+            "fsync on every commit; survives power loss",
+            {"journal_mode": "WAL", "synchronous": "FULL", "busy_timeout": "5000"},
+        ),
+        SqliteProfile(
+            "balanced",
+            "fsync at checkpoints; may lose the last commits on power loss",
+            {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",
+                "cache_size": "-16384",
+                "mmap_size": "67108864",
+                "temp_store": "MEMORY",
+                "busy_timeout": "5000",
+            },
+        ),
+        SqliteProfile(
+            "fast",
+            "no fsync; an OS crash can corrupt the database",
+            {
+                "journal_mode": "WAL",
+                "synchronous": "OFF",
+                "cache_size": "-65536",
+                "mmap_size": "268435456",
+                "temp_store": "MEMORY",
+                "busy_timeout": "5000",
+            },
+        ),
+        SqliteProfile(
+            "bulk-load",
+            "like fast, no automatic checkpoints; checkpoints when closed",
+            {
+                "journal_mode": "WAL",
+                "synchronous": "OFF",
+                "cache_size": "-262144",
+                "mmap_size": "268435456",
+                "temp_store": "MEMORY",
+                "busy_timeout": "5000",
+                "wal_autocheckpoint": "0",
+            },
+            checkpoint_on_close=True,
+        ),
+    )
+}
+
+
+def get_profile(name: str) -> SqliteProfile:
+    """Look up a profile by name; raises ``ValueError`` for unknown names."""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown SQLite profile {name!r}; choose from {', '.join(PROFILES)}"
+        ) from None
+
+
+def parse_pragmas(spec: str) -> dict[str, str]:
+    """Parse ``"name=value,name=value"`` (e.g. ``MYAPP_SQLITE_PRAGMAS``) into a dict."""
+    pragmas: dict[str, str] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, sep, value = (s.strip() for s in part.partition("="))
+        if not sep or not _PRAGMA_NAME.fullmatch(name) or not _PRAGMA_VALUE.fullmatch(value):
+            raise ValueError(f"Invalid pragma {part.strip()!r}; expected name=value")
+        pragmas[name] = value
+    return pragmas
+
+
+def profile_pragmas(name: str, overrides: Mapping[str, str] | None = None) -> dict[str, str]:
+    """The profile's pragmas with ``overrides`` applied on top."""
+    pragmas = dict(get_profile(name).pragmas)
+    pragmas.update(overrides or {})
+    return pragmas
+
+
+def effective_settings(conn: sqlite3.Connection) -> dict[str, str]:
+    """Read back the :data:`REPORTED_PRAGMAS` as SQLite actually applied them."""
+    settings = {}
+    for name in REPORTED_PRAGMAS:
+        value = str(conn.execute(f"PRAGMA {name}").fetchone()[0])
+        if name == "synchronous":
+            value = _SYNCHRONOUS.get(value, value)
+        elif name == "temp_store":
+            value = _TEMP_STORE.get(value, value)
+        settings[name] = value
+    return settings
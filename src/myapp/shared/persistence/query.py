@@ -0,0 +1,125 @@
+"""Small, backend-neutral query description for stores.
+
+A :class:`Query` is a conjunction of :class:`Condition` objects plus an
+optional ordering and limit. Backends may compile it to their native
+query language (see ``SqliteStore.find``); :meth:`Query.apply` is the
+in-memory evaluator every backend can fall back to.
+"""
+
+import heapq
+import itertools
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Literal, TypeVar, get_args, get_origin
+
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+Op = Literal["eq", "prefix", "contains", "gt", "gte", "lt", "lte"]
+OPS: frozenset[str] = frozenset(get_args(Op))
+
+
+def is_datetime_field(model_class: type[BaseModel], field: str) -> bool:
+    """True if ``field`` is declared as a (possibly optional) ``datetime``."""
+    annotation = model_class.model_fields[field].annotation
+    return annotation is datetime or datetime in get_args(annotation)
+
+
+def is_list_field(model_class: type[BaseModel], field: str) -> bool:
+    """True if ``field`` holds a collection of values (e.g. ``list[str]`` tags)."""
+    annotation = model_class.model_fields[field].annotation
+    return get_origin(annotation) in (list, set, frozenset, tuple)
+
+
+@dataclass(frozen=True)
+class Condition:
+    """One predicate on a top-level model field.
+
+    ``contains`` tests membership in a list field (e.g. a tag); the
+    comparison operators work on strings, numbers and datetimes.
+    """
+
+    field: str
+    op: Op
+    value: Any
+
+    def __post_init__(self) -> None:
+        if self.op not in OPS:
+            raise ValueError(f"Unknown operator {self.op!r}; expected one of {sorted(OPS)}")
+
+    def matches(self, item: BaseModel) -> bool:
+        actual = getattr(item, self.field)
+        if self.op == "eq":
+            return bool(actual == self.value)
+        if self.op == "prefix":
+            return isinstance(actual, str) and actual.startswith(self.value)
+        if self.op == "contains":
+            return actual is not None and self.value in actual
+        if actual is None:
+            return False
+        if self.op == "gt":
+            return bool(actual > self.value)
+        if self.op == "gte":
+            return bool(actual >= self.value)
+        if self.op == "lt":
+            return bool(actual < self.value)
+        return bool(actual <= self.value)
+
+
+@dataclass(frozen=True)
+class Query:
+    """All ``conditions`` must match; results are ordered then truncated."""
+
+    conditions: tuple[Condition, ...] = ()
+    order_by: str | None = None
+    descending: bool = False
+    limit: int | None = None
+
+    # -- builders ----------------------------------------------------------
+
+    def where(self, field: str, op: Op, value: Any) -> "Query":
+        """Return a copy with one more condition."""
+        return replace(self, conditions=(*self.conditions, Condition(field, op, value)))
+
+    def order(self, field: str, descending: bool = False) -> "Query":
+        """Return a copy ordered by ``field``."""
+        return replace(self, order_by=field, descending=descending)
+
+    def take(self, limit: int) -> "Query":
+        """Return a copy that yields at most ``limit`` records."""
+        return replace(self, limit=limit)
+
+    # -- evaluation --------------------------------------------------------
+
+    def fields(self) -> set[str]:
+        """Every field name the query refers to."""
+        names = {c.field for c in self.conditions}
+        if self.order_by is not None:
+            names.add(self.order_by)
+        return names
+
+    def check(self, model_class: type[BaseModel]) -> None:
+        """Raise ``ValueError`` if the query names a field the model lacks."""
+        unknown = self.fields() - set(model_class.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown field(s) for {model_class.__name__}: {sorted(unknown)}")
+
+    def matches(self, item: BaseModel) -> bool:
+        return all(c.matches(item) for c in self.conditions)
+
+    def apply(self, items: Iterable[T]) -> list[T]:
+        """Evaluate the query in memory over ``items``."""
+        matched = (item for item in items if self.matches(item))
+        if self.order_by is None:
+            return list(itertools.islice(matched, self.limit))
+        field = self.order_by
+
+        def key(item: T) -> tuple[Any, str]:
+            return getattr(item, field), str(getattr(item, "id", ""))
+
+        if self.limit is None:
+            return sorted(matched, key=key, reverse=self.descending)
+        pick = heapq.nlargest if self.descending else heapq.nsmallest
+        return pick(self.limit, matched, key=key)
@@ -0,0 +1,73 @@
+"""Streaming NDJSON snapshots of a store, optionally compressed.
+
+A snapshot holds one record per line, exactly as ``BaseStore.iter_raw``
+yields it. Records are streamed in both directions, so memory stays flat
+however large the store is. The compression is picked from the file
+suffix (``.gz`` -> gzip, ``.xz`` -> lzma) unless given explicitly.
+"""
+
+import gzip
+import lzma
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import BinaryIO, Literal, cast, get_args
+
+from myapp.shared.persistence.files import atomic_write_bytes
+
+Compression = Literal["none", "gzip", "xz"]
+COMPRESSIONS: tuple[str, ...] = get_args(Compression)
+
+# Records between two progress callbacks.
+PROGRESS_EVERY = 1000
+
+_SUFFIXES: dict[str, Compression] = {".gz": "gzip", ".xz": "xz", ".lzma": "xz"}
+
+
+def compression_for(path: Path) -> Compression:
+    """Guess the compression of ``path`` from its suffix."""
+    return _SUFFIXES.get(path.suffix.lower(), "none")
+
+
+def _wrap(fh: BinaryIO, mode: Literal["rb", "wb"], compression: Compression) -> BinaryIO:
+    if compression == "gzip":
+        # Level 6 compresses nearly as well as the default 9 at a fraction of the cost.
+        return cast(BinaryIO, gzip.GzipFile(fileobj=fh, mode=mode, compresslevel=6))
+    if compression == "xz":
+        return cast(BinaryIO, lzma.LZMAFile(fh, mode=mode))
+    return fh
+
+
+def write_snapshot(
+    path: Path,
+    records: Iterable[bytes],
+    *,
+    compression: Compression | None = None,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Write ``records`` (one JSON document each) to ``path``; return the count.
+
+    The file is replaced atomically once every record has been written.
+    """
+    compression = compression or compression_for(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with atomic_write_bytes(path) as raw, _wrap(raw, "wb", compression) as out:
+        for record in records:
+            out.write(record)
+            out.write(b"\n")
+            count += 1
+            if progress is not None and count % PROGRESS_EVERY == 0:
+                progress(count)
+    if progress is not None:
+        progress(count)
+    return count
+
+
+def read_snapshot(path: Path, *, compression: Compression | None = None) -> Iterator[bytes]:
+    """Yield the records of a snapshot one at a time (blank lines are skipped)."""
+    compression = compression or compression_for(path)
+    with path.open("rb") as raw, _wrap(raw, "rb", compression) as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield line
@@ -1,45 +1,441 @@
 """SQLite persistence backend.
 
 Uses WAL journal mode for safe concurrent reads and
-wraps all mutations in transactions.
+wraps all mutations in transactions. Connections come from a
+:class:`~myapp.shared.persistence.pool.ConnectionPool` and are reused
+across calls.
+
+Fields listed in ``indexed_fields`` are made searchable without a full
+scan: scalar fields get an expression index on ``json_extract(data, ...)``
+and list fields (e.g. tags) get a ``<table>__ix_<field>`` side table of
+``(record_id, value)`` pairs kept in step with every write.
+
+The ``data`` column is written with a codec (see
+:mod:`~myapp.shared.persistence.codecs`): JSON objects by default, or
+compact field-ordered arrays, optionally zlib-compressed. Rows in any
+encoding are read back transparently; :meth:`SqliteStore.migrate_codec`
+rewrites a table in the store's codec. Only all-JSON tables can push
+queries down to JSON1; other tables narrow queries with ID ranges and
+side tables and evaluate the rest in memory.
+
+Every row has a ``version`` column, set to 1 on insert and incremented
+by every upsert. A save with ``expected_version`` becomes a single
+conditional ``INSERT ... ON CONFLICT DO NOTHING`` (version 0) or
+``UPDATE ... WHERE version = ?``, so compare-and-swap needs no extra
+locking beyond SQLite's own write lock.
+
+Connections are tuned by a named pragma profile (``durable`` by default;
+see :mod:`~myapp.shared.persistence.profiles`) plus optional per-store
+``pragmas`` overrides.
+
+With ``group_commit=True`` single-record writes (``save``/``delete`` and
+their ``submit_*`` variants) go through a
+:class:`~myapp.shared.persistence.group_commit.GroupCommitWriter`, which
+commits them in batches from one thread.
 """
 
+import itertools
 import sqlite3
+import sys
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Generic, TypeVar
+from typing import Any, Generic, TypeVar
 
 from pydantic import BaseModel
+from pydantic_core import from_json, to_json
 
-from myapp.shared.persistence.base import BaseStore
+from myapp.shared.logging import get_logger
+from myapp.shared.persistence.base import BaseStore, ConflictError, Match, record_id_of
+from myapp.shared.persistence.codecs import CODECS, RecordCodec
+from myapp.shared.persistence.decoding import RecordDecoder
+from myapp.shared.persistence.group_commit import GroupCommitWriter
+from myapp.shared.persistence.pool import ConnectionPool
+from myapp.shared.persistence.profiles import DEFAULT_PROFILE, get_profile, profile_pragmas
+from myapp.shared.persistence.query import Query, is_datetime_field, is_list_field
 
 T = TypeVar("T", bound=BaseModel)
+R = TypeVar("R")
+
+logger = get_logger(__name__)
+
+# Rows per keyset page when streaming.
+_FETCH_CHUNK = 500
+
+_COMPARISONS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+# Records written per executemany batch.
+_WRITE_CHUNK = 500
+
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER on older builds (999).
+_IN_CHUNK = 500
+
+# (record id, encoded data, values of each indexed list field)
+_Row = tuple[str, str | bytes, dict[str, Sequence[Any]]]
+
+
+def _chunks(rows: Iterable[_Row], size: int) -> Iterator[list[_Row]]:
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _prefix_end(prefix: str) -> str | None:
+    """The smallest string above every string starting with ``prefix``, if any.
+
+    Text compares by UTF-8 bytes, i.e. by code point, so this is
+    ``prefix`` with its last character incremented (trailing U+10FFFF
+    dropped; surrogates cannot occur in stored text and are skipped).
+    """
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if code <= sys.maxunicode:
+            return prefix[:-1] + chr(0xE000 if 0xD800 <= code <= 0xDFFF else code)
+        prefix = prefix[:-1]
+    return None
 
 
 class SqliteStore(BaseStore[T], Generic[T]):
-    """Store records in a SQLite table as JSON blobs."""
+    """Store records in a SQLite table as JSON blobs.
+
+    ``trusted_reads=True`` skips pydantic validation for rows written by
+    the current schema version (see :mod:`~myapp.shared.persistence.decoding`).
+    ``codec`` picks how new rows are encoded (one of
+    :data:`~myapp.shared.persistence.codecs.CODECS`).
+    """
 
-    def __init__(self, db_path: Path, table_name: str, model_class: type[T]) -> None:
+    def __init__(
+        self,
+        db_path: Path,
+        table_name: str,
+        model_class: type[T],
+        *,
+        pool: ConnectionPool | None = None,
+        profile: str | None = None,
+        pragmas: Mapping[str, str] | None = None,
+        indexed_fields: Sequence[str] = (),
+        trusted_reads: bool = False,
+        codec: str = "json",
+        group_commit: bool = False,
+        commit_batch: int = 256,
+        commit_delay: float = 0.0,
+    ) -> None:
         self.db_path = db_path
         self.table_name = table_name
         self.model_class = model_class
+        self._decoder = RecordDecoder(model_class, trusted=trusted_reads)
+        unknown = set(indexed_fields) - set(model_class.model_fields)
+        if unknown:
+            raise ValueError(f"Cannot index unknown field(s): {sorted(unknown)}")
+        self.indexed_fields = tuple(f for f in indexed_fields if f != "id")
+        self._list_indexes = tuple(f for f in self.indexed_fields if is_list_field(model_class, f))
+        self._scalar_indexes = tuple(f for f in self.indexed_fields if f not in self._list_indexes)
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}; choose from {', '.join(CODECS)}")
+        if pool is not None and (profile is not None or pragmas is not None):
+            raise ValueError("profile and pragmas apply to the store's own pool only")
+        self.profile = get_profile(profile or DEFAULT_PROFILE)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._init_db()
+        self._owns_pool = pool is None
+        self._pool = pool or ConnectionPool(
+            db_path, pragmas=profile_pragmas(self.profile.name, pragmas)
+        )
+        self._init_db(codec)
+        self._writer = (
+            GroupCommitWriter(
+                self._connect,
+                max_batch=commit_batch,
+                max_delay=commit_delay,
+                name=f"group-commit:{table_name}",
+            )
+            if group_commit
+            else None
+        )
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """The connection pool this store borrows from."""
+        return self._pool
 
-    def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(str(self.db_path))
-        conn.execute("PRAGMA journal_mode=WAL")
-        return conn
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection and run the block in one transaction."""
+        with self._pool.connection() as conn, conn:
+            yield conn
 
-    def _init_db(self) -> None:
+    def _init_db(self, codec: str) -> None:
         with self._connect() as conn:
             conn.execute(
                 f"CREATE TABLE IF NOT EXISTS [{self.table_name}] ("
                 "  id TEXT PRIMARY KEY,"
                 "  data TEXT NOT NULL,"
+                "  version INTEGER NOT NULL DEFAULT 1,"
                 "  created_at TEXT DEFAULT CURRENT_TIMESTAMP,"
                 "  updated_at TEXT DEFAULT CURRENT_TIMESTAMP"
                 ")"
             )
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info([{self.table_name}])")}
+            if "version" not in columns:
+                # Tables created before versions existed: every row starts at 1.
+                conn.execute(
+                    f"ALTER TABLE [{self.table_name}] ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+                )
+            self._init_codec(conn, codec)
+            self._migrate_indexes(conn)
+
+    def _codec_table(self) -> str:
+        return f"{self.table_name}__codec"
+
+    def _init_codec(self, conn: sqlite3.Connection, codec: str) -> None:
+        """Find out how the table is encoded and register the model's compact layout.
+
+        ``<table>__codec`` records the table's encoding under ``codec``:
+        the codec name, or ``mixed`` once a store wrote rows in a codec
+        other than the table's (see :meth:`_write_rows`). Tables without
+        it hold JSON objects.
+        """
+        meta = self._codec_table()
+        entries: dict[str, str] = {}
+        if self._has_codec_table(conn):
+            entries = dict(conn.execute(f"SELECT key, value FROM [{meta}]").fetchall())
+        layouts = {
+            int(key.partition(":")[2]): tuple(from_json(value))
+            for key, value in entries.items()
+            if key.startswith("layout:")
+        }
+        layout = None
+        if codec.startswith("compact"):
+            fields = tuple(self.model_class.model_fields)
+            layout = next((n for n, f in layouts.items() if f == fields), None)
+            if layout is None:
+                layout = max(layouts, default=0) + 1
+                layouts[layout] = fields
+                self._create_codec_table(conn)
+                conn.execute(
+                    f"INSERT INTO [{meta}] (key, value) VALUES (?, ?)",
+                    (f"layout:{layout}", to_json(list(fields)).decode()),
+                )
+        self._codec = RecordCodec(
+            codec, layout=layout, layouts=layouts, load_layout=self._load_layout
+        )
+        if entries.get("codec", "json") != codec:
+            if conn.execute(f"SELECT 1 FROM [{self.table_name}] LIMIT 1").fetchone() is None:
+                self._set_table_codec(conn, codec)
+
+    def _create_codec_table(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS [{self._codec_table()}] "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def _has_codec_table(self, conn: sqlite3.Connection) -> bool:
+        return (
+            conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (self._codec_table(),),
+            ).fetchone()
+            is not None
+        )
+
+    def _set_table_codec(self, conn: sqlite3.Connection, name: str) -> None:
+        self._create_codec_table(conn)
+        conn.execute(
+            f"INSERT OR REPLACE INTO [{self._codec_table()}] (key, value) VALUES ('codec', ?)",
+            (name,),
+        )
+
+    def _table_codec(self, conn: sqlite3.Connection) -> str:
+        """The table's encoding as ``conn`` sees it.
+
+        Read on every use rather than kept: another store or process may
+        mark the table ``mixed`` or migrate it at any time, and a rolled
+        back change must not linger either.
+        """
+        if not self._has_codec_table(conn):
+            return "json"
+        row = conn.execute(
+            f"SELECT value FROM [{self._codec_table()}] WHERE key = 'codec'"
+        ).fetchone()
+        return str(row[0]) if row else "json"
+
+    def _pushdown(self, conn: sqlite3.Connection) -> bool:
+        """Whether every row is a JSON object, so JSON1 can answer queries."""
+        return self._table_codec(conn) == "json"
+
+    def _load_layout(self, number: int) -> tuple[str, ...]:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                f"SELECT value FROM [{self._codec_table()}] WHERE key = ?", (f"layout:{number}",)
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown compact layout {number} in {self.table_name}")
+        return tuple(from_json(row[0]))
+
+    def _record_dict(self, data: str | bytes) -> dict[str, Any]:
+        payload = self._codec.decode(data)
+        return payload if isinstance(payload, dict) else from_json(payload)
+
+    def _load(self, data: str | bytes) -> T:
+        return self._decoder.from_payload(self._codec.decode(data))
+
+    def _load_many(self, rows: Iterable[Sequence[Any]]) -> list[T]:
+        """Decode the ``data`` value in the first column of every row."""
+        decode = self._codec.decode
+        return self._decoder.many_from_payloads(decode(row[0]) for row in rows)
+
+    def _index_name(self, field: str) -> str:
+        return f"{self.table_name}__idx_{field}"
+
+    def _side_table(self, field: str) -> str:
+        return f"{self.table_name}__ix_{field}"
+
+    def _migrate_indexes(self, conn: sqlite3.Connection) -> None:
+        """Create declared indexes, backfill new side tables, drop stale ones."""
+        existing = dict(
+            conn.execute("SELECT name, type FROM sqlite_master WHERE type IN ('index', 'table')")
+        )
+        # Expression indexes only see into JSON objects.
+        pushdown = self._pushdown(conn)
+        wanted_indexes = {self._index_name(f) for f in self._scalar_indexes} if pushdown else set()
+        wanted_tables = {self._side_table(f) for f in self._list_indexes}
+        for name, kind in existing.items():
+            if kind == "index" and name.startswith(self._index_name("")):
+                if name not in wanted_indexes:
+                    conn.execute(f"DROP INDEX [{name}]")
+            elif kind == "table" and name.startswith(self._side_table("")):
+                if name not in wanted_tables:
+                    conn.execute(f"DROP TABLE [{name}]")
+
+        for field in self._scalar_indexes if pushdown else ():
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS [{self._index_name(field)}] "
+                f"ON [{self.table_name}] ({self._field_expr(field)})"
+            )
+        for field in self._list_indexes:
+            side = self._side_table(field)
+            if side in existing:
+                continue
+            conn.execute(
+                f"CREATE TABLE [{side}] ("
+                "  record_id TEXT NOT NULL,"
+                "  value NOT NULL,"
+                "  PRIMARY KEY (value, record_id)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(f"CREATE INDEX [{side}__record] ON [{side}] (record_id)")
+            if pushdown:
+                conn.execute(
+                    f"INSERT OR IGNORE INTO [{side}] (record_id, value) "
+                    f"SELECT t.id, j.value FROM [{self.table_name}] AS t, "
+                    f"json_each(t.data, '$.{field}') AS j"
+                )
+                continue
+            rows = conn.execute(f"SELECT id, data FROM [{self.table_name}]")
+            conn.executemany(
+                f"INSERT OR IGNORE INTO [{side}] (record_id, value) VALUES (?, ?)",
+                [
+                    (record_id, value)
+                    for record_id, data in rows.fetchall()
+                    for value in self._record_dict(data).get(field) or ()
+                ],
+            )
+
+    def _upsert_sql(self) -> str:
+        return (
+            f"INSERT INTO [{self.table_name}] (id, data, updated_at) "
+            "VALUES (?, ?, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(id) DO UPDATE SET "
+            "  data = excluded.data,"
+            "  version = version + 1,"
+            "  updated_at = CURRENT_TIMESTAMP"
+        )
+
+    def _item_row(self, item: T) -> _Row:
+        values = {f: getattr(item, f) or () for f in self._list_indexes}
+        if self._codec.compact:
+            data = self._codec.encode(item.model_dump(mode="json"))
+        else:
+            data = self._codec.encode_json(item.model_dump_json())
+        return record_id_of(item), data, values
+
+    def _raw_row(self, record: bytes | str) -> _Row:
+        raw = from_json(record)
+        if self._codec.compact:
+            data = self._codec.encode(raw)
+        else:
+            data = self._codec.encode_json(record.decode() if isinstance(record, bytes) else record)
+        return raw["id"], data, {f: raw.get(f) or () for f in self._list_indexes}
+
+    def _check_codec(self, conn: sqlite3.Connection) -> None:
+        """Mark the table ``mixed`` before writing rows in a codec other than its own."""
+        table_codec = self._table_codec(conn)
+        if table_codec not in (self._codec.name, "mixed"):
+            logger.warning(
+                "Writing %s rows into %s, which is encoded as %s; queries run in memory "
+                "until migrate-codec converts the table",
+                self._codec.name,
+                self.table_name,
+                table_codec,
+            )
+            self._set_table_codec(conn, "mixed")
+            self._migrate_indexes(conn)  # expression indexes cannot read the new rows
+
+    def _write_side_tables(self, conn: sqlite3.Connection, batch: list[_Row]) -> None:
+        for field in self._list_indexes:
+            side = self._side_table(field)
+            conn.executemany(
+                f"DELETE FROM [{side}] WHERE record_id = ?", [(rid,) for rid, _, _ in batch]
+            )
+            conn.executemany(
+                f"INSERT OR IGNORE INTO [{side}] (record_id, value) VALUES (?, ?)",
+                [(rid, value) for rid, _, values in batch for value in values[field]],
+            )
+
+    def _write_rows(self, conn: sqlite3.Connection, rows: Iterable[_Row]) -> int:
+        """Upsert ``(id, data, list-index values)`` rows and refresh their side tables."""
+        self._check_codec(conn)
+        count = 0
+        for batch in _chunks(rows, _WRITE_CHUNK):
+            conn.executemany(self._upsert_sql(), [(rid, data) for rid, data, _ in batch])
+            self._write_side_tables(conn, batch)
+            count += len(batch)
+        return count
+
+    def _write_row(self, conn: sqlite3.Connection, row: _Row, expected_version: int | None) -> None:
+        """Write one row, only if it is still at ``expected_version`` when one is given."""
+        if expected_version is None:
+            self._write_rows(conn, [row])
+            return
+        self._check_codec(conn)
+        record_id, data, _ = row
+        if expected_version == 0:
+            cursor = conn.execute(
+                f"INSERT INTO [{self.table_name}] (id, data) VALUES (?, ?) "
+                "ON CONFLICT(id) DO NOTHING",
+                (record_id, data),
+            )
+        else:
+            cursor = conn.execute(
+                f"UPDATE [{self.table_name}] SET data = ?, version = version + 1, "
+                "updated_at = CURRENT_TIMESTAMP WHERE id = ? AND version = ?",
+                (data, record_id, expected_version),
+            )
+        if cursor.rowcount != 1:
+            found = conn.execute(
+                f"SELECT version FROM [{self.table_name}] WHERE id = ?", (record_id,)
+            ).fetchone()
+            raise ConflictError(record_id, expected_version, found[0] if found else 0)
+        self._write_side_tables(conn, [row])
+
+    def _delete_rows(self, conn: sqlite3.Connection, record_ids: Iterable[str]) -> int:
+        """Delete rows by ID along with their side-table entries."""
+        params = [(record_id,) for record_id in record_ids]
+        for field in self._list_indexes:
+            conn.executemany(f"DELETE FROM [{self._side_table(field)}] WHERE record_id = ?", params)
+        cursor = conn.executemany(f"DELETE FROM [{self.table_name}] WHERE id = ?", params)
+        return max(cursor.rowcount, 0)
 
     # -- public API --------------------------------------------------------
 
@@ -51,31 +447,341 @@ class SqliteStore(BaseStore[T], Generic[T]):
             ).fetchone()
         if row is None:
             return None
-        return self.model_class.model_validate_json(row[0])
+        return self._load(row[0])
+
+    def get_versioned(self, record_id: str) -> tuple[T, int] | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT data, version FROM [{self.table_name}] WHERE id = ?",
+                (record_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._load(row[0]), row[1]
 
     def list_all(self) -> list[T]:
         with self._connect() as conn:
             rows = conn.execute(f"SELECT data FROM [{self.table_name}]").fetchall()
-        return [self.model_class.model_validate_json(r[0]) for r in rows]
+        return self._load_many(rows)
 
-    def save(self, item: T) -> T:
-        item_json = item.model_dump_json()
-        item_dict = item.model_dump()
+    def save(self, item: T, *, expected_version: int | None = None) -> T:
+        if self._writer is not None:
+            return self.submit_save(item, expected_version=expected_version).result()
+        row = self._item_row(item)
         with self._connect() as conn:
-            conn.execute(
-                f"INSERT INTO [{self.table_name}] (id, data, updated_at) "
-                "VALUES (?, ?, CURRENT_TIMESTAMP) "
-                "ON CONFLICT(id) DO UPDATE SET "
-                "  data = excluded.data,"
-                "  updated_at = CURRENT_TIMESTAMP",
-                (item_dict["id"], item_json),
-            )
+            self._write_row(conn, row, expected_version)
+        logger.debug("Saved %s to %s", row[0], self.table_name)
         return item
 
     def delete(self, record_id: str) -> bool:
+        if self._writer is not None:
+            return self.submit_delete(record_id).result()
         with self._connect() as conn:
-            cursor = conn.execute(
-                f"DELETE FROM [{self.table_name}] WHERE id = ?",
-                (record_id,),
-            )
-        return cursor.rowcount > 0
+            deleted = self._delete_rows(conn, [record_id]) > 0
+        logger.debug("Deleted %s from %s: %s", record_id, self.table_name, deleted)
+        return deleted
+
+    # -- asynchronous writes -------------------------------------------------
+
+    def _submit(self, operation: Callable[[sqlite3.Connection], R]) -> Future[R]:
+        if self._writer is not None:
+            return self._writer.submit(operation)
+        future: Future[R] = Future()
+        try:
+            with self._connect() as conn:
+                future.set_result(operation(conn))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def submit_save(self, item: T, *, expected_version: int | None = None) -> Future[T]:
+        """Queue ``item`` for the next group commit; the future resolves once it is durable.
+
+        Without ``group_commit`` the item is saved immediately and the
+        returned future is already done. A version conflict fails only
+        this future, with :class:`~myapp.shared.persistence.base.ConflictError`.
+        """
+        row = self._item_row(item)
+
+        def operation(conn: sqlite3.Connection) -> T:
+            self._write_row(conn, row, expected_version)
+            return item
+
+        return self._submit(operation)
+
+    def submit_delete(self, record_id: str) -> Future[bool]:
+        """Queue a delete; the future resolves to whether the record existed."""
+        return self._submit(lambda conn: self._delete_rows(conn, [record_id]) > 0)
+
+    # -- streaming & pagination --------------------------------------------
+
+    def _pages(self, column: str) -> Iterator[list[Any]]:
+        """Yield ``column`` of every row in ID order, one keyset page at a time.
+
+        Each page borrows a connection only while it is read, so a consumer
+        that pauses between records does not keep one checked out.
+        """
+        after_id = ""
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT id, {column} FROM [{self.table_name}] "
+                    "WHERE id > ? ORDER BY id LIMIT ?",
+                    (after_id, _FETCH_CHUNK),
+                ).fetchall()
+            if not rows:
+                return
+            yield [value for _, value in rows]
+            after_id = rows[-1][0]
+
+    def iter_all(self) -> Iterator[T]:
+        """Stream records in ID order, holding one page at a time."""
+        for page in self._pages("data"):
+            for data in page:
+                yield self._load(data)
+
+    def iter_raw(self) -> Iterator[bytes]:
+        """Stream records as JSON bytes; rows stored as JSON objects are not parsed."""
+        decode = self._codec.decode_bytes
+        for page in self._pages("CAST(data AS BLOB)"):
+            for data in page:
+                yield decode(data)
+
+    def list_page(self, after_id: str | None = None, limit: int = 100) -> list[T]:
+        params: list[str | int]
+        if after_id is None:
+            where, params = "", [limit]
+        else:
+            where, params = "WHERE id > ? ", [after_id, limit]
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT data FROM [{self.table_name}] {where}ORDER BY id LIMIT ?",
+                params,
+            ).fetchall()
+        return self._load_many(rows)
+
+    # -- queries -----------------------------------------------------------
+
+    def _field_expr(self, field: str) -> str:
+        """SQL expression for a top-level model field inside the JSON blob."""
+        if field == "id":
+            return "id"
+        expr = f"json_extract(data, '$.{field}')"
+        if is_datetime_field(self.model_class, field):
+            # Stored ISO strings vary in precision, so compare as Julian days.
+            return f"julianday({expr})"
+        return expr
+
+    def _compile(self, query: Query) -> tuple[str, list[Any]]:
+        clauses: list[str] = []
+        params: list[Any] = []
+        for cond in query.conditions:
+            expr = self._field_expr(cond.field)
+            value = cond.value
+            if cond.op == "contains" and cond.field in self._list_indexes:
+                clauses.append(
+                    f"id IN (SELECT record_id FROM [{self._side_table(cond.field)}] "
+                    "WHERE value = ?)"
+                )
+                params.append(value)
+            elif cond.op == "contains":
+                clauses.append(
+                    f"EXISTS (SELECT 1 FROM json_each(data, '$.{cond.field}') WHERE value = ?)"
+                )
+                params.append(value)
+            elif cond.op == "prefix":
+                # A range, unlike substr(), can be answered from the field's index.
+                clauses.append(f"{expr} >= ?")
+                params.append(value)
+                end = _prefix_end(value)
+                if end is not None:
+                    clauses.append(f"{expr} < ?")
+                    params.append(end)
+            elif isinstance(value, datetime):
+                clauses.append(f"{expr} {_COMPARISONS[cond.op]} julianday(?)")
+                params.append(value.isoformat())
+            else:
+                clauses.append(f"{expr} {_COMPARISONS[cond.op]} ?")
+                params.append(value)
+        sql = f"SELECT data FROM [{self.table_name}]"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if query.order_by is not None:
+            direction = "DESC" if query.descending else "ASC"
+            sql += f" ORDER BY {self._field_expr(query.order_by)} {direction}, id {direction}"
+        if query.limit is not None:
+            sql += " LIMIT ?"
+            params.append(query.limit)
+        return sql, params
+
+    def _candidates(self, query: Query) -> list[T]:
+        """Rows that may match ``query``, narrowed by what SQL sees without JSON1."""
+        clauses: list[str] = []
+        params: list[Any] = []
+        for cond in query.conditions:
+            if cond.op == "contains" and cond.field in self._list_indexes:
+                clauses.append(
+                    f"id IN (SELECT record_id FROM [{self._side_table(cond.field)}] "
+                    "WHERE value = ?)"
+                )
+                params.append(cond.value)
+            elif cond.field == "id" and cond.op in _COMPARISONS:
+                clauses.append(f"id {_COMPARISONS[cond.op]} ?")
+                params.append(cond.value)
+        sql = f"SELECT data FROM [{self.table_name}]"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return self._load_many(rows)
+
+    def find(self, query: Query) -> list[T]:
+        """Compile ``query`` to SQL using ``json_extract`` / ``json_each``.
+
+        Tables not (yet) stored as JSON objects are narrowed in SQL as far
+        as possible and the query is finished in memory.
+        """
+        query.check(self.model_class)
+        with self._connect() as conn:
+            # One read transaction, so the rows are encoded as the codec row says.
+            conn.execute("BEGIN")
+            if self._pushdown(conn):
+                sql, params = self._compile(query)
+                rows = conn.execute(sql, params).fetchall()
+                return self._load_many(rows)
+        return query.apply(self._candidates(query))
+
+    def find_by_values(
+        self,
+        field: str,
+        values: Sequence[Any],
+        *,
+        match: Match = "all",
+        limit: int | None = None,
+    ) -> list[T]:
+        """Answer from the field's side table when it is indexed."""
+        if field not in self._list_indexes:
+            return super().find_by_values(field, values, match=match, limit=limit)
+        wanted = list(dict.fromkeys(values))
+        if not wanted:
+            return []
+        marks = ", ".join("?" * len(wanted))
+        subquery = f"SELECT record_id FROM [{self._side_table(field)}] WHERE value IN ({marks})"
+        params: list[Any] = list(wanted)
+        if match == "all":
+            subquery += " GROUP BY record_id HAVING COUNT(*) = ?"
+            params.append(len(wanted))
+        sql = f"SELECT data FROM [{self.table_name}] WHERE id IN ({subquery}) ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return self._load_many(rows)
+
+    def value_counts(self, field: str) -> dict[Any, int]:
+        if field not in self._list_indexes:
+            return super().value_counts(field)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT value, COUNT(*) FROM [{self._side_table(field)}] GROUP BY value"
+            ).fetchall()
+        return dict(rows)
+
+    # -- bulk operations ---------------------------------------------------
+
+    def get_many(self, record_ids: Iterable[str]) -> dict[str, T]:
+        ids = list(dict.fromkeys(record_ids))
+        found: dict[str, T] = {}
+        with self._connect() as conn:
+            for start in range(0, len(ids), _IN_CHUNK):
+                chunk = ids[start : start + _IN_CHUNK]
+                marks = ", ".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT id, data FROM [{self.table_name}] WHERE id IN ({marks})",
+                    chunk,
+                ).fetchall()
+                for record_id, data in rows:
+                    found[record_id] = self._load(data)
+        return found
+
+    def save_many(self, items: Iterable[T]) -> int:
+        """Upsert every item with batched ``executemany`` calls in a single transaction."""
+        with self._connect() as conn:
+            return self._write_rows(conn, (self._item_row(item) for item in items))
+
+    def save_many_raw(self, records: Iterable[bytes | str]) -> int:
+        """Store serialized records as is, in a single transaction.
+
+        ``records`` may be a lazy stream (e.g. from a validation pipeline);
+        if it raises part-way the whole transaction is rolled back.
+        """
+        with self._connect() as conn:
+            return self._write_rows(conn, (self._raw_row(record) for record in records))
+
+    def delete_many(self, record_ids: Iterable[str]) -> int:
+        with self._connect() as conn:
+            return self._delete_rows(conn, record_ids)
+
+    @property
+    def codec(self) -> str:
+        """Name of the codec new rows are written with."""
+        return self._codec.name
+
+    def data_size(self) -> int:
+        """Total bytes held in the ``data`` column."""
+        with self._connect() as conn:
+            return self._data_size(conn)
+
+    def _data_size(self, conn: sqlite3.Connection) -> int:
+        sql = f"SELECT COALESCE(SUM(length(CAST(data AS BLOB))), 0) FROM [{self.table_name}]"
+        return int(conn.execute(sql).fetchone()[0])
+
+    def migrate_codec(self) -> tuple[int, int, int]:
+        """Rewrite every row with this store's codec, in one transaction.
+
+        Returns ``(rows, bytes before, bytes after)`` for the ``data``
+        column. The file only shrinks after a ``VACUUM``.
+        """
+        rows = 0
+        with self._connect() as conn:
+            before = self._data_size(conn)
+            # Drop expression indexes while rows change shape; re-created below for JSON.
+            self._set_table_codec(conn, "mixed")
+            self._migrate_indexes(conn)
+            after_id = ""
+            while page := conn.execute(
+                f"SELECT id, data FROM [{self.table_name}] WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, _WRITE_CHUNK),
+            ).fetchall():
+                conn.executemany(
+                    f"UPDATE [{self.table_name}] SET data = ? WHERE id = ?",
+                    [(self._codec.encode(self._record_dict(data)), rid) for rid, data in page],
+                )
+                rows += len(page)
+                after_id = page[-1][0]
+            self._set_table_codec(conn, self._codec.name)
+            self._migrate_indexes(conn)
+            after = self._data_size(conn)
+        return rows, before, after
+
+    def checkpoint(self, mode: str = "PASSIVE") -> tuple[int, int, int]:
+        """Run ``PRAGMA wal_checkpoint(mode)``; returns (busy, log frames, checkpointed)."""
+        if mode.upper() not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Unknown checkpoint mode {mode!r}")
+        with self._pool.connection() as conn:
+            busy, log, done = conn.execute(f"PRAGMA wal_checkpoint({mode.upper()})").fetchone()
+        return busy, log, done
+
+    def close(self) -> None:
+        """Flush pending writes and close the pool unless the caller passed it in.
+
+        Profiles with ``checkpoint_on_close`` (``bulk-load``) fold the WAL
+        back into the database first.
+        """
+        if self._writer is not None:
+            self._writer.close()
+        if self.profile.checkpoint_on_close and self._owns_pool:
+            self.checkpoint("TRUNCATE")
+        if self._owns_pool:
+            self._pool.close()
@@ -0,0 +1,108 @@
+"""Validate serialized records in bulk, optionally across a process pool.
+
+:func:`validate_records` turns a stream of JSON records (e.g. snapshot
+lines) into normalized, validated JSON ready for ``save_many_raw``.
+Records are validated in chunks; with ``workers > 1`` the chunks go to a
+``ProcessPoolExecutor`` so validation scales with cores while the caller
+keeps writing. Only a bounded number of chunks is in flight at a time,
+so memory stays flat, and output order always matches input order.
+
+Workers are started with :func:`~myapp.shared.processes.forkserver_context`,
+with pydantic and the model's module preloaded.
+"""
+
+import itertools
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from myapp.shared.processes import forkserver_context
+
+# Chunks queued per worker, so workers never wait on the consumer.
+_PREFETCH = 2
+
+
+class InvalidRecordError(ValueError):
+    """A record failed validation; ``record`` is its 1-based position in the input."""
+
+    def __init__(self, record: int, detail: str) -> None:
+        # Both values go to args so the error survives the trip back from a worker.
+        super().__init__(record, detail)
+        self.record = record
+        self.detail = detail
+
+    def __str__(self) -> str:
+        return f"record {self.record}: {self.detail}"
+
+
+def _validate_chunk(
+    model_class: type[BaseModel], start: int, records: list[bytes | str]
+) -> list[bytes]:
+    validated = []
+    for number, record in enumerate(records, start=start):
+        try:
+            validated.append(to_json(model_class.model_validate_json(record)))
+        except ValueError as exc:
+            raise InvalidRecordError(number, str(exc)) from None
+    return validated
+
+
+def _numbered_chunks(
+    records: Iterable[bytes | str], size: int
+) -> Iterator[tuple[int, list[bytes | str]]]:
+    source = iter(records)
+    start = 1
+    while chunk := list(itertools.islice(source, size)):
+        yield start, chunk
+        start += len(chunk)
+
+
+def _pool(workers: int, model_class: type[BaseModel]) -> ProcessPoolExecutor:
+    context = forkserver_context([__name__, model_class.__module__])
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def validate_records(
+    model_class: type[BaseModel],
+    records: Iterable[bytes | str],
+    *,
+    workers: int = 1,
+    chunk_size: int = 1000,
+    progress: Callable[[int], None] | None = None,
+) -> Iterator[bytes]:
+    """Yield each record validated against ``model_class`` and re-serialized.
+
+    Raises :class:`InvalidRecordError` at the first invalid record.
+    ``progress`` receives the running count after every chunk. The model
+    class must be importable by the worker processes (i.e. defined at
+    module level) when ``workers > 1``.
+    """
+    chunks = _numbered_chunks(records, chunk_size)
+    done = 0
+
+    def emit(validated: list[bytes]) -> Iterator[bytes]:
+        nonlocal done
+        yield from validated
+        done += len(validated)
+        if progress is not None:
+            progress(done)
+
+    if workers <= 1:
+        for start, chunk in chunks:
+            yield from emit(_validate_chunk(model_class, start, chunk))
+        return
+
+    pool = _pool(workers, model_class)
+    pending: deque[Future[list[bytes]]] = deque()
+    try:
+        for start, chunk in chunks:
+            pending.append(pool.submit(_validate_chunk, model_class, start, chunk))
+            if len(pending) >= workers * _PREFETCH:
+                yield from emit(pending.popleft().result())
+        while pending:
+            yield from emit(pending.popleft().result())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,25 @@
+"""Start worker processes from a process that may run threads."""
+
+import multiprocessing
+from collections.abc import Iterable
+from multiprocessing.context import BaseContext
+
+
+def forkserver_context(preload: Iterable[str]) -> BaseContext:
+    """A forkserver context with the ``preload`` modules imported, where available.
+
+    Forking a process that runs threads (the logging listener, executor or
+    group-commit threads) can leave the child holding a lock whose owner
+    no longer exists. A forkserver runs none, since importing modules that
+    create loggers does not start the logging thread, and still hands each
+    child the preloaded imports for free. Elsewhere this is the platform's
+    default context.
+
+    The preload list only takes effect when the forkserver starts, i.e.
+    for the first process started from any forkserver context.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(list(preload))
+    return context
@@ -34,3 +34,6 @@ class ServiceResponse(BaseModel):
     message: str = ""
     data: Any = None
     errors: list[str] = Field(default_factory=list)
+    version: int | None = Field(
+        default=None, description="Stored version of the record; pass it back as expected_version"
+    )
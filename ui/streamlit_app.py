@@ -13,7 +13,11 @@ import streamlit as st
 
 from myapp.services.example.api import ExampleService
 from myapp.services.example.schemas import ItemCreate
-from myapp.services.example.storage import ExampleJsonStore, ExampleSqliteStore
+from myapp.services.example.storage import (
+    ExampleJsonlStore,
+    ExampleJsonStore,
+    ExampleSqliteStore,
+)
 from myapp.shared.config import ensure_data_dirs
 
 ensure_data_dirs()
@@ -23,9 +27,23 @@ st.title("myapp — Example Service")
 
 # ── sidebar: backend picker ───────────────────────────────────────────
 
-backend = st.sidebar.radio("Storage backend", ["sqlite", "json"], index=0)
-store = ExampleSqliteStore() if backend == "sqlite" else ExampleJsonStore()
-svc = ExampleService(store=store)
+STORES = {"sqlite": ExampleSqliteStore, "json": ExampleJsonStore, "jsonl": ExampleJsonlStore}
+
+
+@st.cache_resource
+def get_service(backend: str) -> ExampleService:
+    """One service per backend, shared by every rerun and session (stores hold pools)."""
+    return ExampleService(store=STORES[backend]())
+
+
+def changed() -> None:
+    """Forget the prepared download after a write, then rerun."""
+    st.session_state.pop("export", None)
+    st.rerun()
+
+
+backend = st.sidebar.radio("Storage backend", list(STORES), index=0)
+svc = get_service(backend)
 
 # ── create item ───────────────────────────────────────────────────────
 
@@ -40,7 +58,7 @@ with st.expander("Add new item", expanded=False):
             resp = svc.create(ItemCreate(name=name, description=description, tags=tags))
             if resp.success:
                 st.success(f"Created item {resp.data['id']}")
-                st.rerun()
+                changed()
             else:
                 st.error(resp.message)
 
@@ -64,7 +82,7 @@ else:
         with col2:
             if st.button("Delete", key=f"del_{item['id']}"):
                 svc.delete(item["id"])
-                st.rerun()
+                changed()
 
 # ── export / import ───────────────────────────────────────────────────
 
@@ -74,8 +92,22 @@ with col_exp:
     if st.button("Export to JSON"):
         resp = svc.export_json()
         st.info(resp.message)
+    # Reading every record is left to an explicit request, not every rerun.
+    if st.button("Prepare NDJSON download"):
+        st.session_state["export"] = (
+            backend,
+            b"".join(record + b"\n" for record in svc.list_raw()),
+        )
+    export = st.session_state.get("export")
+    if export is not None and export[0] == backend:
+        st.download_button(
+            "Download NDJSON",
+            data=export[1],
+            file_name=f"example_items_{backend}.ndjson",
+            mime="application/x-ndjson",
+        )
 with col_imp:
     if st.button("Import from JSON"):
         resp = svc.import_json()
         st.info(resp.message)
-        st.rerun()
+        changed()